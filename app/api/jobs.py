@@ -0,0 +1,21 @@
+from fastapi import APIRouter, HTTPException
+
+from app.services.job_service import JobService
+
+router = APIRouter()
+
+
+@router.get("/jobs/batches/{batch_id}")
+async def get_batch(batch_id: str):
+    batch = await JobService().get_batch(batch_id)
+    if not batch:
+        raise HTTPException(status_code=404, detail="Batch not found")
+    return batch
+
+
+@router.get("/jobs/{job_id}")
+async def get_job(job_id: str):
+    job = await JobService().get_job(job_id)
+    if not job:
+        raise HTTPException(status_code=404, detail="Job not found")
+    return job
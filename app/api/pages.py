@@ -1,80 +1,348 @@
-from fastapi import APIRouter
-from typing import Optional
+import re
+from datetime import datetime, timedelta
 
-from app.services.page_service import PageService
-from app.db.repositories.page_repo import PageRepository
+from bson import ObjectId
+from fastapi import APIRouter, HTTPException, Query, Request, Response
+from fastapi.responses import StreamingResponse
+from typing import Literal, Optional
+
+from app.models.job import RefreshRequest
+from app.models.page import BatchPagesRequest
+from app.services.page_service import PageService, page_etag
+from app.services.job_service import JobService
+from app.services.analytics_service import AnalyticsService
+from app.services.export_service import EXPORT_FORMATS, ExportService, parse_entities
+from app.config import settings
+from app.core.http_cache import freshness_headers, is_not_modified
+from app.db.repositories.page_repo import PageRepository, normalize, page_projection
 from app.db.repositories.post_repo import PostRepository
 from app.db.repositories.employee_repo import EmployeeRepository
 from app.db.repositories.comment_repo import CommentRepository
 from app.db.repositories.follower_repo import FollowerRepository
-from app.utils.pagination import get_pagination
-from app.utils.mongo_serializer import serialize_mongo
+from app.db.repositories.metrics_repo import MetricsRepository, to_utc
+from app.utils.pagination import get_pagination, get_keyset_limit, decode_cursor, keyset_page
+from app.utils.projection import build_projection, parse_fields
+from app.utils.responses import json_response, sse_event
 
 router = APIRouter()
 
+# Every endpoint accepts `fields=a,b,c`, applied as a Mongo projection.
+# `_id` is never returned.
+
+
+def _cursor_response(items: list, next_cursor: Optional[str]):
+    for item in items:
+        item.pop("_id", None)  # fetched only to build the cursor
+    return json_response({"items": items, "next_cursor": next_cursor})
+
 
 # ✅ STATIC ROUTES FIRST
 @router.get("/pages/search")
 async def search_pages(
     industry: Optional[str] = None,
     name: Optional[str] = None,
+    q: Optional[str] = None,
+    mode: Literal["regex", "prefix", "text"] = "regex",
     min_followers: int = 0,
     max_followers: int = 1_000_000,
     page: int = 1,
     limit: int = 10,
+    facets: bool = False,
+    fields: Optional[str] = None,
 ):
+    """
+    Search modes:
+    - regex: case-insensitive substring match (legacy; scans the collection)
+    - prefix: case-insensitive prefix match on indexed normalized fields
+    - text: $text search over name/industry (`q`, or name + industry), ranked by relevance
+    `facets=true` wraps the results with the total match count and industry counts.
+    """
     query = {"followers": {"$gte": min_followers, "$lte": max_followers}}
-    if industry:
-        query["industry"] = {"$regex": industry, "$options": "i"}
-    if name:
-        query["name"] = {"$regex": name, "$options": "i"}
+    if mode == "text":
+        terms = q or " ".join(term for term in (name, industry) if term)
+        if not terms:
+            raise HTTPException(status_code=422, detail="Text search needs q, name or industry")
+        query["$text"] = {"$search": terms}
+    elif mode == "prefix":
+        if industry:
+            query["industry_norm"] = {"$regex": f"^{re.escape(normalize(industry))}"}
+        if name:
+            query["name_norm"] = {"$regex": f"^{re.escape(normalize(name))}"}
+    else:
+        if industry:
+            query["industry"] = {"$regex": industry, "$options": "i"}
+        if name:
+            query["name"] = {"$regex": name, "$options": "i"}
 
     skip, limit = get_pagination(page, limit)
-    pages = await PageRepository().search(query, skip, limit)
-    return serialize_mongo(pages)
+    projection = page_projection(parse_fields(fields))
+    repo = PageRepository()
+    if facets:
+        result = await repo.search_with_facets(query, skip, limit, ranked=mode == "text", projection=projection)
+        return json_response(result)
+    if mode == "text":
+        pages = await repo.search_ranked(query, skip, limit, projection=projection)
+    else:
+        pages = await repo.search(query, skip, limit, projection=projection)
+    return json_response(pages)
+
+
+@router.post("/pages/refresh", status_code=202)
+async def refresh_pages(request: RefreshRequest):
+    page_ids = request.all_page_ids()
+    if not page_ids:
+        raise HTTPException(status_code=422, detail="Provide page_id or page_ids")
+    if len(page_ids) > settings.REFRESH_MAX_PAGE_IDS:
+        raise HTTPException(status_code=422, detail=f"At most {settings.REFRESH_MAX_PAGE_IDS} page IDs per request")
+    return await JobService().enqueue_refresh(page_ids)
 
 
+@router.post("/pages/batch")
+async def get_pages_batch(request: BatchPagesRequest, fields: Optional[str] = None):
+    page_ids = list(dict.fromkeys(pid.strip() for pid in request.page_ids if pid.strip()))
+    if len(page_ids) > settings.BATCH_MAX_PAGE_IDS:
+        raise HTTPException(status_code=422, detail=f"At most {settings.BATCH_MAX_PAGE_IDS} page IDs per request")
+
+    result = await PageService().get_pages(page_ids, fields=parse_fields(fields))
+    result["jobs"] = None
+    if request.scrape_missing and result["missing"]:
+        result["jobs"] = await JobService().enqueue_refresh(result["missing"])
+    return json_response(result)
+
+
+# Passing `cursor` (empty for the first page) switches a list endpoint from
+# page numbers to keyset pagination: {"items": [...], "next_cursor": "..."}.
 @router.get("/pages/{page_id}/posts")
-async def get_posts(page_id: str, page: int = 1, limit: int = 15):
+async def get_posts(
+    page_id: str,
+    page: int = 1,
+    limit: int = 15,
+    cursor: Optional[str] = None,
+    fields: Optional[str] = None,
+):
+    repo = PostRepository()
+    if cursor is not None:
+        limit = get_keyset_limit(limit)
+        projection = build_projection(parse_fields(fields), always=["posted_at", "post_id"])
+        posts = await repo.get_recent_after(page_id, decode_cursor(cursor, datetime, str), limit + 1, projection=projection)
+        items, next_cursor = keyset_page(posts, limit, lambda p: (p["posted_at"], p["post_id"]))
+        return _cursor_response(items, next_cursor)
+
     skip, limit = get_pagination(page, limit)
-    posts = await PostRepository().get_recent(page_id, skip, limit)
-    return serialize_mongo(posts)
+    posts = await repo.get_recent(page_id, skip, limit, projection=build_projection(parse_fields(fields)))
+    return json_response(posts)
+
+
+@router.get("/pages/{page_id}/feed")
+async def get_feed(
+    page_id: str,
+    page: int = 1,
+    limit: int = 15,
+    comments: int = settings.FEED_COMMENTS_PER_POST,
+):
+    """
+    Posts with their newest `comments` comments each (`top_comments`): two
+    queries whatever the page size, instead of one comment request per post.
+    """
+    skip, limit = get_pagination(page, limit)
+    comments = min(max(comments, 0), settings.FEED_MAX_COMMENTS_PER_POST)
+    return json_response(await PageService().get_feed_json(page_id, skip, limit, comments))
 
 
 @router.get("/pages/{page_id}/employees")
-async def get_employees(page_id: str, page: int = 1, limit: int = 20):
+async def get_employees(
+    page_id: str,
+    page: int = 1,
+    limit: int = 20,
+    cursor: Optional[str] = None,
+    fields: Optional[str] = None,
+):
+    repo = EmployeeRepository()
+    projection = build_projection(parse_fields(fields))
+    if cursor is not None:
+        limit = get_keyset_limit(limit)
+        employees = await repo.get_by_page_after(page_id, decode_cursor(cursor, ObjectId), limit + 1, projection=projection)
+        items, next_cursor = keyset_page(employees, limit, lambda e: (e["_id"],))
+        return _cursor_response(items, next_cursor)
+
     skip, limit = get_pagination(page, limit)
-    employees = await EmployeeRepository().get_by_page(page_id, skip, limit)
-    return serialize_mongo(employees)
+    employees = await repo.get_by_page(page_id, skip, limit, projection=projection)
+    return json_response(employees)
 
 
 @router.get("/pages/{page_id}/comments")
-async def get_comments(page_id: str, post_id: Optional[str] = None, page: int = 1, limit: int = 20):
+async def get_comments(
+    page_id: str,
+    post_id: Optional[str] = None,
+    page: int = 1,
+    limit: int = 20,
+    cursor: Optional[str] = None,
+    fields: Optional[str] = None,
+):
+    repo = CommentRepository()
+    if cursor is not None:
+        limit = get_keyset_limit(limit)
+        projection = build_projection(parse_fields(fields), always=["posted_at", "comment_id"])
+        comments = await repo.get_by_page_after(
+            page_id, decode_cursor(cursor, datetime, str), limit + 1, post_id=post_id, projection=projection
+        )
+        items, next_cursor = keyset_page(comments, limit, lambda c: (c["posted_at"], c["comment_id"]))
+        return _cursor_response(items, next_cursor)
+
     skip, limit = get_pagination(page, limit)
-    comments = await CommentRepository().get_by_page(page_id, skip, limit, post_id=post_id)
-    return serialize_mongo(comments)
+    comments = await repo.get_by_page(
+        page_id, skip, limit, post_id=post_id, projection=build_projection(parse_fields(fields))
+    )
+    return json_response(comments)
 
 
-@router.get("/pages/{page_id}/followers")
-async def get_followers(page_id: str, page: int = 1, limit: int = 25):
+async def _get_relations(
+    page_id: str, relation: str, page: int, limit: int, cursor: Optional[str], fields: Optional[str]
+):
+    repo = FollowerRepository()
+    projection = build_projection(parse_fields(fields))
+    if cursor is not None:
+        limit = get_keyset_limit(limit)
+        docs = await repo.get_by_page_after(page_id, relation, decode_cursor(cursor, ObjectId), limit + 1, projection=projection)
+        items, next_cursor = keyset_page(docs, limit, lambda f: (f["_id"],))
+        return _cursor_response(items, next_cursor)
+
     skip, limit = get_pagination(page, limit)
-    followers = await FollowerRepository().get_by_page(page_id, relation="follower", skip=skip, limit=limit)
-    return serialize_mongo(followers)
+    docs = await repo.get_by_page(page_id, relation=relation, skip=skip, limit=limit, projection=projection)
+    return json_response(docs)
+
+
+@router.get("/pages/{page_id}/followers")
+async def get_followers(
+    page_id: str,
+    page: int = 1,
+    limit: int = 25,
+    cursor: Optional[str] = None,
+    fields: Optional[str] = None,
+):
+    return await _get_relations(page_id, "follower", page, limit, cursor, fields)
 
 
 @router.get("/pages/{page_id}/following")
-async def get_following(page_id: str, page: int = 1, limit: int = 25):
-    skip, limit = get_pagination(page, limit)
-    following = await FollowerRepository().get_by_page(page_id, relation="following", skip=skip, limit=limit)
-    return serialize_mongo(following)
+async def get_following(
+    page_id: str,
+    page: int = 1,
+    limit: int = 25,
+    cursor: Optional[str] = None,
+    fields: Optional[str] = None,
+):
+    return await _get_relations(page_id, "following", page, limit, cursor, fields)
+
+
+@router.get("/pages/{page_id}/analytics")
+async def get_page_analytics(page_id: str):
+    """Engagement summary maintained at ingest: one document read, whatever the post volume."""
+    analytics = await AnalyticsService().get_page_analytics(page_id)
+    if analytics is None:
+        raise HTTPException(status_code=404, detail="Page not found. Fetch page first.")
+    return json_response(analytics)
+
+
+@router.get("/pages/{page_id}/history")
+async def get_page_history(
+    page_id: str,
+    from_: Optional[datetime] = Query(None, alias="from"),
+    to: Optional[datetime] = None,
+    resolution: Literal["raw", "day", "week", "month"] = "day",
+):
+    """
+    Follower / headcount growth from the per-scrape snapshots.
+    Defaults to the last HISTORY_DEFAULT_DAYS days; downsampled in Mongo unless resolution=raw.
+    """
+    end = to_utc(to) if to else datetime.utcnow()
+    start = to_utc(from_) if from_ else end - timedelta(days=settings.HISTORY_DEFAULT_DAYS)
+    if start > end:
+        raise HTTPException(status_code=400, detail="'from' must be before 'to'")
+
+    points = await MetricsRepository().history(page_id, start, end, resolution)
+    return json_response({
+        "page_id": page_id,
+        "from": start,
+        "to": end,
+        "resolution": resolution,
+        "points": points,
+    })
+
+
+@router.get("/pages/{page_id}/export")
+async def export_page(
+    page_id: str,
+    format_: Literal["ndjson", "csv"] = Query("ndjson", alias="format"),
+    entities: Optional[str] = None,
+    gzip: bool = False,
+):
+    """
+    Full dataset of a page (`entities=posts,comments,employees,followers,following`,
+    default all), streamed from Mongo cursors in constant memory. ndjson lines carry
+    an `entity` field; csv is one table with an `entity` column.
+    `gzip=true` compresses on the fly (sent with Content-Encoding: gzip).
+    """
+    try:
+        selected = parse_entities(entities)
+    except ValueError as exc:
+        raise HTTPException(status_code=422, detail=str(exc))
+    if not await PageRepository().get_by_page_id(page_id, projection={"_id": 0, "page_id": 1}):
+        raise HTTPException(status_code=404, detail="Page not found. Fetch page first.")
+
+    filename = re.sub(r"[^\w.-]", "_", page_id)
+    headers = {"Content-Disposition": f'attachment; filename="{filename}.{format_}"'}
+    if gzip:
+        headers["Content-Encoding"] = "gzip"
+    return StreamingResponse(
+        ExportService().stream(page_id, selected, format_, gzip=gzip),
+        media_type=EXPORT_FORMATS[format_],
+        headers=headers,
+    )
 
 
 @router.get("/pages/{page_id}/ai-insights")
 async def get_ai_insights(page_id: str):
-    return await PageService().get_ai_insights(page_id)
+    return json_response(await PageService().get_ai_insights(page_id))
+
+
+@router.get("/pages/{page_id}/ai-insights/stream")
+async def stream_ai_insights(page_id: str):
+    """
+    Server-Sent Events: `token` (raw text deltas), `section` (a completed
+    top-level field), then `done` with the full insights, or `error`.
+    """
+    async def events():
+        try:
+            async for event, data in PageService().stream_ai_insights(page_id):
+                yield sse_event(event, {"text": data} if event == "token" else data)
+        except Exception as exc:
+            yield sse_event("error", {"error": str(exc)})
+
+    return StreamingResponse(
+        events(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
 
 
 # ✅ DYNAMIC ROUTE LAST
 @router.get("/pages/{page_id}")
-async def get_page(page_id: str):
-    return await PageService().get_or_scrape_page(page_id)
+async def get_page(request: Request, page_id: str, fields: Optional[str] = None):
+    """
+    Served per the freshness policy (see PageService.ensure_fresh).
+    `X-Data-Age` is the age in seconds of the scraped data; `X-Data-Stale: 1`
+    means a background re-scrape has been queued.
+    ETag / Last-Modified follow the scrape the data comes from: a matching
+    If-None-Match (or If-Modified-Since) gets a 304 without loading the body.
+    """
+    service = PageService()
+    age, stale, scraped_at = await service.ensure_fresh(page_id)
+    selected = parse_fields(fields)
+    headers = {"X-Data-Age": str(int(age or 0)), "X-Data-Stale": "1" if stale else "0"}
+    if scraped_at is not None:
+        headers.update(freshness_headers(page_etag(page_id, scraped_at, selected), scraped_at, age, stale))
+        if is_not_modified(request.headers, headers["ETag"], scraped_at):
+            return Response(status_code=304, headers=headers)
+
+    body = await service.get_page_json(page_id, fields=selected)
+    return json_response(body, headers=headers)
@@ -0,0 +1,51 @@
+"""
+Backfill pages from a JSONL archive (one scrape payload per line, as produced by
+LinkedInScraperService.scrape_page; `.gz` files are read compressed).
+
+    python -m app.commands.import_pages archive.jsonl
+    python -m app.commands.import_pages archive.jsonl.gz --writers 8 --batch-size 2000
+    python -m app.commands.import_pages archive.jsonl --resume   # continue after a crash
+"""
+import argparse
+import asyncio
+import json
+import logging
+
+from app.db.mongo import connect_to_mongo, close_mongo_connection
+from app.services.import_service import ImportService
+
+
+async def _main(args):
+    logging.basicConfig(level=logging.INFO)
+    await connect_to_mongo()
+    try:
+        service = ImportService(
+            batch_size=args.batch_size,
+            writers=args.writers,
+            checkpoint_every=args.checkpoint_every,
+            rebuild_analytics=not args.skip_analytics,
+        )
+        stats = await service.run(args.path, checkpoint_path=args.checkpoint, resume=args.resume)
+        documents = sum(sum(counts.values()) for counts in stats["collections"].values())
+        stats["documents_per_hour"] = int(documents / stats["seconds"] * 3600) if stats["seconds"] else None
+        print(json.dumps(stats, indent=2))
+    finally:
+        await close_mongo_connection()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("path", help="JSONL file (.jsonl or .jsonl.gz)")
+    parser.add_argument("--batch-size", type=int, default=1000, help="operations per bulk write (default: 1000)")
+    parser.add_argument("--writers", type=int, default=4, help="concurrent bulk writes (default: 4)")
+    parser.add_argument(
+        "--checkpoint-every", type=int, default=5000, help="lines between checkpoints (default: 5000)"
+    )
+    parser.add_argument("--checkpoint", help="checkpoint file (default: <path>.checkpoint)")
+    parser.add_argument("--resume", action="store_true", help="continue from the checkpoint")
+    parser.add_argument(
+        "--skip-analytics",
+        action="store_true",
+        help="do not rebuild page analytics (run app.commands.rebuild_analytics afterwards)",
+    )
+    asyncio.run(_main(parser.parse_args()))
@@ -0,0 +1,35 @@
+"""
+Apply the versioned index migration now and print index drift.
+The API runs it in the background on startup; use this to migrate ahead of a deploy.
+
+    python -m app.commands.migrate_indexes          # only if the stored version is behind
+    python -m app.commands.migrate_indexes --force  # re-apply the current version
+"""
+import argparse
+import asyncio
+import json
+import logging
+
+from app.db.indexes import INDEX_VERSION, ensure_indexes, migration
+from app.db.mongo import connect_to_mongo, close_mongo_connection, mongo
+
+
+async def _main(force: bool):
+    logging.basicConfig(level=logging.INFO)
+    await connect_to_mongo(migrate=False)
+    try:
+        status = await ensure_indexes(mongo.db, force=force)
+        print(json.dumps({
+            "status": status,
+            "version": migration.version,
+            "target_version": INDEX_VERSION,
+            "drift": migration.drift,
+        }, indent=2))
+    finally:
+        await close_mongo_connection()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--force", action="store_true", help="re-apply even if the stored version is current")
+    asyncio.run(_main(parser.parse_args().force))
@@ -0,0 +1,28 @@
+"""
+Recompute materialized page analytics from the posts/comments collections.
+
+    python -m app.commands.rebuild_analytics              # every page
+    python -m app.commands.rebuild_analytics deepsolv ... # selected pages
+"""
+import argparse
+import asyncio
+import logging
+
+from app.db.mongo import connect_to_mongo, close_mongo_connection
+from app.services.analytics_service import AnalyticsService
+
+
+async def _main(page_ids):
+    logging.basicConfig(level=logging.INFO)
+    await connect_to_mongo()
+    try:
+        rebuilt = await AnalyticsService().rebuild(page_ids or None)
+        logging.info("Rebuilt analytics for %d page(s)", rebuilt)
+    finally:
+        await close_mongo_connection()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("page_ids", nargs="*", help="pages to rebuild (default: all)")
+    asyncio.run(_main(parser.parse_args().page_ids))
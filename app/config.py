@@ -10,12 +10,82 @@ class Settings(BaseSettings):
 
     MONGO_URI: str = "mongodb://localhost:27017"
     DB_NAME: str = "linkedin_insights"
+    MONGO_MAX_POOL_SIZE: int = 100
+    MONGO_MIN_POOL_SIZE: int = 0  # kept open (and opened in the background) once connected
+    MONGO_MAX_IDLE_TIME_MS: Optional[int] = None
+    MONGO_SERVER_SELECTION_TIMEOUT_MS: int = 30000
 
     REDIS_URL: str = "redis://localhost:6379"
+    # Per client; None is unbounded. When set, requests over the cap queue for a
+    # free connection for up to REDIS_POOL_TIMEOUT_SECONDS, then fail with ConnectionError.
+    REDIS_MAX_CONNECTIONS: Optional[int] = None
+    REDIS_POOL_TIMEOUT_SECONDS: float = 5.0
+    REDIS_CONNECT_TIMEOUT_SECONDS: Optional[float] = None
+    REDIS_HEALTH_CHECK_INTERVAL_SECONDS: int = 0
+    READINESS_TIMEOUT_SECONDS: float = 1.0  # per dependency ping in /readyz
     CACHE_TTL_SECONDS: int = 300
+    L1_CACHE_MAX_ENTRIES: int = 1024  # 0 disables the in-process layer
+    L1_CACHE_TTL_SECONDS: int = 30
+    CACHE_INVALIDATION_CHANNEL: str = "cache:invalidate"
+    CACHE_CODEC: str = "json"  # json | msgpack (requires the 'msgpack' package)
 
     OPENAI_API_KEY: Optional[str] = None
+    OPENAI_BASE_URL: Optional[str] = None  # e.g. a local stand-in server for tests
+    OPENAI_MODEL: str = "gpt-4o-mini"
+    OPENAI_CONCURRENCY: int = 8
+    OPENAI_TIMEOUT_SECONDS: float = 60.0
+    OPENAI_MAX_RETRIES: int = 2
+    AI_INSIGHTS_CACHE_TTL_SECONDS: int = 86400
     SCRAPE_POST_LIMIT: int = 20
+    SCRAPE_LEASE_SECONDS: int = 30
+    SCRAPE_WAIT_TIMEOUT_SECONDS: int = 45
+    # Freshness of stored pages, by age of last_scraped_at
+    PAGE_SOFT_TTL_SECONDS: int = 6 * 3600  # older: served, and re-scraped in the background
+    PAGE_HARD_TTL_SECONDS: int = 7 * 86400  # older: re-scraped before answering
+    PAGE_REVALIDATE_GUARD_SECONDS: int = 600  # one background re-scrape per page per window
+    ANALYTICS_TOP_POSTS: int = 5
+    HISTORY_DEFAULT_DAYS: int = 365
+    FEED_COMMENTS_PER_POST: int = 3
+    FEED_MAX_COMMENTS_PER_POST: int = 20
+    EXPORT_BATCH_SIZE: int = 1000  # documents per Mongo cursor batch
+    EXPORT_CHUNK_BYTES: int = 64 * 1024  # encoded bytes per streamed chunk
+
+    # HTTP caching and compression (see app/core/http_cache.py)
+    HTTP_MAX_AGE_SECONDS: int = 60  # upper bound for Cache-Control max-age on fresh pages
+    COMPRESSION_MIN_BYTES: int = 1024  # smaller bodies are sent as is
+    COMPRESSION_GZIP_LEVEL: int = 6
+    COMPRESSION_BROTLI_QUALITY: int = 4  # requires the optional 'brotli' package
+
+    # Shared scraper HTTP client
+    SCRAPER_MAX_CONNECTIONS: int = 20
+    SCRAPER_MAX_KEEPALIVE_CONNECTIONS: int = 10
+    SCRAPER_KEEPALIVE_EXPIRY_SECONDS: float = 30.0
+    SCRAPER_CONNECT_TIMEOUT_SECONDS: float = 5.0
+    SCRAPER_READ_TIMEOUT_SECONDS: float = 20.0
+    SCRAPER_HTTP2: bool = False  # requires the optional 'h2' package
+    SCRAPER_CONCURRENCY: int = 10
+    SCRAPER_PARSE_WORKERS: int = 2  # 0 parses in a thread instead of a process pool
+    SCRAPER_HTML_PARSER: str = "auto"  # auto | lxml | html.parser
+
+    # Background scrape jobs
+    # Off by default: each uvicorn worker process would start its own pool.
+    # Run `python -m app.workers.scrape_worker` (the `worker` compose service) instead.
+    SCRAPE_WORKERS_IN_APP: bool = False
+    SCRAPE_WORKER_LEASE_SECONDS: int = 30  # a pool silent this long has its claimed jobs re-queued
+    SCRAPE_WORKER_CONCURRENCY: int = 4
+    SCRAPE_MAX_ATTEMPTS: int = 3
+    SCRAPE_RETRY_BASE_SECONDS: int = 5
+    SCRAPE_RATE_LIMIT_PER_SECOND: int = 2
+    REFRESH_MAX_PAGE_IDS: int = 5000
+    BATCH_MAX_PAGE_IDS: int = 200
+    JOB_TTL_SECONDS: int = 86400
+
+    # Diagnostics (see app/core/profiling.py)
+    SLOW_REQUEST_MS: int = 1000  # 0 disables the slow-request log
+    SLOW_QUERY_MS: int = 200  # 0 disables the slow-query log
+    PROFILE_TOKEN: Optional[str] = None  # requests sending it (X-Profile / ?profile=) are profiled
+    PROFILE_DIR: str = "profiles"
+    PROFILE_INTERVAL_MS: float = 5.0
 
     class Config:
         env_file = ".env"
@@ -1,17 +1,303 @@
-import json
+import asyncio
+import logging
+import time
+import uuid
+from collections import OrderedDict
+from typing import Any, Dict, List, Optional, Tuple
+
 import redis.asyncio as redis
 from app.config import settings
+from app.core.codec import decode_value, dumps_json, encode_value, json_payload
+from app.core.metrics import CACHE_L1_ENTRIES, CACHE_L1_EVICTIONS, CACHE_LOOKUPS, cache_family
+from app.core.profiling import phase
 
-redis_client = redis.from_url(settings.REDIS_URL, decode_responses=True)
+logger = logging.getLogger(__name__)
 
+def _redis_from_settings(decode_responses: bool) -> redis.Redis:
+    """
+    Uncapped by default. With REDIS_MAX_CONNECTIONS set, a BlockingConnectionPool
+    makes callers over the cap wait up to REDIS_POOL_TIMEOUT_SECONDS for a free
+    connection; the default pool would fail them at once ("Too many connections").
+    """
+    options = {
+        "decode_responses": decode_responses,
+        "socket_connect_timeout": settings.REDIS_CONNECT_TIMEOUT_SECONDS,
+        "health_check_interval": settings.REDIS_HEALTH_CHECK_INTERVAL_SECONDS,
+    }
+    if settings.REDIS_MAX_CONNECTIONS:
+        pool = redis.BlockingConnectionPool.from_url(
+            settings.REDIS_URL,
+            max_connections=settings.REDIS_MAX_CONNECTIONS,
+            timeout=settings.REDIS_POOL_TIMEOUT_SECONDS,
+            **options,
+        )
+    else:
+        pool = redis.ConnectionPool.from_url(settings.REDIS_URL, **options)
+    return redis.Redis.from_pool(pool)
 
-async def get_cache(key: str):
-    value = await redis_client.get(key)
-    if value:
-        return json.loads(value)
+
+redis_client = _redis_from_settings(decode_responses=True)
+# Cached values are codec-encoded bytes (see app/core/codec.py)
+redis_bytes_client = _redis_from_settings(decode_responses=False)
+
+# Identifies this worker on the invalidation channel so it ignores its own writes
+_INSTANCE_ID = uuid.uuid4().hex
+
+# Compare-and-delete so a worker never releases a lease it no longer owns
+_RELEASE_LOCK_SCRIPT = """
+if redis.call("get", KEYS[1]) == ARGV[1] then
+    return redis.call("del", KEYS[1])
+end
+return 0
+"""
+
+
+class LocalCache:
+    """
+    Bounded in-process LRU with per-entry TTL (L1, in front of Redis).
+    Values are shared between callers and must be treated as read-only.
+    """
+
+    def __init__(self, max_entries: int, ttl_seconds: int):
+        self.max_entries = max_entries
+        self.ttl_seconds = ttl_seconds
+        self._entries: "OrderedDict[str, Tuple[float, Any]]" = OrderedDict()
+
+    def get(self, key: str) -> Tuple[bool, Any]:
+        entry = self._entries.get(key)
+        if entry is None:
+            return False, None
+
+        expires_at, value = entry
+        if expires_at <= time.monotonic():
+            del self._entries[key]
+            CACHE_L1_EVICTIONS.labels("expired").inc()
+            return False, None
+
+        self._entries.move_to_end(key)
+        return True, value
+
+    def set(self, key: str, value, ttl: int):
+        if self.max_entries <= 0:
+            return
+        ttl = min(ttl, self.ttl_seconds)
+        self._entries[key] = (time.monotonic() + ttl, value)
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+            CACHE_L1_EVICTIONS.labels("capacity").inc()
+
+    def delete(self, key: str):
+        self._entries.pop(key, None)
+
+    def clear(self):
+        self._entries.clear()
+
+    def __len__(self):
+        return len(self._entries)
+
+
+local_cache = LocalCache(settings.L1_CACHE_MAX_ENTRIES, settings.L1_CACHE_TTL_SECONDS)
+CACHE_L1_ENTRIES.set_function(local_cache.__len__)
+
+
+class _Invalidation:
+    task: Optional[asyncio.Task] = None
+
+
+_invalidation = _Invalidation()
+
+
+class CachedValue:
+    """Encoded blob as stored in Redis plus its lazily decoded value."""
+
+    __slots__ = ("blob", "_value", "_decoded")
+
+    def __init__(self, blob: bytes, value: Any = None, decoded: bool = False):
+        self.blob = blob
+        self._value = value
+        self._decoded = decoded
+
+    @property
+    def value(self):
+        if not self._decoded:
+            self._value = decode_value(self.blob)
+            self._decoded = True
+        return self._value
+
+    def json_bytes(self) -> bytes:
+        """JSON bytes for a response: the stored payload when it is JSON already."""
+        payload = json_payload(self.blob)
+        return payload if payload is not None else dumps_json(self.value)
+
+
+def _remember(key: str, blob: bytes) -> CachedValue:
+    entry = CachedValue(blob)
+    local_cache.set(key, entry, settings.L1_CACHE_TTL_SECONDS)
+    return entry
+
+
+async def _get_entry(key: str) -> Optional[CachedValue]:
+    family = cache_family(key)
+    hit, entry = local_cache.get(key)
+    if hit:
+        CACHE_LOOKUPS.labels(family, "l1", "hit").inc()
+        return entry
+    CACHE_LOOKUPS.labels(family, "l1", "miss").inc()
+
+    with phase("cache"):
+        blob = await redis_bytes_client.get(key)
+    if blob:
+        CACHE_LOOKUPS.labels(family, "redis", "hit").inc()
+        return _remember(key, blob)
+
+    CACHE_LOOKUPS.labels(family, "redis", "miss").inc()
     return None
 
 
-async def set_cache(key: str, value, ttl: int = None):
+async def get_cache(key: str):
+    entry = await _get_entry(key)
+    return entry.value if entry else None
+
+
+async def get_cache_raw(key: str) -> Optional[bytes]:
+    """Cached value as JSON bytes, ready to send without a decode/encode pass."""
+    entry = await _get_entry(key)
+    return entry.json_bytes() if entry else None
+
+
+def _family_key(family: str) -> str:
+    return f"{family}:variants"
+
+
+async def set_cache(key: str, value, ttl: int = None, family: Optional[str] = None):
+    """
+    Store `value` under `key`. Keys registered under a `family` (e.g. the
+    field-selection variants of one page) can be dropped together with
+    `invalidate_family`.
+    """
+    ttl = ttl or settings.CACHE_TTL_SECONDS
+    blob = encode_value(value)
+    pipe = redis_bytes_client.pipeline(transaction=False)
+    pipe.set(key, blob, ex=ttl)
+    # Drop stale L1 copies held by other workers
+    pipe.publish(settings.CACHE_INVALIDATION_CHANNEL, f"{_INSTANCE_ID}:{key}")
+    if family:
+        pipe.sadd(_family_key(family), key)
+        pipe.expire(_family_key(family), ttl)
+    with phase("cache"):
+        await pipe.execute()
+    local_cache.set(key, CachedValue(blob, value, decoded=True), ttl)
+
+
+async def invalidate_family(family: str, include_base: bool = False):
+    """Drop every key registered under `family`; `include_base` also drops the key named `family`."""
+    keys = [key.decode() for key in await redis_bytes_client.smembers(_family_key(family))]
+    if include_base:
+        keys.append(family)
+    pipe = redis_bytes_client.pipeline(transaction=False)
+    pipe.delete(_family_key(family), *keys)
+    for key in keys:
+        pipe.publish(settings.CACHE_INVALIDATION_CHANNEL, f"{_INSTANCE_ID}:{key}")
+        local_cache.delete(key)
+    await pipe.execute()
+
+
+async def get_cache_many(keys: List[str]) -> Dict[str, Any]:
+    """L1 lookups, then a single MGET for the rest. Missing keys are omitted."""
+    found = {}
+    remote = []
+    for key in keys:
+        hit, entry = local_cache.get(key)
+        CACHE_LOOKUPS.labels(cache_family(key), "l1", "hit" if hit else "miss").inc()
+        if hit:
+            found[key] = entry.value
+        else:
+            remote.append(key)
+
+    if remote:
+        with phase("cache"):
+            blobs = await redis_bytes_client.mget(remote)
+        for key, blob in zip(remote, blobs):
+            CACHE_LOOKUPS.labels(cache_family(key), "redis", "hit" if blob else "miss").inc()
+            if blob:
+                found[key] = _remember(key, blob).value
+    return found
+
+
+async def set_cache_many(values: Dict[str, Any], ttl: int = None, families: Optional[Dict[str, str]] = None):
+    """
+    Write many keys (and their invalidations) in one pipelined round trip.
+    `families` optionally maps a key to its family (see `set_cache`).
+    """
+    if not values:
+        return
     ttl = ttl or settings.CACHE_TTL_SECONDS
-    await redis_client.set(key, json.dumps(value), ex=ttl)
+    families = families or {}
+    pipe = redis_bytes_client.pipeline(transaction=False)
+    for key, value in values.items():
+        blob = encode_value(value)
+        pipe.set(key, blob, ex=ttl)
+        pipe.publish(settings.CACHE_INVALIDATION_CHANNEL, f"{_INSTANCE_ID}:{key}")
+        if key in families:
+            pipe.sadd(_family_key(families[key]), key)
+            pipe.expire(_family_key(families[key]), ttl)
+        local_cache.set(key, CachedValue(blob, value, decoded=True), ttl)
+    with phase("cache"):
+        await pipe.execute()
+
+
+async def _listen_for_invalidations():
+    while True:
+        pubsub = redis_client.pubsub()
+        try:
+            await pubsub.subscribe(settings.CACHE_INVALIDATION_CHANNEL)
+            # Anything published while we were disconnected is lost: start clean
+            local_cache.clear()
+            async for message in pubsub.listen():
+                if message["type"] != "message":
+                    continue
+                origin, _, key = message["data"].partition(":")
+                if origin != _INSTANCE_ID:
+                    local_cache.delete(key)
+        except asyncio.CancelledError:
+            raise
+        except Exception:
+            logger.exception("Cache invalidation listener failed; reconnecting")
+            await asyncio.sleep(1)
+        finally:
+            await pubsub.aclose()
+
+
+async def start_cache_invalidation():
+    if settings.L1_CACHE_MAX_ENTRIES > 0 and _invalidation.task is None:
+        _invalidation.task = asyncio.create_task(_listen_for_invalidations())
+
+
+async def stop_cache_invalidation():
+    if _invalidation.task:
+        _invalidation.task.cancel()
+        try:
+            await _invalidation.task
+        except asyncio.CancelledError:
+            pass
+        _invalidation.task = None
+
+
+async def acquire_lock(key: str, ttl_ms: int) -> Optional[str]:
+    """
+    Take a lease on `key` for `ttl_ms` milliseconds.
+    Returns the owner token, or None if another worker holds the lease.
+    """
+    token = uuid.uuid4().hex
+    if await redis_client.set(key, token, nx=True, px=ttl_ms):
+        return token
+    return None
+
+
+async def release_lock(key: str, token: str):
+    await redis_client.eval(_RELEASE_LOCK_SCRIPT, 1, key, token)
+
+
+async def lock_exists(key: str) -> bool:
+    return bool(await redis_client.exists(key))
@@ -0,0 +1,85 @@
+import json
+import logging
+from datetime import date, datetime
+from typing import Any, Optional
+
+from bson import ObjectId
+
+from app.config import settings
+
+logger = logging.getLogger(__name__)
+
+try:
+    import orjson
+except ImportError:  # optional speedup
+    orjson = None
+
+try:
+    import msgpack
+except ImportError:  # optional binary codec
+    msgpack = None
+
+# Cached blobs start with <format tag><format version>; payload follows.
+# Values written before codecs existed are bare JSON text and still decode.
+JSON_TAG = b"j"
+MSGPACK_TAG = b"m"
+FORMAT_VERSION = b"\x01"
+HEADER_SIZE = 2
+
+
+def _default(obj):
+    if isinstance(obj, ObjectId):
+        return str(obj)
+    if isinstance(obj, (datetime, date)):
+        return obj.isoformat()
+    raise TypeError(f"Type is not JSON serializable: {type(obj).__name__}")
+
+
+def dumps_json(value: Any, sort_keys: bool = False) -> bytes:
+    """Compact JSON bytes; datetimes become ISO strings like serialize_mongo."""
+    if orjson is not None:
+        return orjson.dumps(value, default=_default, option=orjson.OPT_SORT_KEYS if sort_keys else None)
+    return json.dumps(value, default=_default, separators=(",", ":"), sort_keys=sort_keys).encode()
+
+
+def loads_json(payload: bytes) -> Any:
+    if orjson is not None:
+        return orjson.loads(payload)
+    return json.loads(payload)
+
+
+def _resolve_codec() -> bytes:
+    if settings.CACHE_CODEC == "msgpack":
+        if msgpack is not None:
+            return MSGPACK_TAG
+        logger.warning("CACHE_CODEC=msgpack but the 'msgpack' package is not installed; using JSON")
+    return JSON_TAG
+
+
+_codec_tag = _resolve_codec()
+
+
+def encode_value(value: Any) -> bytes:
+    if _codec_tag == MSGPACK_TAG:
+        return MSGPACK_TAG + FORMAT_VERSION + msgpack.packb(value, default=_default, use_bin_type=True)
+    return JSON_TAG + FORMAT_VERSION + dumps_json(value)
+
+
+def decode_value(blob: bytes) -> Any:
+    tag, version = blob[:1], blob[1:HEADER_SIZE]
+    if version == FORMAT_VERSION:
+        if tag == JSON_TAG:
+            return loads_json(blob[HEADER_SIZE:])
+        if tag == MSGPACK_TAG:
+            if msgpack is None:
+                raise RuntimeError("Cached value is msgpack-encoded but 'msgpack' is not installed")
+            return msgpack.unpackb(blob[HEADER_SIZE:], raw=False)
+    # Legacy: bare JSON text
+    return loads_json(blob)
+
+
+def json_payload(blob: bytes) -> Optional[bytes]:
+    """The JSON bytes inside `blob` if it can be served as-is, else None."""
+    if blob[:1] == JSON_TAG and blob[1:HEADER_SIZE] == FORMAT_VERSION:
+        return blob[HEADER_SIZE:]
+    return None
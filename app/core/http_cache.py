@@ -0,0 +1,229 @@
+"""
+Conditional requests and response compression:
+- GET /pages/{id} is versioned by the page's last_scraped_at: a strong ETag and
+  Last-Modified derived from it, and Cache-Control from its freshness. A matching
+  If-None-Match / If-Modified-Since is answered 304 before the body is loaded.
+- ConditionalGetMiddleware gives every other JSON GET response an ETag hashed
+  from its body and turns a matching If-None-Match into a 304 without a body.
+- CompressionMiddleware gzip- or brotli-encodes (brotli when the optional
+  'brotli' package is installed) bodies of COMPRESSION_MIN_BYTES or more, for
+  any method.
+Both only hold back responses that declare a Content-Length, i.e. whose body
+arrives in one message. Streamed responses (exports, SSE) pass straight
+through, headers included.
+"""
+import gzip
+import hashlib
+from datetime import datetime, timezone
+from email.utils import format_datetime, parsedate_to_datetime
+from typing import Dict, Mapping, Optional
+
+from starlette.datastructures import Headers, MutableHeaders
+
+from app.config import settings
+from app.core.profiling import phase
+
+try:
+    import brotli
+except ImportError:  # optional, gzip only without it
+    brotli = None
+
+# A compressed representation keeps the ETag of its source plus `-<coding>`
+# inside the quotes; validators match with or without it.
+_ENCODINGS = ("br", "gzip")
+_COMPRESSIBLE_TYPES = ("application/json", "text/")
+_STREAMING_TYPES = ("text/event-stream",)
+
+
+def strong_etag(data: bytes) -> str:
+    return '"' + hashlib.blake2b(data, digest_size=16).hexdigest() + '"'
+
+
+def _opaque_tag(tag: str) -> str:
+    tag = tag.strip()
+    if tag.startswith("W/"):
+        tag = tag[2:]
+    for coding in _ENCODINGS:
+        suffix = f'-{coding}"'
+        if tag.endswith(suffix):
+            return tag[: -len(suffix)] + '"'
+    return tag
+
+
+def etag_matches(if_none_match: Optional[str], etag: str) -> bool:
+    """Weak comparison, as If-None-Match requires."""
+    if not if_none_match:
+        return False
+    if if_none_match.strip() == "*":
+        return True
+    return any(_opaque_tag(tag) == _opaque_tag(etag) for tag in if_none_match.split(","))
+
+
+def _as_utc(value: datetime) -> datetime:
+    """Stored datetimes are naive UTC; HTTP dates have second precision."""
+    if value.tzinfo is None:
+        value = value.replace(tzinfo=timezone.utc)
+    return value.astimezone(timezone.utc).replace(microsecond=0)
+
+
+def http_date(value: datetime) -> str:
+    return format_datetime(_as_utc(value), usegmt=True)
+
+
+def is_not_modified(request_headers: Mapping[str, str], etag: str, last_modified: Optional[datetime]) -> bool:
+    """If-None-Match decides when present; If-Modified-Since is only used without it."""
+    if "if-none-match" in request_headers:
+        return etag_matches(request_headers["if-none-match"], etag)
+    since = request_headers.get("if-modified-since")
+    if not since or last_modified is None:
+        return False
+    try:
+        return _as_utc(last_modified) <= _as_utc(parsedate_to_datetime(since))
+    except (TypeError, ValueError):
+        return False
+
+
+def freshness_headers(etag: str, last_modified: datetime, age: Optional[float], stale: bool) -> Dict[str, str]:
+    """
+    Validators, plus a max-age running until the data turns stale (capped at
+    HTTP_MAX_AGE_SECONDS). Stale data is `no-cache`: clients revalidate and get
+    304s until the background re-scrape lands.
+    """
+    max_age = 0
+    if age is not None and not stale:
+        max_age = int(min(settings.HTTP_MAX_AGE_SECONDS, settings.PAGE_SOFT_TTL_SECONDS - age))
+    return {
+        "ETag": etag,
+        "Last-Modified": http_date(last_modified),
+        "Cache-Control": f"max-age={max_age}" if max_age > 0 else "no-cache",
+    }
+
+
+class ConditionalGetMiddleware:
+    """
+    ETags for JSON GET responses that did not set one, hashed from the body.
+    This saves egress, not work: the endpoint has already run.
+    """
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or scope["method"] != "GET":
+            await self.app(scope, receive, send)
+            return
+
+        if_none_match = Headers(scope=scope).get("if-none-match")
+        held = {}
+
+        async def send_wrapper(message):
+            if message["type"] == "http.response.start":
+                headers = Headers(raw=message["headers"])
+                if (
+                    message["status"] == 200
+                    and "etag" not in headers
+                    and "content-length" in headers
+                    and headers.get("content-type", "").startswith("application/json")
+                ):
+                    held["start"] = message  # sent once the body is known
+                    return
+            elif message["type"] == "http.response.body" and "start" in held:
+                start = held.pop("start")
+                if not message.get("more_body", False):
+                    headers = MutableHeaders(raw=start["headers"])
+                    headers["ETag"] = strong_etag(message.get("body", b""))
+                    if etag_matches(if_none_match, headers["etag"]):
+                        start = {
+                            "type": "http.response.start",
+                            "status": 304,
+                            "headers": [
+                                (key, value) for key, value in headers.raw
+                                if key not in (b"content-length", b"content-type")
+                            ],
+                        }
+                        message = {"type": "http.response.body", "body": b""}
+                await send(start)
+            await send(message)
+
+        await self.app(scope, receive, send_wrapper)
+
+
+def _preferred_encoding(accept_encoding: str) -> Optional[str]:
+    accepted = {}
+    for item in accept_encoding.split(","):
+        coding, _, params = item.partition(";")
+        quality = 1.0
+        params = params.strip()
+        if params.startswith("q="):
+            try:
+                quality = float(params[2:])
+            except ValueError:
+                quality = 0.0
+        accepted[coding.strip().lower()] = quality
+    for coding in _ENCODINGS:
+        if coding == "br" and brotli is None:
+            continue
+        if accepted.get(coding, accepted.get("*", 0.0)) > 0:
+            return coding
+    return None
+
+
+def compress(body: bytes, coding: str) -> bytes:
+    if coding == "br":
+        return brotli.compress(body, quality=settings.COMPRESSION_BROTLI_QUALITY)
+    return gzip.compress(body, compresslevel=settings.COMPRESSION_GZIP_LEVEL)
+
+
+class CompressionMiddleware:
+    """
+    Compresses single-message text/JSON bodies per Accept-Encoding (br, then gzip),
+    whatever the method (POST /api/pages/batch is the largest response). Responses
+    already encoded (e.g. exports with gzip=true), streamed or SSE responses are
+    left alone and get no Vary.
+    """
+
+    def __init__(self, app, minimum_size: Optional[int] = None):
+        self.app = app
+        self.minimum_size = settings.COMPRESSION_MIN_BYTES if minimum_size is None else minimum_size
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+        coding = _preferred_encoding(Headers(scope=scope).get("accept-encoding", ""))
+        if coding is None:
+            await self.app(scope, receive, send)
+            return
+
+        held = {}
+
+        async def send_wrapper(message):
+            if message["type"] == "http.response.start":
+                headers = Headers(raw=message["headers"])
+                content_type = headers.get("content-type", "")
+                if (
+                    "content-encoding" not in headers
+                    and "content-length" in headers
+                    and content_type.startswith(_COMPRESSIBLE_TYPES)
+                    and not content_type.startswith(_STREAMING_TYPES)
+                ):
+                    MutableHeaders(raw=message["headers"]).add_vary_header("Accept-Encoding")
+                    held["start"] = message
+                    return
+            elif message["type"] == "http.response.body" and "start" in held:
+                start = held.pop("start")
+                body = message.get("body", b"")
+                if not message.get("more_body", False) and len(body) >= self.minimum_size:
+                    with phase("compress"):
+                        body = compress(body, coding)
+                    headers = MutableHeaders(raw=start["headers"])
+                    headers["Content-Encoding"] = coding
+                    headers["Content-Length"] = str(len(body))
+                    etag = headers.get("etag")
+                    if etag and etag.endswith('"'):
+                        headers["ETag"] = f'{etag[:-1]}-{coding}"'
+                    message = {**message, "body": body}
+                await send(start)
+            await send(message)
+
+        await self.app(scope, receive, send_wrapper)
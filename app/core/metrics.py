@@ -0,0 +1,148 @@
+"""
+Prometheus instruments for the hot paths, exposed at GET /metrics.
+
+Label values are always drawn from small fixed sets (route templates, cache
+families, Mongo commands/collections), never from IDs, so series stay bounded.
+Set PROMETHEUS_MULTIPROC_DIR when running several uvicorn workers.
+"""
+import os
+import time
+from typing import Tuple
+
+from prometheus_client import (
+    CONTENT_TYPE_LATEST,
+    CollectorRegistry,
+    Counter,
+    Gauge,
+    Histogram,
+    generate_latest,
+    multiprocess,
+)
+
+# Sub-millisecond cache hits up to slow scrapes / model calls
+_LATENCY_BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60)
+
+HTTP_REQUEST_SECONDS = Histogram(
+    "http_request_duration_seconds",
+    "API request latency by route template",
+    ["method", "route", "status"],
+    buckets=_LATENCY_BUCKETS,
+)
+CACHE_LOOKUPS = Counter(
+    "cache_lookups_total",
+    "Cache lookups by key family, tier (l1, redis) and result (hit, miss)",
+    ["family", "tier", "result"],
+)
+CACHE_L1_EVICTIONS = Counter(
+    "cache_l1_evictions_total",
+    "Entries dropped from the in-process L1 cache by reason (capacity, expired)",
+    ["reason"],
+)
+CACHE_L1_ENTRIES = Gauge("cache_l1_entries", "Entries in the in-process L1 cache", multiprocess_mode="livesum")
+MONGO_COMMAND_SECONDS = Histogram(
+    "mongo_command_duration_seconds",
+    "MongoDB command latency, from the driver's command monitoring",
+    ["command", "collection", "outcome"],
+    buckets=_LATENCY_BUCKETS,
+)
+SCRAPER_FETCH_SECONDS = Histogram(
+    "scraper_fetch_duration_seconds",
+    "LinkedIn page fetch latency by outcome",
+    ["outcome"],
+    buckets=_LATENCY_BUCKETS,
+)
+SCRAPER_PARSE_SECONDS = Histogram(
+    "scraper_parse_duration_seconds",
+    "HTML parse time by parser backend",
+    ["parser"],
+    buckets=_LATENCY_BUCKETS,
+)
+SCRAPER_IN_FLIGHT = Gauge(
+    "scraper_requests_in_flight", "Scraper fetches holding a concurrency slot", multiprocess_mode="livesum"
+)
+SCRAPER_WAITING = Gauge(
+    "scraper_requests_waiting", "Scraper fetches queued for a concurrency slot", multiprocess_mode="livesum"
+)
+SCRAPER_CONNECTIONS = Gauge(
+    "scraper_pool_connections", "Connections open in the shared scraper HTTP pool", multiprocess_mode="livesum"
+)
+SCRAPER_IDLE_CONNECTIONS = Gauge(
+    "scraper_pool_idle_connections", "Kept-alive scraper connections waiting for reuse", multiprocess_mode="livesum"
+)
+SCRAPES = Counter(
+    "scrapes_total",
+    "Page scrapes by outcome (live, unchanged, demo, fallback)",
+    ["outcome"],
+)
+OPENAI_REQUEST_SECONDS = Histogram(
+    "openai_request_duration_seconds",
+    "OpenAI chat completion latency (streams: until the last chunk)",
+    ["model", "mode", "outcome"],
+    buckets=_LATENCY_BUCKETS,
+)
+OPENAI_TOKENS = Counter(
+    "openai_tokens_total",
+    "Tokens reported by OpenAI usage, by kind (prompt, completion)",
+    ["model", "kind"],
+)
+
+
+def cache_family(key: str) -> str:
+    """`page:{id}` -> page, `page:{id}:fields=a,b` -> page_fields, `ai_insights:{hash}` -> ai_insights."""
+    family = key.split(":", 1)[0]
+    return f"{family}_fields" if ":fields=" in key else family
+
+
+def render_metrics() -> Tuple[bytes, str]:
+    """Exposition body and content type for GET /metrics."""
+    if os.environ.get("PROMETHEUS_MULTIPROC_DIR"):
+        registry = CollectorRegistry()
+        multiprocess.MultiProcessCollector(registry)
+        return generate_latest(registry), CONTENT_TYPE_LATEST
+    return generate_latest(), CONTENT_TYPE_LATEST
+
+
+def route_template(scope) -> str:
+    """
+    Matched route as a template (`/api/pages/{page_id}`), never the raw path.
+    Routes from routers included with a prefix may report a path relative to
+    it, so the prefix is taken back from the request path.
+    """
+    route = scope.get("route")
+    if route is None:
+        return "unmatched"
+    template = route.path
+    parts = scope["path"].split("/")
+    prefix = "/".join(parts[: len(parts) - template.count("/")])
+    return prefix + template
+
+
+class RequestMetricsMiddleware:
+    """
+    Plain ASGI middleware (no BaseHTTPMiddleware task/queue overhead) recording
+    latency per route template. The router stores the matched route in the
+    shared scope, so it is read after the app has run.
+    """
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        status = {"code": 500}
+
+        async def send_wrapper(message):
+            if message["type"] == "http.response.start":
+                status["code"] = message["status"]
+            await send(message)
+
+        started = time.perf_counter()
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            HTTP_REQUEST_SECONDS.labels(
+                scope["method"], route_template(scope), str(status["code"])
+            ).observe(time.perf_counter() - started)
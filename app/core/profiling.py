@@ -0,0 +1,305 @@
+"""
+Per-request diagnostics for live traffic:
+
+- Phase timings: code paths wrap their awaits in `phase("cache" | "scrape" | "ai"
+  | "serialize")`, Mongo time is added as "db" by `MongoCommandListener`. Requests over
+  SLOW_REQUEST_MS are logged with their route, phases and slowest query shapes.
+- Slow queries: Mongo commands over SLOW_QUERY_MS are logged with their filter
+  shape (operators and field names, values replaced by "?").
+- Profiling: a request carrying PROFILE_TOKEN (`X-Profile` header or
+  `?profile=`) is sampled and saved as collapsed stacks under PROFILE_DIR, the
+  input format of flamegraph.pl and speedscope.
+
+Phases are wall-clock and can overlap (a scrape includes its own Mongo reads).
+"""
+import asyncio
+import hmac
+import json
+import logging
+import os
+import sys
+import threading
+import time
+import uuid
+from collections import Counter
+from contextlib import contextmanager
+from contextvars import ContextVar
+from datetime import datetime
+from typing import Any, Dict, List, Optional, Tuple
+from urllib.parse import parse_qs
+
+from pymongo import monitoring
+
+from app.config import settings
+from app.core.metrics import MONGO_COMMAND_SECONDS, route_template
+
+logger = logging.getLogger(__name__)
+
+# Slowest queries kept per request for the slow-request log
+_MAX_TRACED_QUERIES = 100
+_LOGGED_QUERIES = 5
+
+
+class RequestTrace:
+    """Phase totals and Mongo commands of one request. Mongo events arrive from driver threads."""
+
+    def __init__(self, scope):
+        self.scope = scope
+        self.phases: Dict[str, float] = {}
+        self.queries: List[Tuple[float, str, str, dict]] = []  # (seconds, command, collection, shape)
+        self._lock = threading.Lock()
+
+    @property
+    def route(self) -> str:
+        # The router stores the matched route in the scope before the endpoint runs
+        return route_template(self.scope)
+
+    def add(self, name: str, seconds: float):
+        with self._lock:
+            self.phases[name] = self.phases.get(name, 0.0) + seconds
+
+    def add_query(self, seconds: float, command: str, collection: str, shape: dict):
+        with self._lock:
+            self.phases["db"] = self.phases.get("db", 0.0) + seconds
+            if len(self.queries) < _MAX_TRACED_QUERIES:
+                self.queries.append((seconds, command, collection, shape))
+
+    def slowest_queries(self, limit: int = _LOGGED_QUERIES) -> List[dict]:
+        with self._lock:
+            queries = sorted(self.queries, key=lambda query: query[0], reverse=True)[:limit]
+        return [
+            {
+                "command": command,
+                "collection": collection,
+                "ms": round(seconds * 1000, 1),
+                "shape": shape,
+            }
+            for seconds, command, collection, shape in queries
+        ]
+
+
+_current_trace: ContextVar[Optional[RequestTrace]] = ContextVar("request_trace", default=None)
+
+
+@contextmanager
+def phase(name: str):
+    """Add the wall time of the block to the current request's `name` phase (no-op outside requests)."""
+    trace = _current_trace.get()
+    if trace is None:
+        yield
+        return
+    started = time.perf_counter()
+    try:
+        yield
+    finally:
+        trace.add(name, time.perf_counter() - started)
+
+
+def query_shape(value: Any) -> Any:
+    """Keys and operators kept, values replaced by "?"; lists collapse to their distinct shapes."""
+    if isinstance(value, dict):
+        return {key: query_shape(item) for key, item in value.items()}
+    if isinstance(value, (list, tuple)):
+        shapes = []
+        for item in value:
+            shape = query_shape(item)
+            if shape not in shapes:
+                shapes.append(shape)
+        return shapes
+    return "?"
+
+
+# Command fields describing what was asked for (documents and values are left out)
+_SHAPE_FIELDS = {
+    "find": ("filter", "sort", "projection"),
+    "aggregate": ("pipeline",),
+    "count": ("query",),
+    "distinct": ("key", "query"),
+    "findAndModify": ("query", "sort"),
+}
+
+
+def command_shape(command: str, document: dict) -> dict:
+    if command in ("update", "delete"):
+        statements = document.get(f"{command}s") or []
+        return {"q": query_shape([statement.get("q") for statement in statements])}
+    return {field: query_shape(document[field]) for field in _SHAPE_FIELDS.get(command, ()) if field in document}
+
+
+class MongoCommandListener(monitoring.CommandListener):
+    """
+    One listener for every command the driver sends:
+    - times it in MONGO_COMMAND_SECONDS by command and collection
+    - adds it to the current request's "db" phase and query shapes
+    - logs it when over SLOW_QUERY_MS
+    Started events carry the command document; the matching succeeded/failed
+    event is found by request ID and only carries the duration. Motor runs the
+    driver in threads with a copy of the calling context, so the started event
+    still sees the request's trace. Only the shape of a command outlives it.
+    """
+
+    # Commands whose first argument is not the collection name
+    _COLLECTION_FIELD = {"getMore": "collection"}
+
+    def __init__(self):
+        self._pending: Dict[Tuple, Tuple[str, str, dict, Optional[RequestTrace]]] = {}
+
+    def started(self, event):
+        field = self._COLLECTION_FIELD.get(event.command_name, event.command_name)
+        collection = event.command.get(field)
+        if not isinstance(collection, str):
+            collection = "-"
+        self._pending[(event.connection_id, event.request_id)] = (
+            event.command_name, collection, event.command, _current_trace.get()
+        )
+
+    def succeeded(self, event):
+        self._finish(event, "ok")
+
+    def failed(self, event):
+        self._finish(event, "error")
+
+    def _finish(self, event, outcome: str):
+        pending = self._pending.pop((event.connection_id, event.request_id), None)
+        if pending is None:
+            return
+        command, collection, document, trace = pending
+        seconds = event.duration_micros / 1e6
+        MONGO_COMMAND_SECONDS.labels(command, collection, outcome).observe(seconds)
+        slow = settings.SLOW_QUERY_MS and seconds * 1000 >= settings.SLOW_QUERY_MS
+        if trace is None and not slow:
+            return
+        shape = command_shape(command, document)
+        if trace is not None:
+            trace.add_query(seconds, command, collection, shape)
+        if slow:
+            logger.warning("slow query %s", json.dumps({
+                "command": command,
+                "collection": collection,
+                "ms": round(seconds * 1000, 1),
+                "shape": shape,
+                "route": trace.route if trace else None,
+            }, default=str))
+
+
+class SamplingProfiler:
+    """
+    Samples one thread's Python stack every `interval` seconds from a daemon
+    thread and counts identical stacks. On the event loop thread this also
+    catches other requests running concurrently, and shows time spent waiting
+    on I/O as the loop's select frame.
+    """
+
+    def __init__(self, thread_id: int, interval: float):
+        self.thread_id = thread_id
+        self.interval = interval
+        self.stacks: Counter = Counter()
+        self._labels: Dict[Any, str] = {}
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, name="request-profiler", daemon=True)
+
+    def start(self):
+        self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+        self._thread.join()
+
+    def _run(self):
+        while not self._stop.wait(self.interval):
+            frame = sys._current_frames().get(self.thread_id)
+            stack = []
+            while frame is not None:
+                stack.append(self._label(frame.f_code))
+                frame = frame.f_back
+            if stack:
+                self.stacks[";".join(reversed(stack))] += 1
+
+    def _label(self, code) -> str:
+        label = self._labels.get(code)
+        if label is None:
+            filename = code.co_filename
+            if filename.startswith(os.getcwd()):
+                filename = os.path.relpath(filename)
+            label = f"{code.co_name} ({filename}:{code.co_firstlineno})".replace(";", ":")
+            self._labels[code] = label
+        return label
+
+    def folded(self) -> str:
+        """Collapsed stacks: `outer;inner count` per line."""
+        return "".join(f"{stack} {count}\n" for stack, count in self.stacks.most_common())
+
+    def write(self, path: str):
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        with open(path, "w") as f:
+            f.write(self.folded())
+
+
+# One profile at a time: concurrent ones would sample the same loop thread
+_profile_lock = threading.Lock()
+
+
+def wants_profile(scope) -> bool:
+    token = settings.PROFILE_TOKEN
+    if not token:
+        return False
+    offered = dict(scope.get("headers") or []).get(b"x-profile", b"").decode("latin-1")
+    if not offered:
+        offered = parse_qs(scope.get("query_string", b"").decode("latin-1")).get("profile", [""])[0]
+    return bool(offered) and hmac.compare_digest(offered, token)
+
+
+def _profile_name(scope) -> str:
+    slug = "-".join(part for part in scope["path"].split("/") if part)[:80] or "root"
+    return f"{datetime.utcnow():%Y%m%dT%H%M%S}-{scope['method']}-{slug}-{uuid.uuid4().hex[:6]}.folded"
+
+
+class RequestTraceMiddleware:
+    """Plain ASGI middleware: opens the request trace, runs the profiler when asked, logs slow requests."""
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        trace = RequestTrace(scope)
+        reset_token = _current_trace.set(trace)
+        profiler, profile_name = None, None
+        if wants_profile(scope) and _profile_lock.acquire(blocking=False):
+            profile_name = _profile_name(scope)
+            profiler = SamplingProfiler(threading.get_ident(), settings.PROFILE_INTERVAL_MS / 1000)
+            profiler.start()
+
+        status = {"code": 500}
+
+        async def send_wrapper(message):
+            if message["type"] == "http.response.start":
+                status["code"] = message["status"]
+                if profile_name:
+                    message["headers"] = list(message.get("headers", [])) + [
+                        (b"x-profile-file", profile_name.encode())
+                    ]
+            await send(message)
+
+        started = time.perf_counter()
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            elapsed = time.perf_counter() - started
+            _current_trace.reset(reset_token)
+            if profiler is not None:
+                profiler.stop()
+                _profile_lock.release()
+                await asyncio.to_thread(profiler.write, os.path.join(settings.PROFILE_DIR, profile_name))
+            if settings.SLOW_REQUEST_MS and elapsed * 1000 >= settings.SLOW_REQUEST_MS:
+                logger.warning("slow request %s", json.dumps({
+                    "method": scope["method"],
+                    "route": trace.route,
+                    "status": status["code"],
+                    "ms": round(elapsed * 1000, 1),
+                    "phases": {name: round(seconds * 1000, 1) for name, seconds in trace.phases.items()},
+                    "queries": trace.slowest_queries(),
+                }, default=str))
@@ -0,0 +1,21 @@
+import asyncio
+import time
+
+from app.core.cache import redis_client
+
+
+async def acquire_rate_slot(bucket: str, per_second: int):
+    """
+    Block until `bucket` has capacity in the current one-second window.
+    The window counter lives in Redis, so the limit holds across all workers.
+    """
+    while True:
+        now = time.time()
+        window = int(now)
+        key = f"ratelimit:{bucket}:{window}"
+        count = await redis_client.incr(key)
+        if count == 1:
+            await redis_client.expire(key, 2)
+        if count <= per_second:
+            return
+        await asyncio.sleep(window + 1 - now)
@@ -0,0 +1,87 @@
+"""
+Readiness, as opposed to liveness (/healthz):
+- At startup a background task pings Mongo and both Redis clients until they all
+  answer. That opens the first pooled connections (server selection, DNS, TLS),
+  so the first real requests do not pay for them.
+- /readyz is 503 until that warm-up is done, then reflects live pings.
+The index migration (app/db/indexes.py) is reported but never blocks readiness.
+"""
+import asyncio
+import logging
+from typing import Dict, Optional, Tuple
+
+from app.config import settings
+from app.core.cache import redis_bytes_client, redis_client
+from app.db.indexes import INDEX_VERSION, migration
+from app.db.mongo import mongo
+
+logger = logging.getLogger(__name__)
+
+
+class _WarmUp:
+    done: bool = False
+    task: Optional[asyncio.Task] = None
+
+
+_warm_up = _WarmUp()
+
+
+async def _ping(check) -> str:
+    try:
+        await asyncio.wait_for(check(), timeout=settings.READINESS_TIMEOUT_SECONDS)
+        return "ok"
+    except Exception as exc:
+        return f"error: {type(exc).__name__}"
+
+
+async def check_dependencies() -> Dict[str, str]:
+    mongo_status, redis_status, redis_bytes_status = await asyncio.gather(
+        _ping(lambda: mongo.client.admin.command("ping")),
+        _ping(redis_client.ping),
+        _ping(redis_bytes_client.ping),
+    )
+    return {"mongo": mongo_status, "redis": redis_status if redis_bytes_status == "ok" else redis_bytes_status}
+
+
+async def _warm():
+    while True:
+        status = await check_dependencies()
+        if all(value == "ok" for value in status.values()):
+            _warm_up.done = True
+            logger.info("Connection pools warmed up")
+            return
+        logger.warning("Warm-up waiting for dependencies: %s", status)
+        await asyncio.sleep(1)
+
+
+def start_warm_up():
+    if _warm_up.task is None:
+        _warm_up.task = asyncio.create_task(_warm())
+
+
+async def stop_warm_up():
+    if _warm_up.task:
+        _warm_up.task.cancel()
+        try:
+            await _warm_up.task
+        except asyncio.CancelledError:
+            pass
+        _warm_up.task = None
+
+
+async def readiness() -> Tuple[bool, dict]:
+    """(ready, report) for /readyz."""
+    dependencies = await check_dependencies() if _warm_up.done else {}
+    ready = _warm_up.done and all(value == "ok" for value in dependencies.values())
+    return ready, {
+        "status": "ready" if ready else "not_ready",
+        "warmed_up": _warm_up.done,
+        "dependencies": dependencies,
+        "indexes": {
+            "status": migration.status,
+            "version": migration.version,
+            "target_version": INDEX_VERSION,
+            "drift": migration.drift,
+            "error": migration.error,
+        },
+    }
@@ -0,0 +1,72 @@
+import asyncio
+from typing import Awaitable, Callable, Dict, Optional
+
+from app.core.cache import acquire_lock, release_lock, lock_exists
+
+
+class SingleFlight:
+    """
+    Collapse concurrent calls for the same key into a single execution.
+    - In-process: callers share one detached task, so cancelling any of
+      them (a client disconnect) does not cancel the work for the others.
+    - Across workers: the leader holds a Redis lease; other workers wait for
+      the lease to go away and then pick up the stored result via `recheck`.
+    """
+
+    POLL_INTERVAL_SECONDS = 0.1
+
+    def __init__(self, namespace: str, lease_seconds: int, wait_timeout_seconds: int):
+        self.namespace = namespace
+        self.lease_ms = lease_seconds * 1000
+        self.wait_timeout = wait_timeout_seconds
+        self._inflight: Dict[str, asyncio.Task] = {}
+
+    async def do(
+        self,
+        key: str,
+        fn: Callable[[], Awaitable],
+        recheck: Optional[Callable[[], Awaitable]] = None,
+    ):
+        task = self._inflight.get(key)
+        if task is None:
+            # Detached from the caller: a dropped leader request must not fail its followers
+            task = asyncio.create_task(self._run_leased(key, fn, recheck))
+            self._inflight[key] = task
+            task.add_done_callback(lambda done: self._finished(key, done))
+        # shield: a cancelled caller (leader included) leaves the work running for the rest
+        return await asyncio.shield(task)
+
+    def _finished(self, key: str, task: asyncio.Task):
+        if self._inflight.get(key) is task:
+            del self._inflight[key]
+        if not task.cancelled():
+            task.exception()  # mark retrieved when every caller has gone away
+
+    async def _run_leased(self, key: str, fn, recheck):
+        lock_key = f"lock:{self.namespace}:{key}"
+        loop = asyncio.get_running_loop()
+        deadline = loop.time() + self.wait_timeout
+
+        while True:
+            token = await acquire_lock(lock_key, self.lease_ms)
+            if token:
+                try:
+                    # Another worker may have finished between our miss and the lease
+                    if recheck:
+                        result = await recheck()
+                        if result is not None:
+                            return result
+                    return await fn()
+                finally:
+                    await release_lock(lock_key, token)
+
+            while await lock_exists(lock_key):
+                if loop.time() >= deadline:
+                    raise asyncio.TimeoutError(f"Timed out waiting for {self.namespace} of '{key}'")
+                await asyncio.sleep(self.POLL_INTERVAL_SECONDS)
+
+            if recheck:
+                result = await recheck()
+                if result is not None:
+                    return result
+            # Lease released (or expired) without a result: try to take it ourselves
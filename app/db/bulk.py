@@ -0,0 +1,109 @@
+import hashlib
+from typing import Dict, Iterable, List, Optional, Tuple
+
+from pymongo import UpdateOne
+
+from app.core.codec import dumps_json
+
+# Written on every scrape without the entity itself changing; never hashed
+VOLATILE_FIELDS = frozenset({"_id", "content_hash", "created_at", "last_scraped_at", "html_fingerprint"})
+
+
+def content_hash(doc: dict) -> str:
+    """Stable hash of a document's scraped content (key order does not matter)."""
+    body = {key: value for key, value in doc.items() if key not in VOLATILE_FIELDS}
+    return hashlib.sha1(dumps_json(body, sort_keys=True)).hexdigest()
+
+
+def hide_hash(projection: Optional[dict]) -> dict:
+    """Exclusion projections also drop `content_hash`; inclusion ones already leave it out."""
+    if not projection:
+        return {"content_hash": 0}
+    if all(value == 0 for value in projection.values()):
+        return {**projection, "content_hash": 0}
+    return projection
+
+
+def upsert_ops(docs: Iterable[dict], key_fields: List[str]) -> List[UpdateOne]:
+    """One upsert per document, matched on its natural key."""
+    return [
+        UpdateOne({field: doc.get(field) for field in key_fields}, {"$set": doc}, upsert=True)
+        for doc in docs
+    ]
+
+
+def older_snapshot(scraped_at) -> dict:
+    """Filter on stored documents from a snapshot before `scraped_at`, or from none recorded."""
+    return {"$or": [{"last_scraped_at": {"$lt": scraped_at}}, {"last_scraped_at": {"$exists": False}}]}
+
+
+def snapshot_upsert_ops(docs: Iterable[dict], key_fields: List[str], scraped_at) -> List[UpdateOne]:
+    """
+    Upserts stamped with their snapshot's `last_scraped_at`, applied only over an
+    older snapshot, whatever order they land in. The natural key must be unique:
+    a document stored from a newer snapshot fails the filter, so the upsert
+    collides with the index (duplicate key = older, skipped).
+    """
+    return [
+        UpdateOne(
+            {**{field: doc.get(field) for field in key_fields}, **older_snapshot(scraped_at)},
+            {"$set": {**doc, "last_scraped_at": scraped_at}},
+            upsert=True,
+        )
+        for doc in docs
+    ]
+
+
+def empty_counts() -> Dict[str, int]:
+    return {"inserted": 0, "updated": 0, "unchanged": 0}
+
+
+def change_ratio(counts: Dict[str, int]) -> float:
+    """Share of the written documents that were inserted or changed."""
+    seen = counts["inserted"] + counts["updated"] + counts["unchanged"]
+    return round((counts["inserted"] + counts["updated"]) / seen, 4) if seen else 0.0
+
+
+async def stored_hashes(collection, docs: List[dict], key_fields: List[str]) -> Dict[Tuple, str]:
+    """
+    Content hashes already stored for these documents, keyed by natural key.
+    One query on the leading key field; composite keys are matched in Python.
+    """
+    lead = key_fields[0]
+    values = list({doc.get(lead) for doc in docs})
+    cursor = collection.find(
+        {lead: {"$in": values}},
+        {"_id": 0, "content_hash": 1, **{field: 1 for field in key_fields}},
+    )
+    return {
+        tuple(stored.get(field) for field in key_fields): stored.get("content_hash")
+        async for stored in cursor
+    }
+
+
+async def bulk_upsert(collection, docs: list, key_fields: List[str]) -> Dict[str, int]:
+    """
+    Unordered bulk upsert of only the documents whose content hash differs
+    from the stored one: safe to replay and a single round trip per write.
+    Returns inserted / updated / unchanged document counts.
+    """
+    if not docs:
+        return empty_counts()
+
+    hashed = [{**doc, "content_hash": content_hash(doc)} for doc in docs]
+    stored = await stored_hashes(collection, hashed, key_fields)
+    changed = [
+        doc for doc in hashed
+        if stored.get(tuple(doc.get(field) for field in key_fields)) != doc["content_hash"]
+    ]
+
+    counts = empty_counts()
+    counts["unchanged"] = len(hashed) - len(changed)
+    if not changed:
+        return counts
+
+    result = await collection.bulk_write(upsert_ops(changed, key_fields), ordered=False)
+    counts["inserted"] = result.upserted_count
+    counts["updated"] = result.modified_count
+    counts["unchanged"] += result.matched_count - result.modified_count
+    return counts
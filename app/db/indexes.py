@@ -0,0 +1,211 @@
+"""
+Versioned index migration. The expected indexes are declared once in INDEXES.
+The version applied is recorded in `schema_migrations`, so workers booting
+against an up-to-date database do a single find_one instead of re-running
+every create_index. When INDEX_VERSION is ahead, one worker holds a lease and
+builds each collection's indexes with one createIndexes command, all collections
+concurrently. Differences between INDEXES and the live indexes are reported
+as drift, never changed automatically.
+"""
+import asyncio
+import logging
+import time
+import uuid
+from datetime import datetime, timedelta
+from typing import Dict, List, Optional
+
+from pymongo import ASCENDING, DESCENDING, TEXT, IndexModel
+from pymongo.errors import DuplicateKeyError
+
+logger = logging.getLogger(__name__)
+
+# Bump whenever INDEXES or the backfill in `_migrate` change
+INDEX_VERSION = 2
+
+INDEXES: Dict[str, List[IndexModel]] = {
+    "pages": [
+        # Unique page_id; text search on name/industry
+        IndexModel("page_id", unique=True),
+        IndexModel([("name", TEXT), ("industry", TEXT)]),
+        # Anchored prefix search on normalized fields, industry + follower range
+        IndexModel([("industry_norm", ASCENDING), ("followers", ASCENDING)]),
+        IndexModel([("name_norm", ASCENDING), ("followers", ASCENDING)]),
+    ],
+    "posts": [
+        # Filter/sort by page and date (post_id breaks ties for keyset pagination)
+        IndexModel([("page_id", ASCENDING), ("posted_at", DESCENDING), ("post_id", DESCENDING)]),
+        IndexModel("post_id", unique=True),
+    ],
+    "comments": [
+        # By page/post, newest first (comment_id breaks ties for keyset pagination)
+        IndexModel("comment_id", unique=True),
+        IndexModel([
+            ("page_id", ASCENDING), ("post_id", ASCENDING), ("posted_at", DESCENDING), ("comment_id", DESCENDING)
+        ]),
+        IndexModel([("page_id", ASCENDING), ("posted_at", DESCENDING), ("comment_id", DESCENDING)]),
+    ],
+    # Lookup by page, keyset on _id; unique natural key, which snapshot upserts rely on
+    "employees": [
+        IndexModel([("page_id", ASCENDING), ("_id", ASCENDING)]),
+        IndexModel([("page_id", ASCENDING), ("name", ASCENDING), ("role", ASCENDING)], unique=True),
+    ],
+    # Content-addressed by the hash of the prompt inputs
+    "ai_insights": [IndexModel("content_hash", unique=True)],
+    # By page + relation, keyset on _id; unique natural key, which snapshot upserts rely on
+    "followers": [
+        IndexModel([("page_id", ASCENDING), ("relation", ASCENDING), ("_id", ASCENDING)]),
+        IndexModel([("page_id", ASCENDING), ("relation", ASCENDING), ("profile_id", ASCENDING)], unique=True),
+    ],
+    # One history bucket per page per month, range-scanned by page
+    "page_metrics": [IndexModel([("page_id", ASCENDING), ("bucket", ASCENDING)], unique=True)],
+    # One materialized summary per page
+    "page_analytics": [IndexModel("page_id", unique=True)],
+}
+
+# Natural keys made unique in v2; racing upserts may have stored a key twice before
+_DEDUPLICATE = {
+    "employees": ["page_id", "name", "role"],
+    "followers": ["page_id", "relation", "profile_id"],
+}
+
+_STATE_ID = "indexes"
+_LEASE_ID = "indexes:lease"
+_LEASE_SECONDS = 600
+
+
+class _IndexMigration:
+    """Outcome of this process's migration, reported by /readyz."""
+    status: str = "pending"  # pending | running | current | skipped | failed
+    version: Optional[int] = None
+    drift: Optional[Dict[str, dict]] = None
+    error: Optional[str] = None
+    task: Optional[asyncio.Task] = None
+
+
+migration = _IndexMigration()
+
+
+async def _take_lease(db, owner: str) -> bool:
+    """Lease stored next to the version; an expired lease (crashed migrator) can be taken over."""
+    now = datetime.utcnow()
+    try:
+        await db.schema_migrations.update_one(
+            {"_id": _LEASE_ID, "until": {"$lt": now}},
+            {"$set": {"owner": owner, "until": now + timedelta(seconds=_LEASE_SECONDS)}},
+            upsert=True,
+        )
+    except DuplicateKeyError:
+        return False
+    return True
+
+
+async def _drop_duplicates(collection, key_fields: List[str]):
+    """Keep the most recently inserted document per natural key."""
+    pipeline = [
+        {"$sort": {"_id": -1}},
+        {"$group": {"_id": {field: f"${field}" for field in key_fields}, "ids": {"$push": "$_id"}}},
+        {"$match": {"ids.1": {"$exists": True}}},
+    ]
+    async for group in collection.aggregate(pipeline, allowDiskUse=True):
+        await collection.delete_many({"_id": {"$in": group["ids"][1:]}})
+
+
+async def _migrate(db):
+    # Backfill the normalized copies the prefix-search indexes are built on
+    await db.pages.update_many(
+        {"name_norm": {"$exists": False}},
+        [{"$set": {
+            "name_norm": {"$toLower": {"$trim": {"input": {"$ifNull": ["$name", ""]}}}},
+            "industry_norm": {"$toLower": {"$trim": {"input": {"$ifNull": ["$industry", ""]}}}},
+        }}],
+    )
+    await asyncio.gather(*(_drop_duplicates(db[name], key) for name, key in _DEDUPLICATE.items()))
+    await asyncio.gather(*(db[name].create_indexes(models) for name, models in INDEXES.items()))
+
+
+async def ensure_indexes(db, force: bool = False) -> str:
+    """
+    Bring indexes up to INDEX_VERSION once, then record drift.
+    Returns "current" (nothing to do or applied here) or "skipped" (another worker holds the lease).
+    """
+    stored = await db.schema_migrations.find_one({"_id": _STATE_ID})
+    migration.version = (stored or {}).get("version")
+    if force or (migration.version or 0) < INDEX_VERSION:
+        owner = uuid.uuid4().hex
+        if not await _take_lease(db, owner):
+            logger.info("Index migration to v%d is running on another worker", INDEX_VERSION)
+            return "skipped"
+        try:
+            started = time.perf_counter()
+            await _migrate(db)
+            await db.schema_migrations.update_one(
+                {"_id": _STATE_ID},
+                {"$set": {"version": INDEX_VERSION, "applied_at": datetime.utcnow()}},
+                upsert=True,
+            )
+            migration.version = INDEX_VERSION
+            logger.info("Indexes migrated to v%d in %.2fs", INDEX_VERSION, time.perf_counter() - started)
+        finally:
+            await db.schema_migrations.delete_one({"_id": _LEASE_ID, "owner": owner})
+
+    migration.drift = await index_drift(db)
+    if migration.drift:
+        logger.warning("Index drift against v%d: %s", INDEX_VERSION, migration.drift)
+    return "current"
+
+
+def _same_index(live: dict, expected: dict) -> bool:
+    if bool(live.get("unique")) != bool(expected.get("unique")):
+        return False
+    # Text indexes are stored under internal _fts/_ftsx keys; compare by name only
+    if TEXT in expected["key"].values():
+        return True
+    return [(field, int(direction)) for field, direction in live["key"]] == list(expected["key"].items())
+
+
+async def index_drift(db) -> Dict[str, dict]:
+    """Per collection: declared indexes that are missing or differ, and live ones nobody declared."""
+    async def compare(name: str, models: List[IndexModel]):
+        live = await db[name].index_information()
+        expected = {model.document["name"]: model.document for model in models}
+        report = {
+            "missing": [index for index in expected if index not in live],
+            "changed": [
+                index for index in expected
+                if index in live and not _same_index(live[index], expected[index])
+            ],
+            "unexpected": [index for index in live if index != "_id_" and index not in expected],
+        }
+        return name, {key: value for key, value in report.items() if value}
+
+    results = await asyncio.gather(*(compare(name, models) for name, models in INDEXES.items()))
+    return {name: report for name, report in results if report}
+
+
+async def _run_in_background(db):
+    migration.status = "running"
+    try:
+        # Another worker is migrating: check back until it has recorded the version
+        while await ensure_indexes(db) == "skipped":
+            await asyncio.sleep(5)
+        migration.status = "current"
+    except Exception as exc:
+        migration.status = "failed"
+        migration.error = str(exc)
+        logger.exception("Index migration failed")
+
+
+def start_index_migration(db):
+    """Migrate without holding up startup; progress is reported by /readyz."""
+    if migration.task is None:
+        migration.task = asyncio.create_task(_run_in_background(db))
+
+
+async def stop_index_migration():
+    if migration.task:
+        migration.task.cancel()
+        try:
+            await migration.task
+        except asyncio.CancelledError:
+            pass
+        migration.task = None
@@ -1,5 +1,7 @@
 from motor.motor_asyncio import AsyncIOMotorClient
 from app.config import settings
+from app.core.profiling import MongoCommandListener
+from app.db.indexes import ensure_indexes
 from typing import Optional
 
 
@@ -11,34 +13,24 @@ class Mongo:
 mongo = Mongo()
 
 
-async def connect_to_mongo():
-    mongo.client = AsyncIOMotorClient(settings.MONGO_URI)
+async def connect_to_mongo(migrate: bool = True):
+    """
+    Create the client (connections are opened lazily by the driver's pool).
+    `migrate=False` leaves index migration to the caller (the API runs it in the background).
+    """
+    mongo.client = AsyncIOMotorClient(
+        settings.MONGO_URI,
+        maxPoolSize=settings.MONGO_MAX_POOL_SIZE,
+        minPoolSize=settings.MONGO_MIN_POOL_SIZE,
+        maxIdleTimeMS=settings.MONGO_MAX_IDLE_TIME_MS,
+        serverSelectionTimeoutMS=settings.MONGO_SERVER_SELECTION_TIMEOUT_MS,
+        event_listeners=[MongoCommandListener()],
+    )
     mongo.db = mongo.client[settings.DB_NAME]
-    await _ensure_indexes()
+    if migrate:
+        await ensure_indexes(mongo.db)
 
 
 async def close_mongo_connection():
     if mongo.client:
         mongo.client.close()
-
-
-async def _ensure_indexes():
-    # Pages: unique page_id; text search on name/industry
-    await mongo.db.pages.create_index("page_id", unique=True)
-    await mongo.db.pages.create_index([
-        ("name", "text"),
-        ("industry", "text")
-    ])
-
-    # Posts: filter/sort by page and date
-    await mongo.db.posts.create_index([("page_id", 1), ("posted_at", -1)])
-    await mongo.db.posts.create_index("post_id", unique=True)
-
-    # Comments: by page/post
-    await mongo.db.comments.create_index([("page_id", 1), ("post_id", 1), ("posted_at", -1)])
-
-    # Employees: lookup by page
-    await mongo.db.employees.create_index("page_id")
-
-    # Followers/Following: by page + relation
-    await mongo.db.followers.create_index([("page_id", 1), ("relation", 1)])
@@ -0,0 +1,19 @@
+from datetime import datetime
+
+from app.db.mongo import mongo
+
+class AIInsightRepository:
+
+    async def get_by_hash(self, content_hash: str):
+        doc = await mongo.db.ai_insights.find_one({"content_hash": content_hash}, {"_id": 0, "insights": 1})
+        return doc["insights"] if doc else None
+
+    async def save(self, page_id: str, content_hash: str, model: str, insights: dict):
+        await mongo.db.ai_insights.update_one(
+            {"content_hash": content_hash},
+            {
+                "$set": {"page_id": page_id, "model": model, "insights": insights},
+                "$setOnInsert": {"created_at": datetime.utcnow()},
+            },
+            upsert=True,
+        )
@@ -0,0 +1,86 @@
+from datetime import datetime
+from typing import Dict, List, Optional
+
+from app.config import settings
+from app.db.mongo import mongo
+
+# Running totals; averages are derived from these on read
+COUNTER_FIELDS = (
+    "post_count",
+    "post_likes",
+    "post_comments",
+    "comment_count",
+    "comment_likes",
+)
+_TOP_POST_FIELDS = ("post_id", "content", "likes", "comments_count", "posted_at")
+
+
+class AnalyticsRepository:
+    """One `page_analytics` document per page, maintained at ingest."""
+
+    async def get(self, page_id: str) -> Optional[dict]:
+        return await mongo.db.page_analytics.find_one({"page_id": page_id}, {"_id": 0})
+
+    async def apply_delta(self, page_id: str, inc: Dict[str, int], posts: List[dict]):
+        """
+        Add counter deltas and merge freshly ingested posts into `top_posts`.
+        Re-ingested posts are pulled first so they are re-ranked on their new likes.
+        """
+        now = datetime.utcnow()
+        top = [{field: post.get(field) for field in _TOP_POST_FIELDS} for post in posts]
+
+        await mongo.db.page_analytics.update_one(
+            {"page_id": page_id},
+            {
+                "$inc": {field: inc.get(field, 0) for field in COUNTER_FIELDS},
+                "$pull": {"top_posts": {"post_id": {"$in": [post["post_id"] for post in top]}}},
+                "$set": {"updated_at": now},
+            },
+            upsert=True,
+        )
+        if top:
+            await mongo.db.page_analytics.update_one(
+                {"page_id": page_id},
+                {"$push": {"top_posts": {
+                    "$each": top,
+                    "$sort": {"likes": -1, "post_id": -1},
+                    "$slice": settings.ANALYTICS_TOP_POSTS,
+                }}},
+            )
+
+    async def rebuild(self, page_id: str) -> dict:
+        """Recompute a page's summary from `posts` and `comments` and replace it."""
+        post_totals = await mongo.db.posts.aggregate([
+            {"$match": {"page_id": page_id}},
+            {"$group": {
+                "_id": None,
+                "post_count": {"$sum": 1},
+                "post_likes": {"$sum": {"$ifNull": ["$likes", 0]}},
+                "post_comments": {"$sum": {"$ifNull": ["$comments_count", 0]}},
+            }},
+        ]).to_list(length=1)
+        comment_totals = await mongo.db.comments.aggregate([
+            {"$match": {"page_id": page_id}},
+            {"$group": {
+                "_id": None,
+                "comment_count": {"$sum": 1},
+                "comment_likes": {"$sum": {"$ifNull": ["$likes", 0]}},
+            }},
+        ]).to_list(length=1)
+        top_posts = await (
+            mongo.db.posts
+            .find({"page_id": page_id}, {"_id": 0, **{field: 1 for field in _TOP_POST_FIELDS}})
+            .sort([("likes", -1), ("post_id", -1)])
+            .limit(settings.ANALYTICS_TOP_POSTS)
+            .to_list(length=settings.ANALYTICS_TOP_POSTS)
+        )
+
+        summary = {"page_id": page_id, **{field: 0 for field in COUNTER_FIELDS}}
+        for totals in post_totals + comment_totals:
+            totals.pop("_id")
+            summary.update(totals)
+        summary["top_posts"] = top_posts
+        summary["updated_at"] = datetime.utcnow()
+
+        await mongo.db.page_analytics.replace_one({"page_id": page_id}, summary, upsert=True)
+        return summary
@@ -1,23 +1,93 @@
-from typing import Optional
+from typing import Dict, List, Optional
 
+from app.db.bulk import bulk_upsert, hide_hash
 from app.db.mongo import mongo
 
+_DEFAULT_PROJECTION = {"_id": 0}
+
 
 class CommentRepository:
 
-    async def bulk_insert(self, comments: list):
-        if comments:
-            await mongo.db.comments.insert_many(comments)
+    async def bulk_upsert(self, comments: list):
+        return await bulk_upsert(mongo.db.comments, comments, ["comment_id"])
+
+    async def get_likes(self, comment_ids: List[str]) -> Dict[str, int]:
+        """Stored likes of the given comments, keyed by comment_id."""
+        if not comment_ids:
+            return {}
+        cursor = mongo.db.comments.find(
+            {"comment_id": {"$in": comment_ids}}, {"_id": 0, "comment_id": 1, "likes": 1}
+        )
+        return {doc["comment_id"]: doc.get("likes", 0) async for doc in cursor}
+
+    async def get_top_for_posts(self, page_id: str, post_ids: List[str], per_post: int) -> Dict[str, List[dict]]:
+        """
+        Newest `per_post` comments of each post, keyed by post_id, in one
+        aggregation. The `$sort` is served by the (page_id, post_id, posted_at,
+        comment_id) index, so documents reach `$group` already in order and
+        `$firstN` keeps K per post without sorting anything in memory.
+        """
+        if not post_ids or per_post <= 0:
+            return {}
+        cursor = mongo.db.comments.aggregate([
+            {"$match": {"page_id": page_id, "post_id": {"$in": post_ids}}},
+            {"$sort": {"post_id": 1, "posted_at": -1, "comment_id": -1}},
+            {"$project": hide_hash(_DEFAULT_PROJECTION)},
+            {"$group": {"_id": "$post_id", "comments": {"$firstN": {"n": per_post, "input": "$$ROOT"}}}},
+        ])
+        return {group["_id"]: group["comments"] async for group in cursor}
 
-    async def get_by_page(self, page_id: str, skip: int, limit: int, post_id: Optional[str] = None):
+    async def get_by_page(
+        self,
+        page_id: str,
+        skip: int,
+        limit: int,
+        post_id: Optional[str] = None,
+        projection: Optional[dict] = None,
+    ):
         query = {"page_id": page_id}
         if post_id:
             query["post_id"] = post_id
         cursor = (
             mongo.db.comments
-            .find(query)
+            .find(query, hide_hash(projection or _DEFAULT_PROJECTION))
             .sort("posted_at", -1)
             .skip(skip)
             .limit(limit)
         )
         return await cursor.to_list(length=limit)
+
+    async def get_by_page_after(
+        self,
+        page_id: str,
+        after: Optional[list],
+        limit: int,
+        post_id: Optional[str] = None,
+        projection: Optional[dict] = None,
+    ):
+        """Keyset page ordered by (posted_at, comment_id) descending."""
+        query = {"page_id": page_id}
+        if post_id:
+            query["post_id"] = post_id
+        if after:
+            posted_at, comment_id = after
+            query["$or"] = [
+                {"posted_at": {"$lt": posted_at}},
+                {"posted_at": posted_at, "comment_id": {"$lt": comment_id}},
+            ]
+        cursor = (
+            mongo.db.comments
+            .find(query, hide_hash(projection or _DEFAULT_PROJECTION))
+            .sort([("posted_at", -1), ("comment_id", -1)])
+            .limit(limit)
+        )
+        return await cursor.to_list(length=limit)
+
+    def iter_by_page(self, page_id: str, batch_size: int):
+        """Every comment of a page, newest first, as a cursor fetched `batch_size` documents at a time."""
+        return (
+            mongo.db.comments
+            .find({"page_id": page_id}, hide_hash(_DEFAULT_PROJECTION))
+            .sort([("posted_at", -1), ("comment_id", -1)])
+            .batch_size(batch_size)
+        )
@@ -1,16 +1,46 @@
+from typing import Optional
+
+from app.db.bulk import bulk_upsert, hide_hash
 from app.db.mongo import mongo
+from app.utils.projection import include_id
+
+_DEFAULT_PROJECTION = {"_id": 0}
 
 class EmployeeRepository:
 
-    async def bulk_insert(self, employees: list):
-        if employees:
-            await mongo.db.employees.insert_many(employees)
+    async def bulk_upsert(self, employees: list):
+        # Employees have no LinkedIn ID; name + role within a page is the natural key
+        return await bulk_upsert(mongo.db.employees, employees, ["page_id", "name", "role"])
 
-    async def get_by_page(self, page_id: str, skip: int, limit: int):
+    async def get_by_page(self, page_id: str, skip: int, limit: int, projection: Optional[dict] = None):
         cursor = (
             mongo.db.employees
-            .find({"page_id": page_id})
+            .find({"page_id": page_id}, hide_hash(projection or _DEFAULT_PROJECTION))
             .skip(skip)
             .limit(limit)
         )
         return await cursor.to_list(length=limit)
+
+    async def get_by_page_after(
+        self, page_id: str, after: Optional[list], limit: int, projection: Optional[dict] = None
+    ):
+        """Keyset page ordered by _id (insertion order); `_id` is always returned for the cursor."""
+        query = {"page_id": page_id}
+        if after:
+            query["_id"] = {"$gt": after[0]}
+        cursor = (
+            mongo.db.employees
+            .find(query, hide_hash(include_id(projection)))
+            .sort("_id", 1)
+            .limit(limit)
+        )
+        return await cursor.to_list(length=limit)
+
+    def iter_by_page(self, page_id: str, batch_size: int):
+        """Every employee of a page in insertion order, as a cursor fetched `batch_size` documents at a time."""
+        return (
+            mongo.db.employees
+            .find({"page_id": page_id}, hide_hash(_DEFAULT_PROJECTION))
+            .sort("_id", 1)
+            .batch_size(batch_size)
+        )
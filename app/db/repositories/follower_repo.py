@@ -1,17 +1,48 @@
+from typing import Optional
+
+from app.db.bulk import bulk_upsert, hide_hash
 from app.db.mongo import mongo
+from app.utils.projection import include_id
+
+_DEFAULT_PROJECTION = {"_id": 0}
 
 class FollowerRepository:
 
-    async def bulk_insert(self, followers: list):
-        if followers:
-            await mongo.db.followers.insert_many(followers)
+    async def bulk_upsert(self, followers: list):
+        return await bulk_upsert(mongo.db.followers, followers, ["page_id", "relation", "profile_id"])
 
-    async def get_by_page(self, page_id: str, relation: str, skip: int, limit: int):
+    async def get_by_page(
+        self, page_id: str, relation: str, skip: int, limit: int, projection: Optional[dict] = None
+    ):
         query = {"page_id": page_id, "relation": relation}
         cursor = (
             mongo.db.followers
-            .find(query)
+            .find(query, hide_hash(projection or _DEFAULT_PROJECTION))
             .skip(skip)
             .limit(limit)
         )
         return await cursor.to_list(length=limit)
+
+    async def get_by_page_after(
+        self, page_id: str, relation: str, after: Optional[list], limit: int, projection: Optional[dict] = None
+    ):
+        """Keyset page ordered by _id (insertion order); `_id` is always returned for the cursor."""
+        query = {"page_id": page_id, "relation": relation}
+        if after:
+            query["_id"] = {"$gt": after[0]}
+        cursor = (
+            mongo.db.followers
+            .find(query, hide_hash(include_id(projection)))
+            .sort("_id", 1)
+            .limit(limit)
+        )
+        return await cursor.to_list(length=limit)
+
+    def iter_by_page(self, page_id: str, relation: str, batch_size: int):
+        """Every follower/following of a page in insertion order, as a cursor fetched `batch_size` at a time."""
+        return (
+            mongo.db.followers
+            .find({"page_id": page_id, "relation": relation}, hide_hash(_DEFAULT_PROJECTION))
+            .sort("_id", 1)
+            .batch_size(batch_size)
+        )
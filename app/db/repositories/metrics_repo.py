@@ -0,0 +1,87 @@
+from datetime import datetime, timezone
+from typing import List, Optional, Tuple
+
+from app.db.mongo import mongo
+
+# Sample fields copied from each scrape into the page's monthly bucket
+METRIC_FIELDS = ("followers", "head_count")
+
+
+def to_utc(value: datetime) -> datetime:
+    """Naive UTC, the form pymongo returns and every other timestamp here uses."""
+    if value.tzinfo is not None:
+        value = value.astimezone(timezone.utc).replace(tzinfo=None)
+    return value
+
+
+def bucket_start(value: datetime) -> datetime:
+    """Buckets are calendar months (UTC)."""
+    return to_utc(value).replace(day=1, hour=0, minute=0, second=0, microsecond=0)
+
+
+def sample_update(page: dict) -> Optional[Tuple[dict, dict]]:
+    """(filter, update) appending the page's current metrics to its monthly bucket, if it has any."""
+    sample = {field: page.get(field) for field in METRIC_FIELDS}
+    if all(value is None for value in sample.values()):
+        return None
+    taken_at = to_utc(page["last_scraped_at"])
+    sample["t"] = taken_at
+    return (
+        {"page_id": page["page_id"], "bucket": bucket_start(taken_at)},
+        {
+            "$push": {"samples": sample},
+            "$inc": {"count": 1},
+            "$min": {"first": taken_at},
+            "$max": {"last": taken_at},
+        },
+    )
+
+
+class MetricsRepository:
+    """
+    Follower / headcount history in `page_metrics`, one document per page per month:
+    {page_id, bucket, count, first, last, samples: [{t, followers, head_count}]}
+    """
+
+    async def record(self, page: dict):
+        update = sample_update(page)
+        if update is not None:
+            await mongo.db.page_metrics.update_one(*update, upsert=True)
+
+    async def history(
+        self, page_id: str, start: datetime, end: datetime, resolution: str
+    ) -> List[dict]:
+        """
+        Samples in [start, end], oldest first. Unless resolution is "raw",
+        samples are grouped by day/week/month and each group reports the
+        last value seen plus its min/max.
+        """
+        start, end = to_utc(start), to_utc(end)
+        pipeline = [
+            # Only the monthly buckets overlapping the range are read
+            {"$match": {"page_id": page_id, "bucket": {"$gte": bucket_start(start), "$lte": end}}},
+            {"$unwind": "$samples"},
+            {"$match": {"samples.t": {"$gte": start, "$lte": end}}},
+            {"$sort": {"samples.t": 1}},
+        ]
+
+        if resolution == "raw":
+            pipeline.append({"$replaceRoot": {"newRoot": "$samples"}})
+            return await mongo.db.page_metrics.aggregate(pipeline).to_list(length=None)
+
+        truncate: dict = {"date": "$samples.t", "unit": resolution}
+        if resolution == "week":
+            truncate["startOfWeek"] = "monday"
+        group: dict = {"_id": {"$dateTrunc": truncate}, "samples": {"$sum": 1}}
+        for field in METRIC_FIELDS:
+            group[field] = {"$last": f"$samples.{field}"}
+            group[f"{field}_min"] = {"$min": f"$samples.{field}"}
+            group[f"{field}_max"] = {"$max": f"$samples.{field}"}
+
+        pipeline += [
+            {"$group": group},
+            {"$sort": {"_id": 1}},
+            {"$set": {"t": "$_id"}},
+            {"$unset": "_id"},
+        ]
+        return await mongo.db.page_metrics.aggregate(pipeline).to_list(length=None)
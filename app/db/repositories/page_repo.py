@@ -1,13 +1,145 @@
+from datetime import datetime
+from typing import List, Optional
+
+from pymongo import UpdateOne
+
+from app.db.bulk import content_hash, older_snapshot
 from app.db.mongo import mongo
+from app.utils.projection import build_projection
+
+# Lowercased copies of name/industry that back prefix search, plus change-detection
+# hashes; never returned to clients
+_HIDDEN_FIELDS = {"name_norm": 0, "industry_norm": 0, "content_hash": 0, "html_fingerprint": 0}
+_DEFAULT_PROJECTION = {"_id": 0, **_HIDDEN_FIELDS}
+
+
+def page_projection(fields: Optional[List[str]]) -> dict:
+    """Projection for a `fields=` selection; page_id is always kept so results can be keyed."""
+    fields = [name for name in fields or [] if name.split(".")[0] not in _HIDDEN_FIELDS]
+    return build_projection(fields, always=["page_id"], exclude=_HIDDEN_FIELDS)
+
+
+def normalize(value: Optional[str]) -> str:
+    return (value or "").strip().lower()
+
+
+def stored_page(page: dict, digest: str) -> dict:
+    """Fields written for a page: its content plus the search/change-detection copies."""
+    fields = {k: v for k, v in page.items() if k not in ("_id", "created_at")}
+    fields["name_norm"] = normalize(page.get("name"))
+    fields["industry_norm"] = normalize(page.get("industry"))
+    fields["content_hash"] = digest
+    return fields
+
+
+def page_upsert_op(page: dict) -> UpdateOne:
+    """
+    Upsert of a full page for bulk writes, applied only over an older snapshot.
+    A stored page scraped at or after `last_scraped_at` fails the filter, so the
+    upsert collides with the unique page_id index (duplicate key = older, skipped).
+    """
+    return UpdateOne(
+        {"page_id": page["page_id"], **older_snapshot(page["last_scraped_at"])},
+        {"$set": stored_page(page, content_hash(page)), "$setOnInsert": {"created_at": datetime.utcnow()}},
+        upsert=True,
+    )
+
 
 class PageRepository:
 
-    async def get_by_page_id(self, page_id: str):
-        return await mongo.db.pages.find_one({"page_id": page_id})
+    async def get_by_page_id(self, page_id: str, projection: Optional[dict] = None):
+        return await mongo.db.pages.find_one({"page_id": page_id}, projection or _DEFAULT_PROJECTION)
+
+    async def get_many(self, page_ids: list, projection: Optional[dict] = None):
+        cursor = mongo.db.pages.find({"page_id": {"$in": page_ids}}, projection or _DEFAULT_PROJECTION)
+        return await cursor.to_list(length=len(page_ids))
+
+    async def all_page_ids(self) -> List[str]:
+        return await mongo.db.pages.distinct("page_id")
+
+    async def get_fingerprint(self, page_id: str) -> Optional[str]:
+        """HTML fingerprint of the last live scrape, if any."""
+        doc = await mongo.db.pages.find_one({"page_id": page_id}, {"_id": 0, "html_fingerprint": 1})
+        return (doc or {}).get("html_fingerprint")
+
+    async def touch(self, page_id: str, scraped_at: datetime):
+        """Record a scrape that found nothing new."""
+        await mongo.db.pages.update_one({"page_id": page_id}, {"$set": {"last_scraped_at": scraped_at}})
 
-    async def create(self, page: dict):
-        await mongo.db.pages.insert_one(page)
+    async def upsert(self, page: dict):
+        """
+        Full write only when the content hash changed; an unchanged page just
+        gets its scrape timestamps bumped (and counts as unchanged).
+        """
+        digest = content_hash(page)
+        bookkeeping = {k: page[k] for k in ("last_scraped_at", "html_fingerprint") if k in page}
+        result = await mongo.db.pages.update_one(
+            {"page_id": page["page_id"], "content_hash": digest}, {"$set": bookkeeping}
+        )
+        if result.matched_count:
+            return {"inserted": 0, "updated": 0, "unchanged": 1}
 
-    async def search(self, query: dict, skip: int, limit: int):
-        cursor = mongo.db.pages.find(query).skip(skip).limit(limit)
+        result = await mongo.db.pages.update_one(
+            {"page_id": page["page_id"]},
+            {"$set": stored_page(page, digest), "$setOnInsert": {"created_at": datetime.utcnow()}},
+            upsert=True,
+        )
+        inserted = int(result.upserted_id is not None)
+        return {
+            "inserted": inserted,
+            "updated": result.modified_count,
+            "unchanged": 1 - inserted - result.modified_count,
+        }
+
+    async def search(self, query: dict, skip: int, limit: int, projection: Optional[dict] = None):
+        cursor = mongo.db.pages.find(query, projection or _DEFAULT_PROJECTION).skip(skip).limit(limit)
+        return await cursor.to_list(length=limit)
+
+    async def search_ranked(self, query: dict, skip: int, limit: int, projection: Optional[dict] = None):
+        """`query` must contain a $text clause; results are ordered by relevance."""
+        projection = {**(projection or _DEFAULT_PROJECTION), "score": {"$meta": "textScore"}}
+        cursor = (
+            mongo.db.pages
+            .find(query, projection)
+            .sort([("score", {"$meta": "textScore"})])
+            .skip(skip)
+            .limit(limit)
+        )
         return await cursor.to_list(length=limit)
+
+    async def search_with_facets(
+        self, query: dict, skip: int, limit: int, ranked: bool = False, projection: Optional[dict] = None
+    ):
+        """
+        One aggregation returning the page of results, the total match count
+        and per-industry counts.
+        """
+        projection = dict(projection or _DEFAULT_PROJECTION)
+        items = []
+        if ranked:
+            items.append({"$addFields": {"score": {"$meta": "textScore"}}})
+            items.append({"$sort": {"score": -1}})
+            if any(value == 1 for value in projection.values()):
+                projection["score"] = 1
+        items += [{"$skip": skip}, {"$limit": limit}, {"$project": projection}]
+
+        pipeline = [
+            {"$match": query},
+            {"$facet": {
+                "items": items,
+                "total": [{"$count": "count"}],
+                "industries": [
+                    {"$group": {"_id": "$industry", "count": {"$sum": 1}}},
+                    {"$sort": {"count": -1}},
+                    {"$limit": 20},
+                ],
+            }},
+        ]
+        result = (await mongo.db.pages.aggregate(pipeline).to_list(length=1))[0]
+        return {
+            "items": result["items"],
+            "total": result["total"][0]["count"] if result["total"] else 0,
+            "facets": {
+                "industry": [{"value": f["_id"], "count": f["count"]} for f in result["industries"]],
+            },
+        }
@@ -1,17 +1,61 @@
+from typing import Dict, List, Optional
+
+from app.db.bulk import bulk_upsert, hide_hash
 from app.db.mongo import mongo
 
+_DEFAULT_PROJECTION = {"_id": 0}
+
 class PostRepository:
 
-    async def bulk_insert(self, posts: list):
-        if posts:
-            await mongo.db.posts.insert_many(posts)
+    async def bulk_upsert(self, posts: list):
+        return await bulk_upsert(mongo.db.posts, posts, ["post_id"])
+
+    async def get_engagement(self, post_ids: List[str]) -> Dict[str, dict]:
+        """Stored likes / comments_count of the given posts, keyed by post_id."""
+        if not post_ids:
+            return {}
+        cursor = mongo.db.posts.find(
+            {"post_id": {"$in": post_ids}}, {"_id": 0, "post_id": 1, "likes": 1, "comments_count": 1}
+        )
+        return {doc["post_id"]: doc async for doc in cursor}
 
-    async def get_recent(self, page_id: str, skip: int, limit: int):
+    async def get_recent(self, page_id: str, skip: int, limit: int, projection: Optional[dict] = None):
         cursor = (
             mongo.db.posts
-            .find({"page_id": page_id})
+            .find({"page_id": page_id}, hide_hash(projection or _DEFAULT_PROJECTION))
             .sort("posted_at", -1)
             .skip(skip)
             .limit(limit)
         )
         return await cursor.to_list(length=limit)
+
+    async def get_recent_after(
+        self, page_id: str, after: Optional[list], limit: int, projection: Optional[dict] = None
+    ):
+        """
+        Keyset page ordered by (posted_at, post_id) descending.
+        `after` is the sort key of the last post already seen.
+        """
+        query = {"page_id": page_id}
+        if after:
+            posted_at, post_id = after
+            query["$or"] = [
+                {"posted_at": {"$lt": posted_at}},
+                {"posted_at": posted_at, "post_id": {"$lt": post_id}},
+            ]
+        cursor = (
+            mongo.db.posts
+            .find(query, hide_hash(projection or _DEFAULT_PROJECTION))
+            .sort([("posted_at", -1), ("post_id", -1)])
+            .limit(limit)
+        )
+        return await cursor.to_list(length=limit)
+
+    def iter_by_page(self, page_id: str, batch_size: int):
+        """Every post of a page, newest first, as a cursor fetched `batch_size` documents at a time."""
+        return (
+            mongo.db.posts
+            .find({"page_id": page_id}, hide_hash(_DEFAULT_PROJECTION))
+            .sort([("posted_at", -1), ("post_id", -1)])
+            .batch_size(batch_size)
+        )
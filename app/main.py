@@ -1,7 +1,18 @@
-from fastapi import FastAPI
+from fastapi import FastAPI, Request, Response
+from fastapi.responses import JSONResponse
 from app.config import settings
+from app.core.metrics import RequestMetricsMiddleware, render_metrics
+from app.core.profiling import RequestTraceMiddleware
+from app.core.http_cache import CompressionMiddleware, ConditionalGetMiddleware
 from app.api.pages import router as pages_router
-from app.db.mongo import connect_to_mongo, close_mongo_connection
+from app.api.jobs import router as jobs_router
+from app.core.readiness import readiness, start_warm_up, stop_warm_up
+from app.db.mongo import mongo, connect_to_mongo, close_mongo_connection
+from app.db.indexes import start_index_migration, stop_index_migration
+from app.core.cache import start_cache_invalidation, stop_cache_invalidation
+from app.services.scraper_service import start_scraper_client, close_scraper_client
+from app.services.ai_service import close_ai_client
+from app.workers.scrape_worker import start_scrape_workers, stop_scrape_workers
 
 app = FastAPI(
     title=settings.PROJECT_NAME,
@@ -9,24 +20,54 @@ app = FastAPI(
 )
 
 
+# Outermost last: ETags are hashed from uncompressed bodies
+app.add_middleware(ConditionalGetMiddleware)
+app.add_middleware(CompressionMiddleware)
+app.add_middleware(RequestTraceMiddleware)
+app.add_middleware(RequestMetricsMiddleware)
+
+
 @app.get("/healthz")
 async def healthz():
     return {"status": "ok"}
 
+
+@app.get("/readyz")
+async def readyz():
+    """503 until connection pools are warmed up and while Mongo or Redis is unreachable."""
+    ready, report = await readiness()
+    return JSONResponse(status_code=200 if ready else 503, content=report)
+
+
+@app.get("/metrics", include_in_schema=False)
+async def metrics():
+    body, content_type = render_metrics()
+    return Response(content=body, media_type=content_type)
+
 @app.on_event("startup")
 async def startup_event():
-    await connect_to_mongo()
+    # Nothing here waits on the network: indexes and pool warm-up run in the background
+    await connect_to_mongo(migrate=False)
+    start_index_migration(mongo.db)
+    start_warm_up()
+    await start_cache_invalidation()
+    await start_scraper_client()
+    await start_scrape_workers()
 
 @app.on_event("shutdown")
 async def shutdown_event():
+    await stop_scrape_workers()
+    await stop_warm_up()
+    await stop_index_migration()
+    await stop_cache_invalidation()
+    await close_scraper_client()
+    await close_ai_client()
     await close_mongo_connection()
 
 app.include_router(pages_router, prefix="/api", tags=["Pages"])
+app.include_router(jobs_router, prefix="/api", tags=["Jobs"])
 
 
-from fastapi import Request
-from fastapi.responses import JSONResponse
-
 @app.exception_handler(Exception)
 async def global_exception_handler(request: Request, exc: Exception):
     return JSONResponse(
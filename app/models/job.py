@@ -0,0 +1,10 @@
+from pydantic import BaseModel, Field
+from typing import List, Optional
+
+class RefreshRequest(BaseModel):
+    page_id: Optional[str] = Field(None, description="Single LinkedIn Page ID")
+    page_ids: List[str] = Field(default_factory=list, description="Many LinkedIn Page IDs")
+
+    def all_page_ids(self) -> List[str]:
+        ids = ([self.page_id] if self.page_id else []) + self.page_ids
+        return list(dict.fromkeys(pid.strip() for pid in ids if pid and pid.strip()))
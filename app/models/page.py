@@ -16,3 +16,8 @@ class Page(BaseModel):
     specialties: List[str]
     created_at: datetime = Field(default_factory=datetime.utcnow)
     last_scraped_at: datetime = Field(default_factory=datetime.utcnow)
+
+
+class BatchPagesRequest(BaseModel):
+    page_ids: List[str] = Field(..., description="LinkedIn Page IDs to fetch")
+    scrape_missing: bool = Field(False, description="Queue background scrapes for pages not stored yet")
@@ -1,23 +1,81 @@
 import asyncio
+import hashlib
 import json
 import logging
-from typing import Dict, Any
+import time
+from typing import AsyncIterator, Dict, Any, Optional, Tuple
 
-from openai import OpenAI
+from openai import AsyncOpenAI
 from app.config import settings
+from app.core.metrics import OPENAI_REQUEST_SECONDS, OPENAI_TOKENS
+from app.core.profiling import phase
+from app.utils.json_stream import JSONSectionScanner
 
 logger = logging.getLogger(__name__)
 
+# Bump when the prompt changes so previously stored insights are not reused
+PROMPT_VERSION = 1
+PROMPT_FIELDS = ("name", "industry", "followers", "head_count", "description", "specialties")
 
-class AIService:
 
-    def __init__(self):
-        if not settings.OPENAI_API_KEY:
+class _AIClient:
+    """Single AsyncOpenAI client (and its connection pool) shared by all requests."""
+    client: Optional[AsyncOpenAI] = None
+    semaphore: Optional[asyncio.Semaphore] = None
+
+
+_ai = _AIClient()
+
+
+def get_ai_client() -> AsyncOpenAI:
+    if _ai.client is None:
+        if not settings.OPENAI_API_KEY and not settings.OPENAI_BASE_URL:
             raise RuntimeError("OPENAI_API_KEY not configured")
+        _ai.client = AsyncOpenAI(
+            # A local stand-in server (OPENAI_BASE_URL) does not need a real key
+            api_key=settings.OPENAI_API_KEY or "stand-in",
+            base_url=settings.OPENAI_BASE_URL,
+            timeout=settings.OPENAI_TIMEOUT_SECONDS,
+            max_retries=settings.OPENAI_MAX_RETRIES,
+        )
+        _ai.semaphore = asyncio.Semaphore(settings.OPENAI_CONCURRENCY)
+    return _ai.client
 
-        self.client = OpenAI(api_key=settings.OPENAI_API_KEY)
 
-    async def generate_page_insights(self, page: Dict[str, Any]) -> Dict[str, Any]:
+async def close_ai_client():
+    if _ai.client is not None:
+        await _ai.client.close()
+        _ai.client = None
+        _ai.semaphore = None
+
+
+def insights_content_hash(page: Dict[str, Any]) -> str:
+    """
+    Hash of everything that determines the generated insights: the page
+    fields fed into the prompt, the model and the prompt version.
+    """
+    material = {
+        "fields": {field: page.get(field) for field in PROMPT_FIELDS},
+        "model": settings.OPENAI_MODEL,
+        "prompt_version": PROMPT_VERSION,
+    }
+    encoded = json.dumps(material, sort_keys=True, default=str, separators=(",", ":"))
+    return hashlib.sha256(encoded.encode()).hexdigest()
+
+
+def _record_usage(usage):
+    if usage is None:
+        return
+    OPENAI_TOKENS.labels(settings.OPENAI_MODEL, "prompt").inc(usage.prompt_tokens or 0)
+    OPENAI_TOKENS.labels(settings.OPENAI_MODEL, "completion").inc(usage.completion_tokens or 0)
+
+
+class AIService:
+
+    def __init__(self):
+        self.client = get_ai_client()
+
+    def _messages(self, page: Dict[str, Any]):
         prompt = f"""
 Analyze the LinkedIn company data below and generate business insights.
 
@@ -28,24 +86,87 @@ Employees: {page.get('head_count')}
 Description: {page.get('description')}
 Specialties: {page.get('specialties')}
 """
+        return [
+            {
+                "role": "system",
+                "content": "You are a senior market analyst. Respond only with valid JSON."
+            },
+            {
+                "role": "user",
+                "content": prompt
+            }
+        ]
 
-        def _call_openai():
-            return self.client.chat.completions.create(
-                model="gpt-4o-mini",
-                messages=[
-                    {
-                        "role": "system",
-                        "content": "You are a senior market analyst. Respond only with valid JSON."
-                    },
-                    {
-                        "role": "user",
-                        "content": prompt
-                    }
-                ],
-                response_format={"type": "json_object"},
-                temperature=0.2,
-            )
-
-        # Run blocking client in a thread to avoid blocking the event loop
-        response = await asyncio.to_thread(_call_openai)
+    async def generate_page_insights(self, page: Dict[str, Any]) -> Dict[str, Any]:
+        with phase("ai"):
+            async with _ai.semaphore:
+                outcome = "error"
+                started = time.perf_counter()
+                try:
+                    response = await self.client.chat.completions.create(
+                        model=settings.OPENAI_MODEL,
+                        messages=self._messages(page),
+                        response_format={"type": "json_object"},
+                        temperature=0.2,
+                    )
+                    outcome = "ok"
+                finally:
+                    OPENAI_REQUEST_SECONDS.labels(settings.OPENAI_MODEL, "complete", outcome).observe(
+                        time.perf_counter() - started
+                    )
+        _record_usage(response.usage)
         return json.loads(response.choices[0].message.content)
+
+    async def stream_page_insights(self, page: Dict[str, Any]) -> AsyncIterator[Tuple[str, Any]]:
+        """
+        Yield ("token", text) for every streamed delta, ("section", {key: value})
+        whenever a top-level JSON field is complete, and finally
+        ("done", insights) with the assembled object.
+        The completion is read by a separate task: the concurrency slot is held
+        while reading from OpenAI, never while a slow client drains the events.
+        """
+        scanner = JSONSectionScanner()
+        parts = []
+        deltas: asyncio.Queue = asyncio.Queue()  # one completion at most
+        reader = asyncio.create_task(self._read_stream(page, deltas))
+        reader.add_done_callback(lambda _: deltas.put_nowait(None))
+        try:
+            while True:
+                delta = await deltas.get()
+                if delta is None:
+                    break
+                parts.append(delta)
+                yield "token", delta
+                for section in scanner.feed(delta):
+                    yield "section", section
+            await reader  # raises if the upstream read failed
+        finally:
+            reader.cancel()  # consumer gone: stop reading and free the slot
+
+        yield "done", json.loads("".join(parts))
+
+    async def _read_stream(self, page: Dict[str, Any], deltas: asyncio.Queue):
+        with phase("ai"):
+            async with _ai.semaphore:
+                outcome = "error"
+                started = time.perf_counter()
+                try:
+                    stream = await self.client.chat.completions.create(
+                        model=settings.OPENAI_MODEL,
+                        messages=self._messages(page),
+                        response_format={"type": "json_object"},
+                        temperature=0.2,
+                        stream=True,
+                        stream_options={"include_usage": True},  # usage arrives in a final, choice-less chunk
+                    )
+                    async for chunk in stream:
+                        if not chunk.choices:
+                            _record_usage(chunk.usage)
+                            continue
+                        if chunk.choices[0].delta.content:
+                            deltas.put_nowait(chunk.choices[0].delta.content)
+                    outcome = "ok"
+                finally:
+                    OPENAI_REQUEST_SECONDS.labels(settings.OPENAI_MODEL, "stream", outcome).observe(
+                        time.perf_counter() - started
+                    )
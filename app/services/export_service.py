@@ -0,0 +1,127 @@
+import csv
+import io
+import zlib
+from datetime import datetime
+from typing import AsyncIterator, List, Optional
+
+from app.config import settings
+from app.core.codec import dumps_json
+from app.db.repositories.comment_repo import CommentRepository
+from app.db.repositories.employee_repo import EmployeeRepository
+from app.db.repositories.follower_repo import FollowerRepository
+from app.db.repositories.post_repo import PostRepository
+
+# Export order, and the CSV columns of each entity (from app/models)
+EXPORT_COLUMNS = {
+    "posts": ["page_id", "post_id", "content", "likes", "comments_count", "posted_at"],
+    "comments": ["page_id", "post_id", "comment_id", "author", "content", "likes", "posted_at"],
+    "employees": ["page_id", "name", "role", "profile_url"],
+    "followers": ["page_id", "profile_id", "name", "profile_url", "relation", "followed_at"],
+    "following": ["page_id", "profile_id", "name", "profile_url", "relation", "followed_at"],
+}
+EXPORT_FORMATS = {"ndjson": "application/x-ndjson", "csv": "text/csv"}
+
+
+def parse_entities(value: Optional[str]) -> List[str]:
+    """`posts,comments` -> entities in export order; empty means all. Unknown names raise ValueError."""
+    if not value:
+        return list(EXPORT_COLUMNS)
+    requested = {name.strip() for name in value.split(",") if name.strip()}
+    unknown = requested - set(EXPORT_COLUMNS)
+    if unknown:
+        raise ValueError(f"Unknown entities: {', '.join(sorted(unknown))}")
+    return [name for name in EXPORT_COLUMNS if name in requested]
+
+
+def _cursor(entity: str, page_id: str, batch_size: int):
+    if entity == "posts":
+        return PostRepository().iter_by_page(page_id, batch_size)
+    if entity == "comments":
+        return CommentRepository().iter_by_page(page_id, batch_size)
+    if entity == "employees":
+        return EmployeeRepository().iter_by_page(page_id, batch_size)
+    relation = "follower" if entity == "followers" else "following"
+    return FollowerRepository().iter_by_page(page_id, relation, batch_size)
+
+
+class _NDJSONEncoder:
+    """One JSON object per line, tagged with its entity."""
+
+    def __init__(self, entities: List[str]):
+        pass
+
+    def header(self) -> bytes:
+        return b""
+
+    def row(self, entity: str, doc: dict) -> bytes:
+        return dumps_json({"entity": entity, **doc}) + b"\n"
+
+
+def _csv_cell(value):
+    if value is None:
+        return ""
+    if isinstance(value, datetime):
+        return value.isoformat()
+    if isinstance(value, (list, dict)):
+        return dumps_json(value).decode()
+    return value
+
+
+class _CSVEncoder:
+    """
+    A single table: an `entity` column, then the union of the selected entities'
+    columns (cells an entity does not have stay empty).
+    """
+
+    def __init__(self, entities: List[str]):
+        self.columns = list(dict.fromkeys(column for entity in entities for column in EXPORT_COLUMNS[entity]))
+        self._buffer = io.StringIO()
+        self._writer = csv.writer(self._buffer)
+
+    def header(self) -> bytes:
+        return self._encode(["entity", *self.columns])
+
+    def row(self, entity: str, doc: dict) -> bytes:
+        return self._encode([entity, *(_csv_cell(doc.get(column)) for column in self.columns)])
+
+    def _encode(self, values: list) -> bytes:
+        self._writer.writerow(values)
+        line = self._buffer.getvalue().encode()
+        self._buffer.seek(0)
+        self._buffer.truncate()
+        return line
+
+
+class ExportService:
+    """
+    Streams a page's stored data straight from Mongo cursors. At most one
+    cursor batch (EXPORT_BATCH_SIZE documents) and one output chunk
+    (EXPORT_CHUNK_BYTES) are held at a time, whatever the page's size.
+    """
+
+    async def stream(
+        self, page_id: str, entities: List[str], fmt: str = "ndjson", gzip: bool = False
+    ) -> AsyncIterator[bytes]:
+        if not gzip:
+            async for chunk in self._encoded(page_id, entities, fmt):
+                yield chunk
+            return
+
+        compressor = zlib.compressobj(6, zlib.DEFLATED, 31)  # wbits 31: gzip container
+        async for chunk in self._encoded(page_id, entities, fmt):
+            compressed = compressor.compress(chunk)
+            if compressed:
+                yield compressed
+        yield compressor.flush()
+
+    async def _encoded(self, page_id: str, entities: List[str], fmt: str) -> AsyncIterator[bytes]:
+        encoder = _CSVEncoder(entities) if fmt == "csv" else _NDJSONEncoder(entities)
+        chunk = bytearray(encoder.header())
+        for entity in entities:
+            async for doc in _cursor(entity, page_id, settings.EXPORT_BATCH_SIZE):
+                chunk += encoder.row(entity, doc)
+                if len(chunk) >= settings.EXPORT_CHUNK_BYTES:
+                    yield bytes(chunk)
+                    chunk.clear()
+        if chunk:
+            yield bytes(chunk)
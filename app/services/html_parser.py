@@ -0,0 +1,67 @@
+# Single-pass extraction of company fields from a LinkedIn "about" page.
+# Module-level functions only, so they can be shipped to a process pool.
+from typing import Any, Dict, Iterable, Optional
+
+from bs4 import BeautifulSoup, NavigableString, Tag
+from bs4.element import CData
+
+_TEXT_TYPES = (NavigableString, CData)
+
+
+def lxml_available() -> bool:
+    try:
+        import lxml  # noqa: F401
+    except ImportError:
+        return False
+    return True
+
+
+def resolve_parser(name: str) -> str:
+    """'auto' picks lxml when installed, falling back to the stdlib parser."""
+    if name == "auto":
+        return "lxml" if lxml_available() else "html.parser"
+    return name
+
+
+def extract_number(text: str, keywords: Iterable[str]) -> Optional[int]:
+    lowered = text.lower()
+    for kw in keywords:
+        idx = lowered.find(kw.lower())
+        if idx != -1:
+            # naive extraction: look ahead for digits
+            tail = text[idx: idx + 50]
+            digits = "".join(ch for ch in tail if ch.isdigit())
+            if digits:
+                return int(digits)
+    return None
+
+
+def parse_company_html(html: str, page_id: str, parser: str = "html.parser") -> Dict[str, Any]:
+    """
+    Build the page fields from one walk over the parsed tree:
+    first <h1> → name, first <p> → description, visible text → counters.
+    """
+    soup = BeautifulSoup(html, parser)
+
+    name_tag = description_tag = None
+    chunks = []
+    for node in soup.descendants:
+        if isinstance(node, Tag):
+            if name_tag is None and node.name == "h1":
+                name_tag = node
+            elif description_tag is None and node.name == "p":
+                description_tag = node
+        elif type(node) in _TEXT_TYPES:
+            # Exact type check skips comments, <script> and <style> strings
+            stripped = node.strip()
+            if stripped:
+                chunks.append(stripped)
+
+    text = " ".join(chunks)
+
+    return {
+        "name": name_tag.get_text(strip=True) if name_tag else page_id.capitalize(),
+        "description": description_tag.get_text(strip=True) if description_tag else None,
+        "followers": extract_number(text, ["followers", "Follower"]) or 0,
+        "head_count": extract_number(text, ["employees", "employee"]) or 0,
+    }
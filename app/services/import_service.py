@@ -0,0 +1,259 @@
+import asyncio
+import gzip
+import json
+import logging
+import os
+import time
+from datetime import datetime, timedelta
+from typing import Dict, List, Optional, Tuple
+
+from pydantic import ValidationError
+from pymongo import UpdateOne
+from pymongo.errors import BulkWriteError
+
+from app.db.bulk import content_hash, snapshot_upsert_ops
+from app.db.mongo import mongo
+from app.db.repositories.metrics_repo import sample_update, to_utc
+from app.db.repositories.page_repo import page_upsert_op
+from app.models.comment import Comment
+from app.models.employee import Employee
+from app.models.follower import Follower
+from app.models.page import Page
+from app.models.post import Post
+from app.services.analytics_service import AnalyticsService
+from app.services.page_service import invalidate_page_cache
+
+logger = logging.getLogger(__name__)
+
+# Payload list -> (collection, model, natural key as in the repositories, default fields)
+_CHILDREN = {
+    "posts": ("posts", Post, ["post_id"], {}),
+    "comments": ("comments", Comment, ["comment_id"], {}),
+    "employees": ("employees", Employee, ["page_id", "name", "role"], {}),
+    "followers_list": ("followers", Follower, ["page_id", "relation", "profile_id"], {"relation": "follower"}),
+    "following_list": ("followers", Follower, ["page_id", "relation", "profile_id"], {"relation": "following"}),
+}
+_NATURAL_KEYS = {collection: key for collection, _, key, _ in _CHILDREN.values()}
+_DUPLICATE_KEY = 11000
+# Duplicate keys there mean "already stored": a document from a newer snapshot, or a history sample
+_DUPLICATE_TOLERANT = ("pages", "page_metrics", *_NATURAL_KEYS)
+
+
+def _validated(model, doc: dict, where: str) -> dict:
+    """Only the model's fields that were given, coerced (ISO strings -> naive UTC datetimes)."""
+    try:
+        fields = model.model_validate(doc).model_dump(exclude_unset=True)
+    except ValidationError as exc:
+        problems = "; ".join(f"{'.'.join(map(str, error['loc']))}: {error['msg']}" for error in exc.errors())
+        raise ValueError(f"{where}: {problems}")
+    return {key: to_utc(value) if isinstance(value, datetime) else value for key, value in fields.items()}
+
+
+def parse_record(
+    record: dict, default_scraped_at: Optional[datetime] = None
+) -> Tuple[dict, Dict[str, List[dict]]]:
+    """
+    Validate one page payload (shape of LinkedInScraperService.scrape_page).
+    Returns the page as `IngestService` stores it and the child documents per
+    collection. Any invalid part rejects the whole record with a ValueError, as
+    does a missing `last_scraped_at` when no `default_scraped_at` is given.
+    """
+    if not isinstance(record, dict):
+        raise ValueError("record is not a JSON object")
+    page = _validated(Page, record, "page")
+    if "last_scraped_at" not in page:
+        if default_scraped_at is None:
+            raise ValueError("page: last_scraped_at: missing")
+        page["last_scraped_at"] = default_scraped_at
+    children: Dict[str, List[dict]] = {}
+    for key, (collection, model, _, defaults) in _CHILDREN.items():
+        if key not in record:
+            continue
+        if not isinstance(record[key], list):
+            raise ValueError(f"{key}: not a list")
+        docs = []
+        for i, doc in enumerate(record[key]):
+            if not isinstance(doc, dict):
+                raise ValueError(f"{key}[{i}]: not an object")
+            docs.append(_validated(model, {**defaults, "page_id": page["page_id"], **doc}, f"{key}[{i}]"))
+        page[key] = docs  # pages keep their scraped lists, as IngestService writes them
+        children.setdefault(collection, []).extend(docs)
+    return page, children
+
+
+class ImportCheckpoint:
+    """Byte offset up to which every record is durably written, saved atomically as JSON."""
+
+    def __init__(self, path: str, source: str):
+        self.path = path
+        self.source = os.path.abspath(source)
+
+    def load(self) -> Tuple[int, dict, Optional[datetime]]:
+        if not os.path.exists(self.path):
+            return 0, {}, None
+        with open(self.path) as f:
+            state = json.load(f)
+        if state.get("source") != self.source:
+            raise ValueError(f"Checkpoint {self.path} belongs to {state.get('source')}, not {self.source}")
+        stamp = state.get("stamp")
+        return state["offset"], state.get("stats", {}), datetime.fromisoformat(stamp) if stamp else None
+
+    def save(self, offset: int, stats: dict, stamp: datetime):
+        tmp = f"{self.path}.tmp"
+        with open(tmp, "w") as f:
+            json.dump({"source": self.source, "offset": offset, "stats": stats, "stamp": stamp.isoformat()}, f)
+        os.replace(tmp, self.path)
+
+
+def archive_stamp(path: str) -> datetime:
+    """Modification time of the archive (naive UTC), the base for records without last_scraped_at."""
+    return datetime.utcfromtimestamp(int(os.path.getmtime(path)))
+
+
+class ImportService:
+    """
+    Backfills pages from a JSONL (or .jsonl.gz) archive, one scrape payload
+    per line, without going through the scraper:
+    - records are validated against app/models; invalid ones are counted and logged
+    - documents are grouped per collection into unordered bulk upserts of
+      `batch_size`, written by `writers` concurrent tasks
+    - every `checkpoint_every` records all writes are drained and the input offset
+      is checkpointed, so a resumed import replays at most one segment (upserts are
+      idempotent); analytics are rebuilt and cached pages dropped for that segment
+    - a page and its posts, comments, employees and followers are only overwritten
+      by a newer snapshot (by last_scraped_at), whatever order concurrent batches
+      land in. Records without one are stamped with the
+      archive's mtime plus their line number in microseconds: later lines count as
+      newer, and a resumed import reproduces the same timestamps
+    Memory is bounded by the open batches plus `writers` queued ones.
+    """
+
+    def __init__(
+        self,
+        batch_size: int = 1000,
+        writers: int = 4,
+        checkpoint_every: int = 5000,
+        rebuild_analytics: bool = True,
+    ):
+        self.batch_size = batch_size
+        self.writers = writers
+        self.checkpoint_every = checkpoint_every
+        self.rebuild_analytics = rebuild_analytics
+        self.stats = {"lines": 0, "records": 0, "rejected": 0, "collections": {}}
+        self._batches: Dict[str, List[UpdateOne]] = {}
+        self._queue: Optional[asyncio.Queue] = None
+        self._error: Optional[BaseException] = None
+        self._stamp: Optional[datetime] = None
+
+    async def run(self, path: str, checkpoint_path: Optional[str] = None, resume: bool = False) -> dict:
+        checkpoint = ImportCheckpoint(checkpoint_path or f"{path}.checkpoint", path)
+        offset = 0
+        if resume:
+            offset, stats, self._stamp = checkpoint.load()
+            self.stats.update(stats)
+            logger.info("Resuming %s at byte %d", path, offset)
+        self._stamp = self._stamp or archive_stamp(path)
+
+        self._queue = asyncio.Queue(maxsize=self.writers)
+        workers = [asyncio.create_task(self._writer()) for _ in range(self.writers)]
+        started = time.perf_counter()
+        segment_pages = set()
+        try:
+            with (gzip.open if path.endswith(".gz") else open)(path, "rb") as f:
+                f.seek(offset)
+                for line in iter(f.readline, b""):
+                    self.stats["lines"] += 1
+                    page_id = await self._add_line(line, self.stats["lines"])
+                    if page_id:
+                        segment_pages.add(page_id)
+                    if self.stats["lines"] % self.checkpoint_every == 0:
+                        await self._sync(segment_pages)
+                        checkpoint.save(f.tell(), self.stats, self._stamp)
+                        segment_pages = set()
+                await self._sync(segment_pages)
+                checkpoint.save(f.tell(), self.stats, self._stamp)
+        finally:
+            for worker in workers:
+                worker.cancel()
+            await asyncio.gather(*workers, return_exceptions=True)
+
+        self.stats["seconds"] = round(time.perf_counter() - started, 2)
+        return self.stats
+
+    async def _add_line(self, line: bytes, line_number: int) -> Optional[str]:
+        if not line.strip():
+            return None
+        try:
+            page, children = parse_record(json.loads(line), self._stamp + timedelta(microseconds=line_number))
+        except ValueError as exc:  # JSONDecodeError included
+            self.stats["rejected"] += 1
+            logger.warning("Rejected record on line %d: %s", line_number, exc)
+            return None
+
+        self.stats["records"] += 1
+        await self._add("pages", page_upsert_op(page))
+        update = sample_update(page)
+        if update is not None:
+            # A replayed segment must not append the same sample twice: an existing
+            # sample makes the upsert collide with the bucket's unique index instead
+            query, change = update
+            query["samples.t"] = {"$ne": page["last_scraped_at"]}
+            await self._add("page_metrics", UpdateOne(query, change, upsert=True))
+        for collection, docs in children.items():
+            hashed = [{**doc, "content_hash": content_hash(doc)} for doc in docs]
+            for op in snapshot_upsert_ops(hashed, _NATURAL_KEYS[collection], page["last_scraped_at"]):
+                await self._add(collection, op)
+        return page["page_id"]
+
+    async def _add(self, collection: str, op: UpdateOne):
+        batch = self._batches.setdefault(collection, [])
+        batch.append(op)
+        if len(batch) >= self.batch_size:
+            await self._submit(collection)
+
+    async def _submit(self, collection: str):
+        ops = self._batches.pop(collection, None)
+        if ops:
+            self._raise_writer_error()
+            await self._queue.put((collection, ops))  # waits while every writer is busy
+
+    async def _sync(self, page_ids: set):
+        """Flush partial batches and wait until everything queued so far is written."""
+        for collection in list(self._batches):
+            await self._submit(collection)
+        await self._queue.join()
+        self._raise_writer_error()
+        if self.rebuild_analytics and page_ids:
+            await AnalyticsService().rebuild(sorted(page_ids))
+        # Same invalidation as a changed scrape, so reads stop serving pre-import data
+        await asyncio.gather(*(invalidate_page_cache(page_id) for page_id in page_ids))
+        logger.info("Imported %d record(s), %d rejected", self.stats["records"], self.stats["rejected"])
+
+    def _raise_writer_error(self):
+        if self._error is not None:
+            raise RuntimeError("Bulk write failed") from self._error
+
+    async def _writer(self):
+        while True:
+            collection, ops = await self._queue.get()
+            try:
+                await self._write(collection, ops)
+            except Exception as exc:
+                self._error = self._error or exc
+            finally:
+                self._queue.task_done()
+
+    async def _write(self, collection: str, ops: List[UpdateOne]):
+        try:
+            result = await mongo.db[collection].bulk_write(ops, ordered=False)
+            details = result.bulk_api_result
+        except BulkWriteError as exc:
+            details = exc.details
+            errors = [error for error in details["writeErrors"] if error["code"] != _DUPLICATE_KEY]
+            if errors or collection not in _DUPLICATE_TOLERANT:
+                raise
+
+        counts = self.stats["collections"].setdefault(collection, {"inserted": 0, "updated": 0, "unchanged": 0})
+        counts["inserted"] += details["nUpserted"]
+        counts["updated"] += details["nModified"]
+        counts["unchanged"] += details["nMatched"] - details["nModified"] + len(details.get("writeErrors", []))
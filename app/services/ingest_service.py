@@ -0,0 +1,97 @@
+import asyncio
+import logging
+from datetime import datetime
+from typing import Dict
+
+from app.db.bulk import empty_counts
+from app.db.repositories.analytics_repo import AnalyticsRepository
+from app.db.repositories.page_repo import PageRepository
+from app.db.repositories.post_repo import PostRepository
+from app.db.repositories.employee_repo import EmployeeRepository
+from app.db.repositories.comment_repo import CommentRepository
+from app.db.repositories.follower_repo import FollowerRepository
+from app.db.repositories.metrics_repo import MetricsRepository
+from app.services.analytics_service import engagement_delta
+
+logger = logging.getLogger(__name__)
+
+
+class IngestService:
+    """
+    Persists a scraped payload (shape of LinkedInScraperService.scrape_page):
+    - Idempotent upserts keyed on natural IDs, so re-scrapes never duplicate
+    - Child documents carry the scrape's last_scraped_at, so an older archive
+      import (see ImportService) cannot overwrite them
+    - One unordered bulk write per collection, all collections in parallel
+    - Follower / headcount sample appended to the page's monthly history bucket
+    - Engagement analytics updated by delta against the previously stored posts/comments
+    """
+
+    def __init__(self):
+        self.page_repo = PageRepository()
+        self.post_repo = PostRepository()
+        self.employee_repo = EmployeeRepository()
+        self.comment_repo = CommentRepository()
+        self.follower_repo = FollowerRepository()
+        self.analytics_repo = AnalyticsRepository()
+        self.metrics_repo = MetricsRepository()
+
+    async def ingest(self, scraped: dict) -> Dict[str, Dict[str, int]]:
+        scraped_at = scraped.setdefault("last_scraped_at", datetime.utcnow())
+        posts = scraped.get("posts", [])
+        comments = scraped.get("comments", [])
+
+        def stamped(docs: list) -> list:
+            return [{**doc, "last_scraped_at": scraped_at} for doc in docs]
+
+        # 📊 What the upserts will overwrite, for the analytics delta
+        stored_posts, stored_comment_likes = await asyncio.gather(
+            self.post_repo.get_engagement([post["post_id"] for post in posts]),
+            self.comment_repo.get_likes([comment["comment_id"] for comment in comments]),
+        )
+
+        page_counts, post_counts, comment_counts, employee_counts, follower_counts, _ = await asyncio.gather(
+            self.page_repo.upsert(scraped),
+            self.post_repo.bulk_upsert(stamped(posts)),
+            self.comment_repo.bulk_upsert(stamped(comments)),
+            self.employee_repo.bulk_upsert(stamped(scraped.get("employees", []))),
+            self.follower_repo.bulk_upsert(
+                stamped(scraped.get("followers_list", []) + scraped.get("following_list", []))
+            ),
+            self.metrics_repo.record(scraped),
+        )
+
+        await self.analytics_repo.apply_delta(
+            scraped["page_id"],
+            engagement_delta(posts, comments, stored_posts, stored_comment_likes),
+            posts,
+        )
+
+        counts = {
+            "pages": page_counts,
+            "posts": post_counts,
+            "comments": comment_counts,
+            "employees": employee_counts,
+            "followers": follower_counts,
+        }
+        total = empty_counts()
+        for collection_counts in counts.values():
+            for key, value in collection_counts.items():
+                total[key] += value
+        counts["total"] = total
+
+        logger.info("Ingested page %s: %s", scraped.get("page_id"), total)
+        return counts
+
+    async def touch(self, page: dict) -> datetime:
+        """
+        A scrape whose HTML matched the stored fingerprint: bump the scrape
+        time and keep the growth history continuous, write nothing else.
+        Returns the new scrape time.
+        """
+        scraped_at = datetime.utcnow()
+        await asyncio.gather(
+            self.page_repo.touch(page["page_id"], scraped_at),
+            self.metrics_repo.record({**page, "last_scraped_at": scraped_at}),
+        )
+        return scraped_at
@@ -0,0 +1,199 @@
+import json
+import uuid
+from datetime import datetime
+from typing import List, Optional
+
+from app.config import settings
+from app.core.cache import redis_client
+
+QUEUE_KEY = "scrape:queue"
+DELAYED_KEY = "scrape:delayed"
+# Set of every worker's processing list; each list is covered by its pool's lease
+PROCESSING_LISTS_KEY = "scrape:processing"
+
+# ZREM + LPUSH in one step: a crash in between cannot lose a due retry
+_PROMOTE_SCRIPT = """
+local due = redis.call("zrangebyscore", KEYS[1], "-inf", ARGV[1], "LIMIT", 0, ARGV[2])
+for _, job_id in ipairs(due) do
+    redis.call("zrem", KEYS[1], job_id)
+    redis.call("lpush", KEYS[2], job_id)
+end
+return #due
+"""
+
+# Move a dead pool's in-flight jobs back to the front of the queue, unless its lease came back
+_REQUEUE_SCRIPT = """
+if redis.call("exists", KEYS[2]) == 1 then
+    return -1
+end
+local moved = 0
+while redis.call("lmove", KEYS[1], KEYS[3], "RIGHT", "RIGHT") do
+    moved = moved + 1
+end
+redis.call("srem", KEYS[4], KEYS[1])
+return moved
+"""
+
+
+def job_key(job_id: str) -> str:
+    return f"scrape:job:{job_id}"
+
+
+def batch_key(batch_id: str) -> str:
+    return f"scrape:batch:{batch_id}"
+
+
+def processing_key(pool_id: str, index: int) -> str:
+    return f"scrape:processing:{pool_id}:{index}"
+
+
+def pool_lease_key(pool_id: str) -> str:
+    return f"scrape:pool:{pool_id}"
+
+
+def _now() -> str:
+    return datetime.utcnow().isoformat()
+
+
+class JobService:
+    """
+    Redis-backed scrape jobs:
+    - Each page refresh is a job hash (status, attempts, result)
+    - Job IDs go through the `scrape:queue` list, retries through the
+      `scrape:delayed` sorted set (score = time the retry becomes due)
+    - A claimed job ID is moved (BLMOVE) into its worker's processing list and
+      stays there until the job is done; jobs of a pool whose lease expired
+      (killed process) are put back on the queue by `requeue_orphans`
+    - Jobs submitted together share a batch for progress reporting
+    """
+
+    async def enqueue_refresh(self, page_ids: List[str]) -> dict:
+        batch_id = uuid.uuid4().hex
+        jobs = [{"job_id": uuid.uuid4().hex, "page_id": page_id} for page_id in page_ids]
+        ttl = settings.JOB_TTL_SECONDS
+        now = _now()
+
+        pipe = redis_client.pipeline(transaction=False)
+        pipe.hset(batch_key(batch_id), mapping={
+            "batch_id": batch_id,
+            "total": len(jobs),
+            "succeeded": 0,
+            "failed": 0,
+            "job_ids": json.dumps([job["job_id"] for job in jobs]),
+            "created_at": now,
+        })
+        pipe.expire(batch_key(batch_id), ttl)
+        for job in jobs:
+            pipe.hset(job_key(job["job_id"]), mapping={
+                **job,
+                "batch_id": batch_id,
+                "status": "queued",
+                "attempts": 0,
+                "created_at": now,
+                "updated_at": now,
+            })
+            pipe.expire(job_key(job["job_id"]), ttl)
+        pipe.lpush(QUEUE_KEY, *[job["job_id"] for job in jobs])
+        await pipe.execute()
+
+        return {"batch_id": batch_id, "jobs": jobs}
+
+    async def get_job(self, job_id: str) -> Optional[dict]:
+        job = await redis_client.hgetall(job_key(job_id))
+        if not job:
+            return None
+        job["attempts"] = int(job.get("attempts", 0))
+        if job.get("result"):
+            job["result"] = json.loads(job["result"])
+        return job
+
+    async def get_batch(self, batch_id: str) -> Optional[dict]:
+        batch = await redis_client.hgetall(batch_key(batch_id))
+        if not batch:
+            return None
+        total = int(batch["total"])
+        succeeded = int(batch["succeeded"])
+        failed = int(batch["failed"])
+        return {
+            "batch_id": batch_id,
+            "total": total,
+            "succeeded": succeeded,
+            "failed": failed,
+            "pending": total - succeeded - failed,
+            "progress": round((succeeded + failed) / total, 4) if total else 1.0,
+            "job_ids": json.loads(batch["job_ids"]),
+            "created_at": batch["created_at"],
+        }
+
+    async def mark_running(self, job_id: str) -> Optional[dict]:
+        if not await redis_client.exists(job_key(job_id)):
+            return None  # expired before a worker got to it
+        pipe = redis_client.pipeline(transaction=False)
+        pipe.hincrby(job_key(job_id), "attempts", 1)
+        pipe.hset(job_key(job_id), mapping={"status": "running", "updated_at": _now()})
+        await pipe.execute()
+        return await self.get_job(job_id)
+
+    async def mark_succeeded(self, job: dict, result: dict):
+        pipe = redis_client.pipeline(transaction=False)
+        pipe.hset(job_key(job["job_id"]), mapping={
+            "status": "succeeded",
+            "result": json.dumps(result),
+            "updated_at": _now(),
+        })
+        pipe.hdel(job_key(job["job_id"]), "error")
+        pipe.hincrby(batch_key(job["batch_id"]), "succeeded", 1)
+        await pipe.execute()
+
+    async def mark_failed(self, job: dict, error: str):
+        pipe = redis_client.pipeline(transaction=False)
+        pipe.hset(job_key(job["job_id"]), mapping={"status": "failed", "error": error, "updated_at": _now()})
+        pipe.hincrby(batch_key(job["batch_id"]), "failed", 1)
+        await pipe.execute()
+
+    async def schedule_retry(self, job: dict, error: str, due_at: float):
+        pipe = redis_client.pipeline(transaction=False)
+        pipe.hset(job_key(job["job_id"]), mapping={"status": "retrying", "error": error, "updated_at": _now()})
+        pipe.zadd(DELAYED_KEY, {job["job_id"]: due_at})
+        await pipe.execute()
+
+    async def promote_due_retries(self, now: float, limit: int = 100) -> int:
+        return await redis_client.eval(_PROMOTE_SCRIPT, 2, DELAYED_KEY, QUEUE_KEY, now, limit)
+
+    async def claim(self, processing: str, timeout: int = 1) -> Optional[str]:
+        """Next job ID, moved atomically into `processing` so a crash cannot lose it."""
+        return await redis_client.blmove(QUEUE_KEY, processing, timeout, "RIGHT", "LEFT")
+
+    async def release(self, processing: str, job_id: str, requeue: bool = False):
+        """Done with a claimed job; `requeue` puts it back on the queue (shutdown mid-job)."""
+        pipe = redis_client.pipeline(transaction=True)
+        pipe.lrem(processing, 1, job_id)
+        if requeue:
+            pipe.rpush(QUEUE_KEY, job_id)
+        await pipe.execute()
+
+    async def register_pool(self, pool_id: str, processing_lists: List[str], lease_seconds: int):
+        pipe = redis_client.pipeline(transaction=True)
+        pipe.set(pool_lease_key(pool_id), _now(), ex=lease_seconds)
+        pipe.sadd(PROCESSING_LISTS_KEY, *processing_lists)
+        await pipe.execute()
+
+    async def renew_pool(self, pool_id: str, lease_seconds: int):
+        await redis_client.set(pool_lease_key(pool_id), _now(), ex=lease_seconds)
+
+    async def unregister_pool(self, pool_id: str, processing_lists: List[str]):
+        pipe = redis_client.pipeline(transaction=True)
+        pipe.delete(pool_lease_key(pool_id))
+        pipe.srem(PROCESSING_LISTS_KEY, *processing_lists)
+        await pipe.execute()
+
+    async def requeue_orphans(self) -> int:
+        """Re-queue the in-flight jobs of pools whose lease expired. Returns the number moved."""
+        moved = 0
+        for processing in await redis_client.smembers(PROCESSING_LISTS_KEY):
+            pool_id = processing.split(":")[2]
+            count = await redis_client.eval(
+                _REQUEUE_SCRIPT, 4, processing, pool_lease_key(pool_id), QUEUE_KEY, PROCESSING_LISTS_KEY
+            )
+            moved += max(count, 0)
+        return moved
@@ -1,19 +1,87 @@
-from app.db.repositories.page_repo import PageRepository
+import asyncio
+import logging
+from datetime import datetime
+from typing import Any, AsyncIterator, List, Optional, Tuple
+
+from app.db.repositories.page_repo import PageRepository, page_projection
 from app.db.repositories.post_repo import PostRepository
-from app.db.repositories.employee_repo import EmployeeRepository
 from app.db.repositories.comment_repo import CommentRepository
-from app.db.repositories.follower_repo import FollowerRepository
-from app.services.scraper_service import LinkedInScraperService
-from app.services.ai_service import AIService
-from app.core.cache import get_cache, set_cache
+from app.services.ingest_service import IngestService
+from app.services.job_service import JobService
+from app.services.scraper_service import LinkedInScraperService, PageUnchanged
+from app.db.repositories.ai_insight_repo import AIInsightRepository
+from app.services.ai_service import AIService, insights_content_hash
+from app.config import settings
+from app.core.cache import (
+    get_cache,
+    get_cache_raw,
+    set_cache,
+    get_cache_many,
+    set_cache_many,
+    invalidate_family,
+    acquire_lock,
+)
+from app.core.codec import dumps_json
+from app.core.http_cache import strong_etag
+from app.db.bulk import change_ratio
+from app.core.singleflight import SingleFlight
 from app.utils.mongo_serializer import serialize_mongo
+from app.utils.projection import fields_key, project
+
+logger = logging.getLogger(__name__)
+
+# Shared across PageService instances so concurrent requests coalesce
+_scrape_flight = SingleFlight(
+    "scrape",
+    lease_seconds=settings.SCRAPE_LEASE_SECONDS,
+    wait_timeout_seconds=settings.SCRAPE_WAIT_TIMEOUT_SECONDS,
+)
+# Identical page data across requests/workers triggers one LLM call
+_insights_flight = SingleFlight(
+    "ai_insights",
+    lease_seconds=int(settings.OPENAI_TIMEOUT_SECONDS) + 10,
+    wait_timeout_seconds=int(settings.OPENAI_TIMEOUT_SECONDS) + 15,
+)
+
+
+def _page_key(page_id: str, fields: Optional[List[str]] = None) -> str:
+    """Full page under `page:{id}`; field selections get their own variant keys."""
+    if not fields:
+        return f"page:{page_id}"
+    return f"page:{page_id}:fields={fields_key(fields)}"
+
+
+async def invalidate_page_cache(page_id: str):
+    """Drop the cached page and everything in its family (field variants, feed pages)."""
+    await invalidate_family(_page_key(page_id), include_base=True)
+
+
+def page_etag(page_id: str, scraped_at: datetime, fields: Optional[List[str]] = None) -> str:
+    """Strong ETag of a page (or field selection) as of one scrape; see app/core/http_cache.py."""
+    version = f"{page_id}\n{scraped_at.isoformat()}\n{fields_key(fields) if fields else ''}"
+    return strong_etag(version.encode())
+
+
+def _scraped_at(page: Optional[dict]) -> Optional[datetime]:
+    scraped_at = (page or {}).get("last_scraped_at")
+    if isinstance(scraped_at, str):
+        scraped_at = datetime.fromisoformat(scraped_at)
+    return scraped_at if isinstance(scraped_at, datetime) else None
+
+
+def page_age(page: dict) -> Optional[float]:
+    """Seconds since the page was last scraped, or None if it has no timestamp."""
+    scraped_at = _scraped_at(page)
+    if scraped_at is None:
+        return None
+    return max(0.0, (datetime.utcnow() - scraped_at).total_seconds())
 
 
 class PageService:
     """
     Handles Page-related business logic:
     - Fetch from cache / DB
-    - Scrape if missing
+    - Scrape if missing (one scrape per page_id at a time)
     - Serialize Mongo objects safely
     - Generate AI insights
     """
@@ -21,60 +89,282 @@ class PageService:
     def __init__(self):
         self.page_repo = PageRepository()
         self.post_repo = PostRepository()
-        self.employee_repo = EmployeeRepository()
         self.comment_repo = CommentRepository()
-        self.follower_repo = FollowerRepository()
+        self.insight_repo = AIInsightRepository()
+        self.ingest_service = IngestService()
         self.scraper = LinkedInScraperService()
 
     async def get_or_scrape_page(self, page_id: str):
         """
         Fetch page from cache → DB → scrape (fallback).
+        Concurrent misses for the same page share a single scrape.
         Always returns JSON-serializable data.
         """
-        cache_key = f"page:{page_id}"
+        stored = await self._load_stored(page_id)
+        if stored:
+            return stored
+
+        return await _scrape_flight.do(
+            page_id,
+            lambda: self._scrape_and_store(page_id),
+            recheck=lambda: self._load_stored(page_id),
+        )
+
+    async def ensure_fresh(self, page_id: str) -> Tuple[Optional[float], bool, Optional[datetime]]:
+        """
+        Stale-while-revalidate on `last_scraped_at`:
+        - younger than PAGE_SOFT_TTL_SECONDS: served as is
+        - up to PAGE_HARD_TTL_SECONDS: served as is, one background re-scrape queued
+        - older, or stored without a timestamp (saved before it was kept):
+          re-scraped before answering
+        Returns (age in seconds of the data about to be served, whether it is
+        stale, its last_scraped_at). The last is the page's version: every scrape
+        moves it, changed or not. Age and version are None when the page is not
+        stored yet (the read will scrape it).
+        """
+        stored = await self._load_stored(page_id)
+        if not stored:
+            return None, False, None
+
+        age = page_age(stored)
+        if age is None or age >= settings.PAGE_HARD_TTL_SECONDS:
+            try:
+                await self.refresh_page(page_id)
+                return 0.0, False, _scraped_at(await self._load_stored(page_id))
+            except Exception:
+                # Better old data than none: serve what is stored, flagged stale
+                logger.exception("Blocking refresh of expired page %s failed", page_id)
+                return age, True, _scraped_at(stored)
+
+        if age >= settings.PAGE_SOFT_TTL_SECONDS:
+            await self._revalidate_in_background(page_id)
+            return age, True, _scraped_at(stored)
+
+        return age, False, _scraped_at(stored)
+
+    async def _revalidate_in_background(self, page_id: str):
+        # The guard expires on its own; it only stops every stale read from queueing a job
+        if await acquire_lock(f"revalidate:{page_id}", settings.PAGE_REVALIDATE_GUARD_SECONDS * 1000):
+            await JobService().enqueue_refresh([page_id])
+
+    async def get_page_json(self, page_id: str, fields: Optional[List[str]] = None) -> bytes:
+        """
+        Page as JSON bytes. Cache hits are passed through as stored, without
+        decoding and re-encoding. `fields` selects a subset, fetched with a
+        Mongo projection and cached under its own key.
+        """
+        cache_key = _page_key(page_id, fields)
+        raw = await get_cache_raw(cache_key)
+        if raw is not None:
+            return raw
+
+        if fields:
+            page = await self.page_repo.get_by_page_id(page_id, page_projection(fields))
+            if page:
+                serialized = serialize_mongo(page)
+                await set_cache(cache_key, serialized, family=_page_key(page_id))
+                return dumps_json(serialized)
+            # Not stored yet: scrape the full page, then trim it
+            return dumps_json(project(await self.get_or_scrape_page(page_id), fields))
+
+        return dumps_json(await self.get_or_scrape_page(page_id))
+
+    async def get_feed_json(self, page_id: str, skip: int, limit: int, comments_per_post: int) -> bytes:
+        """
+        Recent posts, each with its newest `comments_per_post` comments under
+        `top_comments`: one posts query and one comments aggregation, cached as
+        a unit in the page's family so a changed re-scrape drops it.
+        """
+        cache_key = f"feed:{page_id}:skip={skip}:limit={limit}:comments={comments_per_post}"
+        raw = await get_cache_raw(cache_key)
+        if raw is not None:
+            return raw
+
+        posts = await self.post_repo.get_recent(page_id, skip, limit)
+        comments = await self.comment_repo.get_top_for_posts(
+            page_id, [post["post_id"] for post in posts], comments_per_post
+        )
+        feed = serialize_mongo([{**post, "top_comments": comments.get(post["post_id"], [])} for post in posts])
+        await set_cache(cache_key, feed, family=_page_key(page_id))
+        return dumps_json(feed)
+
+    async def _load_stored(self, page_id: str):
+        cache_key = _page_key(page_id)
 
         # 1️⃣ Check Redis cache
         cached = await get_cache(cache_key)
         if cached:
             return cached
 
+        # 2️⃣ Check MongoDB
         page = await self.page_repo.get_by_page_id(page_id)
         if page:
             serialized = serialize_mongo(page)
             await set_cache(cache_key, serialized)
             return serialized
 
-        scraped = await self.scraper.scrape_page(page_id)
+        return None
 
-        await self.page_repo.create(scraped)
-        await self.post_repo.bulk_insert(scraped.get("posts", []))
-        await self.employee_repo.bulk_insert(scraped.get("employees", []))
-        await self.comment_repo.bulk_insert(scraped.get("comments", []))
-        await self.follower_repo.bulk_insert(scraped.get("followers_list", []))
-        await self.follower_repo.bulk_insert(scraped.get("following_list", []))
+    async def get_pages(self, page_ids: list, fields: Optional[List[str]] = None) -> dict:
+        """
+        Batch read: one cache MGET, one Mongo $in for the misses and one
+        pipelined cache fill. Pages found nowhere are listed in `missing`.
+        """
+        keys = {page_id: _page_key(page_id, fields) for page_id in page_ids}
+        cached = await get_cache_many(list(keys.values()))
+        pages = {page_id: cached[key] for page_id, key in keys.items() if key in cached}
+
+        misses = [page_id for page_id in page_ids if page_id not in pages]
+        if misses:
+            fill, families = {}, {}
+            for page in await self.page_repo.get_many(misses, page_projection(fields)):
+                serialized = serialize_mongo(page)
+                pages[page["page_id"]] = serialized
+                fill[keys[page["page_id"]]] = serialized
+                if fields:
+                    families[keys[page["page_id"]]] = _page_key(page["page_id"])
+            await set_cache_many(fill, families=families)
+
+        return {
+            "pages": pages,
+            "missing": [page_id for page_id in page_ids if page_id not in pages],
+        }
+
+    async def refresh_page(self, page_id: str) -> dict:
+        """
+        Re-scrape a page even if it is stored, and report the write counts.
+        A refresh that joins a scrape already in flight reports `coalesced`.
+        """
+        report = {}
+        await _scrape_flight.do(page_id, lambda: self._scrape_and_store(page_id, report))
+        ingest = report.get("ingest")
+        html_unchanged = report.get("html_unchanged", False)
+
+        # Share of scraped documents that were new or different, per collection
+        change_ratios = None
+        if ingest:
+            change_ratios = {name: change_ratio(counts) for name, counts in ingest.items()}
+        elif html_unchanged:
+            change_ratios = {"total": 0.0}
+
+        return {
+            "page_id": page_id,
+            "coalesced": not report,
+            "html_unchanged": html_unchanged,
+            "ingest": ingest,
+            "change_ratios": change_ratios,
+        }
+
+    async def _scrape_and_store(self, page_id: str, report: dict = None):
+        """
+        Scrape and persist a page. Unchanged HTML stops before parsing; otherwise
+        only changed documents are written. The cached page is always rewritten
+        (its last_scraped_at moved), but field variants are only invalidated
+        when something actually changed.
+        """
+        report = {} if report is None else report
+        try:
+            scraped = await self.scraper.scrape_page(
+                page_id, fingerprint=await self.page_repo.get_fingerprint(page_id)
+            )
+        except PageUnchanged:
+            stored = await self.page_repo.get_by_page_id(page_id)
+            stored["last_scraped_at"] = await self.ingest_service.touch(stored)
+            report["html_unchanged"] = True
+            serialized = serialize_mongo(stored)
+            await set_cache(_page_key(page_id), serialized)
+            return serialized
+
+        counts = await self.ingest_service.ingest(scraped)
+        report["ingest"] = counts
 
         serialized = serialize_mongo(scraped)
+        serialized.pop("html_fingerprint", None)
 
-        await set_cache(cache_key, serialized)
+        await set_cache(_page_key(page_id), serialized)
+        if counts["total"]["inserted"] or counts["total"]["updated"]:
+            await invalidate_family(_page_key(page_id))
         return serialized
 
     async def get_ai_insights(self, page_id: str):
-        
-        cache_key = f"ai_insights:{page_id}"
+        """
+        Insights are keyed by a hash of the page fields that feed the prompt,
+        so they are only regenerated when that data changes:
+        cache → Mongo (ai_insights) → OpenAI.
+        """
+        page, content_hash, stored = await self._stored_insights(page_id)
+        if stored:
+            return stored
 
-        cached = await get_cache(cache_key)
-        if cached:
-            return cached
+        async def generate():
+            insights = await AIService().generate_page_insights(page)
+            await self._save_insights(page_id, content_hash, insights)
+            return insights
 
-        page = await self.page_repo.get_by_page_id(page_id)
+        return await _insights_flight.do(
+            content_hash, generate, recheck=lambda: self._load_insights(content_hash)
+        )
+
+    async def stream_ai_insights(self, page_id: str) -> AsyncIterator[Tuple[str, Any]]:
+        """
+        Same lookup and flight as `get_ai_insights`, but the stream leading a
+        generation gets its tokens and completed sections as they arrive; the
+        assembled result is then persisted and cached. Stored insights, and
+        streams that joined a generation already running (here or on another
+        worker), are sent as a single "done" event.
+        """
+        page, content_hash, stored = await self._stored_insights(page_id)
+        if stored:
+            yield "done", stored
+            return
+
+        events: asyncio.Queue = asyncio.Queue()
+
+        async def generate():
+            # Only runs for the leader: followers never see partial events
+            async for event, data in AIService().stream_page_insights(page):
+                if event == "done":
+                    await self._save_insights(page_id, content_hash, data)
+                    return data
+                events.put_nowait((event, data))
+            raise RuntimeError("Insights stream ended without a result")
+
+        flight = asyncio.ensure_future(
+            _insights_flight.do(content_hash, generate, recheck=lambda: self._load_insights(content_hash))
+        )
+        flight.add_done_callback(lambda _: events.put_nowait(None))
+        try:
+            while True:
+                item = await events.get()
+                if item is None:
+                    break
+                yield item
+            yield "done", flight.result()
+        finally:
+            if not flight.done():
+                flight.cancel()  # the generation itself is shielded: followers still get its result
+            elif not flight.cancelled():
+                flight.exception()  # retrieved, even when the client left before it
+
+    async def _stored_insights(self, page_id: str):
+        page = await self._load_stored(page_id)
         if not page:
             raise ValueError("Page not found. Fetch page first.")
 
-        serialized_page = serialize_mongo(page)
+        content_hash = insights_content_hash(page)
+        return page, content_hash, await self._load_insights(content_hash)
 
-        ai_service = AIService()
-        insights = await ai_service.generate_page_insights(serialized_page)
-
-        await set_cache(cache_key, insights)
+    async def _load_insights(self, content_hash: str):
+        cache_key = f"ai_insights:{content_hash}"
+        cached = await get_cache(cache_key)
+        if cached:
+            return cached
 
+        insights = await self.insight_repo.get_by_hash(content_hash)
+        if insights:
+            await set_cache(cache_key, insights, ttl=settings.AI_INSIGHTS_CACHE_TTL_SECONDS)
         return insights
+
+    async def _save_insights(self, page_id: str, content_hash: str, insights: dict):
+        await self.insight_repo.save(page_id, content_hash, settings.OPENAI_MODEL, insights)
+        await set_cache(f"ai_insights:{content_hash}", insights, ttl=settings.AI_INSIGHTS_CACHE_TTL_SECONDS)
@@ -0,0 +1,57 @@
+import json
+from typing import Any, Dict, List
+
+
+class JSONSectionScanner:
+    """
+    Incrementally scans a streamed JSON object and emits each top-level
+    `"key": value` pair as soon as its value is complete.
+    """
+
+    def __init__(self):
+        self._depth = 0
+        self._in_string = False
+        self._escaped = False
+        self._section: List[str] = []
+
+    def feed(self, text: str) -> List[Dict[str, Any]]:
+        sections = []
+        for ch in text:
+            if self._in_string:
+                self._section.append(ch)
+                if self._escaped:
+                    self._escaped = False
+                elif ch == "\\":
+                    self._escaped = True
+                elif ch == '"':
+                    self._in_string = False
+                continue
+
+            if ch == '"':
+                self._in_string = True
+            elif ch in "{[":
+                self._depth += 1
+                if self._depth == 1:
+                    continue  # opening brace of the top-level object
+            elif ch in "}]":
+                self._depth -= 1
+                if self._depth == 0:
+                    sections.extend(self._flush())
+                    continue
+            elif ch == "," and self._depth == 1:
+                sections.extend(self._flush())
+                continue
+
+            if self._depth >= 1:
+                self._section.append(ch)
+        return sections
+
+    def _flush(self) -> List[Dict[str, Any]]:
+        chunk = "".join(self._section).strip()
+        self._section = []
+        if not chunk:
+            return []
+        try:
+            return [json.loads("{" + chunk + "}")]
+        except ValueError:
+            return []
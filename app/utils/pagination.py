@@ -1,5 +1,74 @@
+import base64
+import json
+from datetime import datetime
+from typing import Any, Callable, List, Optional, Tuple
+
+from bson import ObjectId
+from fastapi import HTTPException
+
+
 def get_pagination(page: int, limit: int):
     page = max(page, 1)
     limit = min(max(limit, 1), 50)
     skip = (page - 1) * limit
     return skip, limit
+
+
+def _encode_value(value):
+    if isinstance(value, datetime):
+        return {"$date": value.isoformat()}
+    if isinstance(value, ObjectId):
+        return {"$oid": str(value)}
+    return value
+
+
+def _decode_value(value):
+    if isinstance(value, dict):
+        if set(value) == {"$date"}:
+            return datetime.fromisoformat(value["$date"])
+        if set(value) == {"$oid"}:
+            return ObjectId(value["$oid"])
+    return value
+
+
+def encode_cursor(*values) -> str:
+    """Opaque, URL-safe token for the sort key of the last item returned."""
+    raw = json.dumps([_encode_value(v) for v in values], separators=(",", ":"))
+    return base64.urlsafe_b64encode(raw.encode()).decode().rstrip("=")
+
+
+def decode_cursor(cursor: Optional[str], *types: type) -> Optional[List[Any]]:
+    """
+    Decode a token produced by `encode_cursor` for a sort key of `types`
+    (e.g. datetime, str). The values go straight into queries, so anything
+    else (another length, an operator document such as {"$ne": null}) is
+    rejected like a malformed token: 400. An empty cursor means "first page".
+    """
+    if not cursor:
+        return None
+    try:
+        padded = cursor + "=" * (-len(cursor) % 4)
+        values = json.loads(base64.urlsafe_b64decode(padded.encode()))
+        if not isinstance(values, list) or len(values) != len(types):
+            raise ValueError("wrong number of values")
+        decoded = [_decode_value(v) for v in values]
+        if not all(type(value) is expected for value, expected in zip(decoded, types)):
+            raise ValueError("unexpected value type")
+        return decoded
+    except Exception:
+        raise HTTPException(status_code=400, detail="Invalid cursor")
+
+
+def get_keyset_limit(limit: int) -> int:
+    return min(max(limit, 1), 50)
+
+
+def keyset_page(docs: list, limit: int, sort_key: Callable[[dict], Tuple]) -> Tuple[list, Optional[str]]:
+    """
+    Split a `limit + 1` fetch into the page and the cursor for the next one.
+    `next_cursor` is None once the last page has been reached.
+    """
+    if len(docs) <= limit:
+        return docs, None
+    items = docs[:limit]
+    return items, encode_cursor(*sort_key(items[-1]))
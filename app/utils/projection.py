@@ -0,0 +1,69 @@
+import re
+from typing import Iterable, List, Optional
+
+from fastapi import HTTPException
+
+_FIELD_RE = re.compile(r"^[A-Za-z_][A-Za-z0-9_]*(\.[A-Za-z_][A-Za-z0-9_]*)*$")
+MAX_FIELDS = 40
+
+
+def parse_fields(fields: Optional[str]) -> Optional[List[str]]:
+    """
+    Parse a `fields=a,b,c` query value into a sorted, de-duplicated list.
+    None means "all fields"; anything that is not a plain field path is rejected.
+    """
+    if fields is None or not fields.strip():
+        return None
+    names = sorted({name.strip() for name in fields.split(",") if name.strip()})
+    if len(names) > MAX_FIELDS or any(name == "_id" or not _FIELD_RE.match(name) for name in names):
+        raise HTTPException(status_code=400, detail="Invalid fields parameter")
+    return names
+
+
+def build_projection(fields: Optional[List[str]], always: Iterable[str] = (), exclude: Optional[dict] = None) -> dict:
+    """
+    Mongo projection that never returns `_id`.
+    - With `fields`: inclusion of those fields plus `always` (e.g. sort keys)
+    - Without: everything except `exclude`
+    """
+    projection = {"_id": 0}
+    if fields:
+        projection.update({name: 1 for name in fields})
+        projection.update({name: 1 for name in always})
+    elif exclude:
+        projection.update(exclude)
+    return projection
+
+
+def include_id(projection: Optional[dict]) -> Optional[dict]:
+    """Same selection, but keeping `_id` (needed as the keyset cursor)."""
+    if not projection or all(name == "_id" for name in projection):
+        return None
+    projection = {name: value for name, value in projection.items() if name != "_id"}
+    if all(value == 0 for value in projection.values()):
+        return projection
+    return {**projection, "_id": 1}
+
+
+def fields_key(fields: Optional[List[str]]) -> str:
+    """Stable cache-key suffix for a field selection."""
+    return ",".join(fields) if fields else "*"
+
+
+def project(doc: dict, fields: Optional[List[str]]) -> dict:
+    """Apply a field selection in Python, for documents that did not come from Mongo."""
+    if not fields:
+        return doc
+    result = {}
+    for name in fields:
+        source, target = doc, result
+        parts = name.split(".")
+        for part in parts[:-1]:
+            if not isinstance(source, dict) or part not in source:
+                break
+            source = source[part]
+            target = target.setdefault(part, {})
+        else:
+            if isinstance(source, dict) and parts[-1] in source:
+                target[parts[-1]] = source[parts[-1]]
+    return result
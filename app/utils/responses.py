@@ -0,0 +1,22 @@
+from typing import Any, Dict, Optional
+
+from fastapi import Response
+
+from app.core.codec import dumps_json
+from app.core.profiling import phase
+
+
+def json_response(content: Any, status_code: int = 200, headers: Optional[Dict[str, str]] = None) -> Response:
+    """
+    Encode straight to bytes, skipping FastAPI's jsonable_encoder pass.
+    `content` must already be JSON-compatible (see serialize_mongo).
+    """
+    if not isinstance(content, bytes):
+        with phase("serialize"):
+            content = dumps_json(content)
+    return Response(content=content, status_code=status_code, media_type="application/json", headers=headers)
+
+
+def sse_event(event: str, data: Any) -> bytes:
+    """One Server-Sent Events frame with a JSON payload."""
+    return b"event: " + event.encode() + b"\ndata: " + dumps_json(data) + b"\n\n"
@@ -0,0 +1,162 @@
+import asyncio
+import logging
+import random
+import time
+import uuid
+from typing import List, Optional
+from urllib.parse import urlparse
+
+from app.config import settings
+from app.core.rate_limit import acquire_rate_slot
+from app.services.job_service import JobService, processing_key
+from app.services.page_service import PageService
+from app.services.scraper_service import LinkedInScraperService, start_scraper_client, close_scraper_client
+
+logger = logging.getLogger(__name__)
+
+SCRAPE_HOST = urlparse(LinkedInScraperService.BASE_URL).hostname
+
+
+def retry_delay(attempt: int) -> float:
+    """Exponential backoff with jitter: base * 2^(attempt-1), +/- 20%."""
+    delay = settings.SCRAPE_RETRY_BASE_SECONDS * (2 ** (attempt - 1))
+    return delay * random.uniform(0.8, 1.2)
+
+
+class ScrapeWorkerPool:
+    """
+    Drains the Redis scrape queue with a fixed number of concurrent workers.
+    - Failed jobs are retried with exponential backoff up to SCRAPE_MAX_ATTEMPTS
+    - Requests to the scrape host are rate limited across all workers
+    - Claimed jobs sit in a per-worker processing list covered by the pool's
+      lease (renewed every second); any pool re-queues the jobs of a pool whose
+      lease expired, e.g. after an OOM kill
+    """
+
+    def __init__(self, concurrency: int = None):
+        self.concurrency = concurrency or settings.SCRAPE_WORKER_CONCURRENCY
+        self.jobs = JobService()
+        self.pool_id = uuid.uuid4().hex
+        self._processing = [processing_key(self.pool_id, i) for i in range(self.concurrency)]
+        self._tasks: List[asyncio.Task] = []
+        self._stopping = False
+
+    async def start(self):
+        self._stopping = False
+        await self.jobs.register_pool(self.pool_id, self._processing, settings.SCRAPE_WORKER_LEASE_SECONDS)
+        self._tasks = [asyncio.create_task(self._worker(i)) for i in range(self.concurrency)]
+        self._tasks.append(asyncio.create_task(self._housekeeping()))
+        logger.info("Started %d scrape workers", self.concurrency)
+
+    async def stop(self):
+        self._stopping = True
+        for task in self._tasks:
+            task.cancel()
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+        self._tasks = []
+        await self.jobs.unregister_pool(self.pool_id, self._processing)
+
+    async def _worker(self, index: int):
+        processing = self._processing[index]
+        while not self._stopping:
+            try:
+                job_id = await self.jobs.claim(processing)
+                if not job_id:
+                    continue
+                try:
+                    await self._run(job_id)
+                except asyncio.CancelledError:
+                    # Shutting down mid-job: put it back so another worker picks it up
+                    await self.jobs.release(processing, job_id, requeue=True)
+                    raise
+                except Exception:
+                    await self.jobs.release(processing, job_id)
+                    raise
+                await self.jobs.release(processing, job_id)
+            except asyncio.CancelledError:
+                raise
+            except Exception:
+                logger.exception("Scrape worker %d failed; continuing", index)
+                await asyncio.sleep(1)
+
+    async def _housekeeping(self):
+        """Renew the lease, re-queue orphaned jobs and promote due retries."""
+        while not self._stopping:
+            try:
+                await self.jobs.renew_pool(self.pool_id, settings.SCRAPE_WORKER_LEASE_SECONDS)
+                orphaned = await self.jobs.requeue_orphans()
+                if orphaned:
+                    logger.warning("Re-queued %d scrape job(s) of a dead worker pool", orphaned)
+                await self.jobs.promote_due_retries(time.time())
+            except asyncio.CancelledError:
+                raise
+            except Exception:
+                logger.exception("Scrape worker housekeeping failed")
+            await asyncio.sleep(1)
+
+    async def _run(self, job_id: str):
+        job = await self.jobs.mark_running(job_id)
+        if job is None:
+            return
+
+        try:
+            await acquire_rate_slot(f"host:{SCRAPE_HOST}", settings.SCRAPE_RATE_LIMIT_PER_SECOND)
+            result = await PageService().refresh_page(job["page_id"])
+        except asyncio.CancelledError:
+            raise
+        except Exception as exc:
+            error = f"{type(exc).__name__}: {exc}"
+            if job["attempts"] < settings.SCRAPE_MAX_ATTEMPTS:
+                delay = retry_delay(job["attempts"])
+                logger.warning("Scrape of %s failed (attempt %d), retrying in %.1fs: %s",
+                               job["page_id"], job["attempts"], delay, error)
+                await self.jobs.schedule_retry(job, error, time.time() + delay)
+            else:
+                logger.error("Scrape of %s failed permanently: %s", job["page_id"], error)
+                await self.jobs.mark_failed(job, error)
+            return
+
+        await self.jobs.mark_succeeded(job, result)
+
+
+class _Pool:
+    instance: Optional[ScrapeWorkerPool] = None
+
+
+_pool = _Pool()
+
+
+async def start_scrape_workers():
+    if settings.SCRAPE_WORKERS_IN_APP and _pool.instance is None:
+        _pool.instance = ScrapeWorkerPool()
+        await _pool.instance.start()
+
+
+async def stop_scrape_workers():
+    if _pool.instance:
+        await _pool.instance.stop()
+        _pool.instance = None
+
+
+async def _main():
+    from app.db.mongo import connect_to_mongo, close_mongo_connection
+
+    logging.basicConfig(level=logging.INFO)
+    await connect_to_mongo()
+    await start_scraper_client()
+    pool = ScrapeWorkerPool()
+    await pool.start()
+    try:
+        await asyncio.Event().wait()
+    finally:
+        await pool.stop()
+        await close_scraper_client()
+        await close_mongo_connection()
+
+
+if __name__ == "__main__":
+    # Standalone worker process: python -m app.workers.scrape_worker
+    try:
+        asyncio.run(_main())
+    except KeyboardInterrupt:
+        pass
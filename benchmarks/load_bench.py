@@ -0,0 +1,365 @@
+"""
+Load test for the /api/pages* endpoints.
+
+Boots the app in-process (ASGI, no sockets) against either in-memory
+stand-ins -- mongomock-motor and a fakeredis server, see
+benchmarks/requirements.txt -- or the real Mongo/Redis given on the command
+line (e.g. `docker compose up -d mongo redis`). The ai-insights endpoints
+talk to tests/openai_stub.py, booted on a free port, unless --openai-base-url
+names another OpenAI-compatible server. Seeds demo pages with
+LinkedInScraperService._demo_payload, drives every endpoint with the chosen
+load pattern and prints throughput and latency percentiles per endpoint as JSON:
+
+    python -m benchmarks.load_bench [--backend fake|local] [--pattern cold|warm|mixed]
+        [--pages 20] [--requests 200] [--concurrency 16] [--output run.json]
+        [--baseline benchmarks/baseline.json] [--max-regression 0.25]
+
+benchmarks/baseline.json is a run with the defaults (fake backend, warm).
+
+Patterns (caches are L1 + Redis):
+  cold   caches flushed before every round of one request per seeded page
+  warm   caches primed by an unmeasured round first, never flushed
+  mixed  starts cold, 80% of requests go to 20% of the pages
+
+With --baseline, each endpoint's p50/p95/p99 and throughput are compared to
+the stored run; the exit status is 1 if any of them regressed by more than
+--max-regression. The local backend uses its own database and Redis DB
+(`--mongo-db`, `--redis-url`) because the cold pattern flushes Redis.
+"""
+import argparse
+import asyncio
+import json
+import os
+import platform
+import random
+import socket
+import threading
+import time
+from datetime import datetime
+from pathlib import Path
+from typing import Callable, Dict, List, Optional
+
+BENCH_PREFIX = "bench"
+PATTERNS = ("cold", "warm", "mixed")
+COMPARED_METRICS = ("p50_ms", "p95_ms", "p99_ms", "throughput_rps")
+
+
+def percentile(samples: List[float], pct: float) -> float:
+    """Linear interpolation between closest ranks (numpy's default method)."""
+    if not samples:
+        return 0.0
+    ordered = sorted(samples)
+    rank = (len(ordered) - 1) * pct / 100
+    low = int(rank)
+    high = min(low + 1, len(ordered) - 1)
+    return ordered[low] + (ordered[high] - ordered[low]) * (rank - low)
+
+
+def summarize(latencies: List[float], errors: int, elapsed: float) -> dict:
+    ms = [latency * 1000 for latency in latencies]
+    return {
+        "requests": len(latencies) + errors,
+        "errors": errors,
+        "throughput_rps": round(len(latencies) / elapsed, 1) if elapsed else 0.0,
+        "mean_ms": round(sum(ms) / len(ms), 3) if ms else 0.0,
+        "p50_ms": round(percentile(ms, 50), 3),
+        "p95_ms": round(percentile(ms, 95), 3),
+        "p99_ms": round(percentile(ms, 99), 3),
+        "max_ms": round(max(ms), 3) if ms else 0.0,
+    }
+
+
+def compare(current: dict, baseline: dict, max_regression: float) -> List[dict]:
+    """
+    Per endpoint/metric change against a baseline run. A latency is a regression
+    when it grew by more than `max_regression` (a fraction); throughput when it
+    dropped by more than that. Endpoints missing from either run are skipped.
+    """
+    report = []
+    for endpoint, stats in current["endpoints"].items():
+        base = baseline.get("endpoints", {}).get(endpoint)
+        if not base:
+            continue
+        for metric in COMPARED_METRICS:
+            before, after = base.get(metric), stats.get(metric)
+            if not before or after is None:
+                continue
+            change = (after - before) / before
+            worse = -change if metric == "throughput_rps" else change
+            report.append({
+                "endpoint": endpoint,
+                "metric": metric,
+                "baseline": before,
+                "current": after,
+                "change": round(change, 4),
+                "regression": worse > max_regression,
+            })
+    return report
+
+
+def endpoints(page_ids: List[str], backend: str = "local") -> Dict[str, Callable[[str], tuple]]:
+    """Endpoint name -> request factory for a page ID: (method, url, json body)."""
+    batch_ids = page_ids[:10]
+    # mongomock has no $dateTrunc, so the fake backend reads raw history samples;
+    # nor $firstN, so there the feed skips the top-comments aggregation
+    resolution = "raw" if backend == "fake" else "day"
+    feed_comments = 0 if backend == "fake" else 3
+    return {
+        "GET /pages/{id}": lambda pid: ("GET", f"/api/pages/{pid}", None),
+        "GET /pages/{id}?fields": lambda pid: ("GET", f"/api/pages/{pid}?fields=name,followers,industry", None),
+        "GET /pages/search": lambda pid: ("GET", "/api/pages/search?industry=software&limit=10", None),
+        "GET /pages/search?mode=prefix": lambda pid: ("GET", f"/api/pages/search?mode=prefix&name={pid[:-1]}", None),
+        "POST /pages/batch": lambda pid: ("POST", "/api/pages/batch", {"page_ids": batch_ids}),
+        "GET /pages/{id}/posts": lambda pid: ("GET", f"/api/pages/{pid}/posts?limit=10", None),
+        "GET /pages/{id}/posts?cursor": lambda pid: ("GET", f"/api/pages/{pid}/posts?limit=10&cursor=", None),
+        "GET /pages/{id}/feed": lambda pid: ("GET", f"/api/pages/{pid}/feed?limit=10&comments={feed_comments}", None),
+        "GET /pages/{id}/comments": lambda pid: ("GET", f"/api/pages/{pid}/comments?limit=10", None),
+        "GET /pages/{id}/employees": lambda pid: ("GET", f"/api/pages/{pid}/employees?limit=10", None),
+        "GET /pages/{id}/followers": lambda pid: ("GET", f"/api/pages/{pid}/followers?limit=10", None),
+        "GET /pages/{id}/following": lambda pid: ("GET", f"/api/pages/{pid}/following?limit=10", None),
+        "GET /pages/{id}/analytics": lambda pid: ("GET", f"/api/pages/{pid}/analytics", None),
+        "GET /pages/{id}/history": lambda pid: ("GET", f"/api/pages/{pid}/history?resolution={resolution}", None),
+        "GET /pages/{id}/export": lambda pid: ("GET", f"/api/pages/{pid}/export?format=ndjson", None),
+        "GET /pages/{id}/ai-insights": lambda pid: ("GET", f"/api/pages/{pid}/ai-insights", None),
+        "GET /pages/{id}/ai-insights/stream": lambda pid: ("GET", f"/api/pages/{pid}/ai-insights/stream", None),
+        "POST /pages/refresh": lambda pid: ("POST", "/api/pages/refresh", {"page_id": pid}),
+    }
+
+
+# ---------------------------------------------------------------------------
+# Backends: must be configured before any app module is imported, because the
+# Redis clients are created from settings at import time.
+# ---------------------------------------------------------------------------
+
+def _free_port() -> int:
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+def start_fake_redis() -> str:
+    try:
+        from fakeredis import TcpFakeServer
+    except ImportError:
+        raise SystemExit("--backend fake needs: pip install -r benchmarks/requirements.txt")
+
+    port = _free_port()
+    server = TcpFakeServer(("127.0.0.1", port), server_type="redis")
+    server.daemon_threads = True  # connection handlers must not keep the process alive
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return f"redis://127.0.0.1:{port}/0"
+
+
+def start_openai_stub() -> str:
+    import uvicorn
+
+    from tests.openai_stub import app as stub_app
+
+    port = _free_port()
+    server = uvicorn.Server(uvicorn.Config(stub_app, host="127.0.0.1", port=port, log_level="warning"))
+    threading.Thread(target=server.run, daemon=True).start()
+    deadline = time.time() + 10
+    while not server.started and time.time() < deadline:
+        time.sleep(0.05)
+    return f"http://127.0.0.1:{port}/v1"
+
+
+def _replay_bulk_write(self, requests, ordered=True, **kwargs):
+    """
+    mongomock's bulk_write predates the `sort` field newer pymongo puts on
+    UpdateOne; the app only bulk-writes upserts, so replay them one by one.
+    """
+    from types import SimpleNamespace
+
+    counts = {"upserted_count": 0, "matched_count": 0, "modified_count": 0}
+    for op in requests:
+        result = self.update_one(op._filter, op._doc, upsert=op._upsert)
+        counts["upserted_count"] += int(result.upserted_id is not None)
+        counts["matched_count"] += result.matched_count
+        counts["modified_count"] += result.modified_count
+    return SimpleNamespace(**counts)
+
+
+def use_fake_mongo():
+    try:
+        import mongomock
+        from mongomock_motor import AsyncMongoMockClient
+    except ImportError:
+        raise SystemExit("--backend fake needs: pip install -r benchmarks/requirements.txt")
+
+    from app.db import mongo as mongo_module
+    mongomock.collection.Collection.bulk_write = _replay_bulk_write
+    mongo_module.AsyncIOMotorClient = AsyncMongoMockClient
+
+
+def configure(args):
+    redis_url = start_fake_redis() if args.backend == "fake" else args.redis_url
+    os.environ["REDIS_URL"] = redis_url
+    if args.backend == "local":
+        os.environ["MONGO_URI"] = args.mongo_uri
+    os.environ["DB_NAME"] = args.mongo_db
+    os.environ["OPENAI_BASE_URL"] = args.openai_base_url or start_openai_stub()
+    # Measure the API, not scrapes: refresh jobs are queued but not worked off
+    os.environ["SCRAPE_WORKERS_IN_APP"] = "false"
+    os.environ["DEMO_SCRAPER"] = "true"
+
+    if args.backend == "fake":
+        use_fake_mongo()
+
+
+# ---------------------------------------------------------------------------
+# Run
+# ---------------------------------------------------------------------------
+
+async def seed(page_count: int) -> List[str]:
+    from app.db.mongo import mongo
+    from app.services.ingest_service import IngestService
+    from app.services.scraper_service import LinkedInScraperService
+
+    for name in await mongo.db.list_collection_names():
+        await mongo.db[name].delete_many({})
+
+    scraper, ingest = LinkedInScraperService(), IngestService()
+    page_ids = [f"{BENCH_PREFIX}{i:04d}" for i in range(page_count)]
+    for page_id in page_ids:
+        await ingest.ingest(scraper._demo_payload(page_id))
+    return page_ids
+
+
+async def flush_caches():
+    from app.core.cache import local_cache, redis_bytes_client
+
+    await redis_bytes_client.flushdb()
+    local_cache.clear()
+
+
+def schedule(pattern: str, page_ids: List[str], total: int, rng: random.Random) -> List[List[str]]:
+    """Page IDs to request, grouped in rounds (cold flushes caches between rounds)."""
+    if pattern == "mixed":
+        hot = page_ids[: max(1, len(page_ids) // 5)]
+        picks = [rng.choice(hot) if rng.random() < 0.8 else rng.choice(page_ids) for _ in range(total)]
+        return [picks]
+
+    picks = [page_ids[i % len(page_ids)] for i in range(total)]
+    return [picks[i:i + len(page_ids)] for i in range(0, total, len(page_ids))]
+
+
+async def drive(client, make_request, rounds: List[List[str]], pattern: str, concurrency: int) -> dict:
+    semaphore = asyncio.Semaphore(concurrency)
+    latencies: List[float] = []
+    errors = 0
+
+    async def one(page_id: str):
+        nonlocal errors
+        method, url, body = make_request(page_id)
+        async with semaphore:
+            started = time.perf_counter()
+            resp = await client.request(method, url, json=body)
+            elapsed = time.perf_counter() - started
+        # Streams report failures in-band, after a 200
+        if resp.status_code >= 400 or b"event: error\n" in resp.content:
+            errors += 1
+        else:
+            latencies.append(elapsed)
+
+    if pattern == "warm":
+        await asyncio.gather(*(one(page_id) for page_id in rounds[0]))
+        latencies.clear()
+        errors = 0
+
+    measured = 0.0
+    for index, page_ids in enumerate(rounds):
+        if pattern == "cold" or (pattern == "mixed" and index == 0):
+            await flush_caches()
+        started = time.perf_counter()
+        await asyncio.gather(*(one(page_id) for page_id in page_ids))
+        measured += time.perf_counter() - started
+
+    return summarize(latencies, errors, measured)
+
+
+async def run(args) -> dict:
+    import httpx
+
+    from app.main import app
+
+    for handler in app.router.on_startup:
+        await handler()
+    try:
+        page_ids = await seed(args.pages)
+        rng = random.Random(args.seed)
+        results = {}
+        # Failed requests are counted as errors rather than aborting the run
+        transport = httpx.ASGITransport(app=app, raise_app_exceptions=False)
+        async with httpx.AsyncClient(transport=transport, base_url="http://bench") as client:
+            for name, make_request in endpoints(page_ids, args.backend).items():
+                if args.only and not any(part in name for part in args.only):
+                    continue
+                rounds = schedule(args.pattern, page_ids, args.requests, rng)
+                results[name] = await drive(client, make_request, rounds, args.pattern, args.concurrency)
+    finally:
+        for handler in app.router.on_shutdown:
+            await handler()
+
+    return {
+        "meta": {
+            "backend": args.backend,
+            "pattern": args.pattern,
+            "pages": args.pages,
+            "requests_per_endpoint": args.requests,
+            "concurrency": args.concurrency,
+            "seed": args.seed,
+            "python": platform.python_version(),
+            "started_at": datetime.utcnow().isoformat(timespec="seconds"),
+        },
+        "endpoints": results,
+    }
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--backend", choices=("fake", "local"), default="fake")
+    parser.add_argument("--pattern", choices=PATTERNS, default="warm")
+    parser.add_argument("--pages", type=int, default=20, help="Demo pages to seed")
+    parser.add_argument("--requests", type=int, default=200, help="Measured requests per endpoint")
+    parser.add_argument("--concurrency", type=int, default=16)
+    parser.add_argument("--seed", type=int, default=1, help="RNG seed for the mixed pattern")
+    parser.add_argument("--only", nargs="*", help="Only endpoints whose name contains one of these")
+    parser.add_argument("--mongo-uri", default="mongodb://localhost:27017")
+    parser.add_argument("--mongo-db", default="linkedin_insights_bench")
+    parser.add_argument("--redis-url", default="redis://localhost:6379/15")
+    parser.add_argument("--openai-base-url", help="OpenAI-compatible API (default: tests/openai_stub.py)")
+    parser.add_argument("--output", type=Path, help="Also write the results JSON here")
+    parser.add_argument("--baseline", type=Path, help="Results JSON to compare against")
+    parser.add_argument("--max-regression", type=float, default=0.25, help="Allowed change, as a fraction")
+    args = parser.parse_args(argv)
+
+    configure(args)
+    results = asyncio.run(run(args))
+
+    status = 0
+    if args.baseline:
+        baseline = json.loads(args.baseline.read_text())
+        comparison = compare(results, baseline, args.max_regression)
+        results["comparison"] = {
+            "baseline": str(args.baseline),
+            # Runs are only comparable under the same load settings
+            "settings_differ": [
+                key for key in ("backend", "pattern", "pages", "requests_per_endpoint", "concurrency")
+                if baseline.get("meta", {}).get(key) != results["meta"][key]
+            ],
+            "max_regression": args.max_regression,
+            "regressions": [row for row in comparison if row["regression"]],
+            "changes": comparison,
+        }
+        status = 1 if results["comparison"]["regressions"] else 0
+
+    output = json.dumps(results, indent=2)
+    print(output)
+    if args.output:
+        args.output.write_text(output + "\n")
+    return status
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -0,0 +1,57 @@
+"""
+HTML parsing benchmark for the live scraper.
+
+Runs every saved fixture in tests/fixtures through each parser backend
+and reports pages/sec as JSON:
+
+    python -m benchmarks.parse_bench [--seconds 2] [--fixtures DIR]
+"""
+import argparse
+import json
+import time
+from pathlib import Path
+
+from app.services.html_parser import lxml_available, parse_company_html
+from tests.fixtures import HTML_FIXTURES_DIR, legacy_parse
+
+
+def backends():
+    yield "legacy/html.parser", lambda html: legacy_parse(html, "bench")
+    yield "single-pass/html.parser", lambda html: parse_company_html(html, "bench", "html.parser")
+    if lxml_available():
+        yield "single-pass/lxml", lambda html: parse_company_html(html, "bench", "lxml")
+
+
+def run(fixtures_dir: Path, seconds: float) -> dict:
+    corpus = [path.read_text() for path in sorted(fixtures_dir.glob("*.html"))]
+    if not corpus:
+        raise SystemExit(f"No *.html fixtures found in {fixtures_dir}")
+
+    results = {}
+    for name, parse in backends():
+        pages = 0
+        started = time.perf_counter()
+        while time.perf_counter() - started < seconds:
+            for html in corpus:
+                parse(html)
+            pages += len(corpus)
+        elapsed = time.perf_counter() - started
+        results[name] = {"pages": pages, "seconds": round(elapsed, 3), "pages_per_sec": round(pages / elapsed, 1)}
+
+    return {
+        "fixtures": len(corpus),
+        "corpus_bytes": sum(len(html) for html in corpus),
+        "backends": results,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--fixtures", type=Path, default=HTML_FIXTURES_DIR)
+    parser.add_argument("--seconds", type=float, default=2.0, help="Time budget per backend")
+    args = parser.parse_args()
+    print(json.dumps(run(args.fixtures, args.seconds), indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -1,9 +1,9 @@
-import { useState } from "react";
+import { useEffect, useRef, useState } from "react";
 import {
   fetchPage,
-  fetchPosts,
+  fetchFeed,
   fetchEmployees,
-  fetchAIInsights
+  streamAIInsights
 } from "./api";
 
 import PageHeader from "./components/PageHeader";
@@ -17,8 +17,30 @@ function App() {
   const [posts, setPosts] = useState([]);
   const [employees, setEmployees] = useState([]);
   const [ai, setAI] = useState(null);
+  const [aiStreaming, setAIStreaming] = useState(false);
   const [loading, setLoading] = useState(false);
   const [error, setError] = useState("");
+  const closeStream = useRef(null);
+
+  useEffect(() => () => closeStream.current?.(), []);
+
+  const startInsightsStream = () => {
+    closeStream.current?.();
+    setAI(null);
+    setAIStreaming(true);
+
+    closeStream.current = streamAIInsights(pageId, {
+      onSection: (section) => setAI((prev) => ({ ...prev, ...section })),
+      onDone: (insights) => {
+        setAI(insights);
+        setAIStreaming(false);
+      },
+      onError: (err) => {
+        setError(err.message);
+        setAIStreaming(false);
+      }
+    });
+  };
 
   const loadData = async () => {
     setLoading(true);
@@ -27,16 +49,15 @@ function App() {
     try {
       const pageData = await fetchPage(pageId);
       setPage(pageData);
+      startInsightsStream();
 
-      const [postsData, empData, aiData] = await Promise.all([
-        fetchPosts(pageId),
-        fetchEmployees(pageId),
-        fetchAIInsights(pageId)
+      const [postsData, empData] = await Promise.all([
+        fetchFeed(pageId),
+        fetchEmployees(pageId)
       ]);
 
       setPosts(postsData);
       setEmployees(empData);
-      setAI(aiData);
     } catch (err) {
       setError(err.message);
     } finally {
@@ -70,7 +91,9 @@ function App() {
         {error && <p className="text-red-600">{error}</p>}
 
         {page && <PageHeader page={page} />}
-        {ai && <AIInsights insights={ai} />}
+        {(ai || aiStreaming) && (
+          <AIInsights insights={ai} streaming={aiStreaming} />
+        )}
         {posts.length > 0 && <PostsList posts={posts} />}
         {employees.length > 0 && (
           <EmployeesList employees={employees} />
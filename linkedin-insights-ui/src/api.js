@@ -12,6 +12,13 @@ export async function fetchPosts(pageId) {
   return res.json();
 }
 
+// Posts with their newest comments embedded (`top_comments`), in one request
+export async function fetchFeed(pageId, comments = 3) {
+  const res = await fetch(`${API_BASE}/pages/${pageId}/feed?limit=15&comments=${comments}`);
+  if (!res.ok) throw new Error("Failed to fetch feed");
+  return res.json();
+}
+
 export async function fetchEmployees(pageId) {
   const res = await fetch(`${API_BASE}/pages/${pageId}/employees`);
   if (!res.ok) throw new Error("Failed to fetch employees");
@@ -23,3 +30,21 @@ export async function fetchAIInsights(pageId) {
   if (!res.ok) throw new Error("Failed to fetch AI insights");
   return res.json();
 }
+
+// Streams AI insights over Server-Sent Events. `onSection` receives each
+// completed top-level field; `onDone` the full insights. Returns a closer.
+export function streamAIInsights(pageId, { onSection, onDone, onError }) {
+  const source = new EventSource(`${API_BASE}/pages/${pageId}/ai-insights/stream`);
+
+  source.addEventListener("section", (e) => onSection(JSON.parse(e.data)));
+  source.addEventListener("done", (e) => {
+    source.close();
+    onDone(JSON.parse(e.data));
+  });
+  source.addEventListener("error", (e) => {
+    source.close();
+    onError(new Error(e.data ? JSON.parse(e.data).error : "AI insights stream failed"));
+  });
+
+  return () => source.close();
+}
@@ -1,9 +1,16 @@
-export default function AIInsights({ insights }) {
+export default function AIInsights({ insights, streaming }) {
   return (
     <div className="mt-6">
-      <h3 className="text-lg font-semibold mb-2">AI Insights</h3>
+      <h3 className="text-lg font-semibold mb-2">
+        AI Insights
+        {streaming && (
+          <span className="ml-2 text-sm font-normal text-blue-600">
+            Generating...
+          </span>
+        )}
+      </h3>
       <pre className="bg-gray-100 p-3 rounded text-sm overflow-auto">
-        {JSON.stringify(insights, null, 2)}
+        {insights ? JSON.stringify(insights, null, 2) : ""}
       </pre>
     </div>
   );
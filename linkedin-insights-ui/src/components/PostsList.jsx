@@ -12,6 +12,15 @@ export default function PostsList({ posts }) {
             <p className="text-sm text-gray-500">
               Likes: {post.likes} • Comments: {post.comments_count}
             </p>
+            {post.top_comments?.length > 0 && (
+              <ul className="mt-2 space-y-1 border-l-2 pl-3">
+                {post.top_comments.map((comment) => (
+                  <li key={comment.comment_id} className="text-sm">
+                    <span className="font-medium">{comment.author || "Anonymous"}</span>: {comment.content}
+                  </li>
+                ))}
+              </ul>
+            )}
           </li>
         ))}
       </ul>
@@ -1,7 +1,67 @@
+import socket
 import sys
+import threading
+import time
 from pathlib import Path
 
+import pytest
+import uvicorn
+
 # Ensure project root is on sys.path for imports like `from app.main import app`
 ROOT = Path(__file__).resolve().parent.parent
 if str(ROOT) not in sys.path:
     sys.path.insert(0, str(ROOT))
+
+
+@pytest.fixture
+def anyio_backend():
+    """Async tests run on asyncio unless a module overrides this."""
+    return "asyncio"
+
+
+@pytest.fixture(scope="session")
+def openai_stub_url():
+    """Run tests/openai_stub.py on a free local port for the whole session."""
+    from tests.openai_stub import app as stub_app
+
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        port = sock.getsockname()[1]
+
+    server = uvicorn.Server(uvicorn.Config(stub_app, host="127.0.0.1", port=port, log_level="warning"))
+    thread = threading.Thread(target=server.run, daemon=True)
+    thread.start()
+    deadline = time.time() + 10
+    while not server.started and time.time() < deadline:
+        time.sleep(0.05)
+
+    yield f"http://127.0.0.1:{port}/v1"
+
+    server.should_exit = True
+    thread.join(timeout=5)
+
+
+@pytest.fixture
+def fake_locks(monkeypatch):
+    """In-memory stand-in for the Redis leases used by SingleFlight."""
+    from app.core import singleflight as singleflight_module
+
+    locks = {}
+
+    async def fake_acquire(key: str, ttl_ms: int):
+        if key in locks:
+            return None
+        locks[key] = "token"
+        return "token"
+
+    async def fake_release(key: str, token: str):
+        if locks.get(key) == token:
+            del locks[key]
+
+    async def fake_exists(key: str):
+        return key in locks
+
+    monkeypatch.setattr(singleflight_module, "acquire_lock", fake_acquire)
+    monkeypatch.setattr(singleflight_module, "release_lock", fake_release)
+    monkeypatch.setattr(singleflight_module, "lock_exists", fake_exists)
+    return locks
@@ -0,0 +1,37 @@
+"""
+Saved LinkedIn company pages (*.html in this directory) and the pre-single-pass
+extractor they are checked against. Shared by tests/test_scraper.py and
+benchmarks/parse_bench.py.
+"""
+from pathlib import Path
+
+from bs4 import BeautifulSoup
+
+from app.services.html_parser import extract_number
+
+HTML_FIXTURES_DIR = Path(__file__).resolve().parent
+
+
+def html_fixtures():
+    return sorted(HTML_FIXTURES_DIR.glob("*.html"))
+
+
+def legacy_parse(html: str, page_id: str, parser: str = "html.parser") -> dict:
+    """The pre-single-pass extractor: one get_text() per keyword."""
+    soup = BeautifulSoup(html, parser)
+    name = soup.find("h1")
+    description = soup.find("p")
+
+    def number(keywords):
+        for kw in keywords:
+            found = extract_number(soup.get_text(" ", strip=True), [kw])
+            if found:
+                return found
+        return None
+
+    return {
+        "name": name.get_text(strip=True) if name else page_id.capitalize(),
+        "description": description.get_text(strip=True) if description else None,
+        "followers": number(["followers", "Follower"]) or 0,
+        "head_count": number(["employees", "employee"]) or 0,
+    }
@@ -0,0 +1,76 @@
+"""
+Local stand-in for the OpenAI chat completions API.
+
+Used by the tests, and runnable on its own for local development:
+
+    uvicorn tests.openai_stub:app --port 8001
+    OPENAI_BASE_URL=http://localhost:8001/v1 uvicorn app.main:app
+"""
+import json
+import time
+
+from fastapi import FastAPI, Request
+from fastapi.responses import StreamingResponse
+
+app = FastAPI(title="OpenAI stand-in")
+app.state.calls = 0
+
+
+def _insights_for(prompt: str) -> dict:
+    company = "unknown"
+    for line in prompt.splitlines():
+        if line.startswith("Company Name:"):
+            company = line.split(":", 1)[1].strip()
+    return {
+        "company": company,
+        "positioning": f"{company} is positioned as a growing player in its industry.",
+        "hiring_signals": ["Steady engineering hiring"],
+        "recommendations": ["Publish more customer stories"],
+    }
+
+
+@app.post("/v1/chat/completions")
+async def chat_completions(request: Request):
+    body = await request.json()
+    app.state.calls += 1
+    prompt = body["messages"][-1]["content"]
+    content = json.dumps(_insights_for(prompt))
+    if body.get("stream"):
+        usage = (body.get("stream_options") or {}).get("include_usage", False)
+        return StreamingResponse(_stream(body["model"], content, prompt, usage), media_type="text/event-stream")
+    return {
+        "id": f"chatcmpl-stub-{app.state.calls}",
+        "object": "chat.completion",
+        "created": int(time.time()),
+        "model": body["model"],
+        "choices": [{
+            "index": 0,
+            "message": {"role": "assistant", "content": content},
+            "finish_reason": "stop",
+        }],
+        "usage": _usage(prompt, content),
+    }
+
+
+async def _stream(model: str, content: str, prompt: str, include_usage: bool):
+    # Small fixed-size deltas so that sections straddle chunk boundaries.
+    for start in range(0, len(content), 7):
+        chunk = {
+            "id": f"chatcmpl-stub-{app.state.calls}",
+            "object": "chat.completion.chunk",
+            "created": int(time.time()),
+            "model": model,
+            "choices": [{"index": 0, "delta": {"content": content[start:start + 7]}, "finish_reason": None}],
+        }
+        yield f"data: {json.dumps(chunk)}\n\n"
+    if include_usage:
+        usage = {"id": f"chatcmpl-stub-{app.state.calls}", "object": "chat.completion.chunk",
+                 "created": int(time.time()), "model": model, "choices": [], "usage": _usage(prompt, content)}
+        yield f"data: {json.dumps(usage)}\n\n"
+    yield "data: [DONE]\n\n"
+
+
+def _usage(prompt: str, content: str) -> dict:
+    prompt_tokens, completion_tokens = len(prompt.split()), len(content.split())
+    return {"prompt_tokens": prompt_tokens, "completion_tokens": completion_tokens,
+            "total_tokens": prompt_tokens + completion_tokens}
@@ -0,0 +1,141 @@
+import asyncio
+
+import pytest
+
+from app.config import settings
+from app.services import ai_service
+from app.services import page_service as page_service_module
+from app.services.ai_service import AIService, insights_content_hash
+from app.services.page_service import PageService
+from app.db.repositories.ai_insight_repo import AIInsightRepository
+from tests.openai_stub import app as stub_app
+
+
+@pytest.fixture
+async def stub_client(monkeypatch, openai_stub_url):
+    monkeypatch.setattr(settings, "OPENAI_BASE_URL", openai_stub_url)
+    monkeypatch.setattr(settings, "OPENAI_API_KEY", None)
+    await ai_service.close_ai_client()
+    yield
+    await ai_service.close_ai_client()
+
+
+PAGE = {
+    "page_id": "deepsolv",
+    "name": "Deepsolv",
+    "industry": "Software Development",
+    "followers": 1200,
+    "head_count": 80,
+    "description": "AI automation",
+    "specialties": ["AI"],
+    "last_scraped_at": "2024-01-01T00:00:00",
+}
+
+
+def test_content_hash_tracks_prompt_fields_only():
+    same = insights_content_hash(PAGE)
+    assert insights_content_hash({**PAGE, "last_scraped_at": "2025-01-01T00:00:00"}) == same
+    assert insights_content_hash({**PAGE, "followers": 1201}) != same
+
+
+@pytest.mark.anyio
+async def test_shared_client_talks_to_stand_in(stub_client):
+    first, second = AIService(), AIService()
+    assert first.client is second.client
+
+    insights = await first.generate_page_insights(PAGE)
+    assert insights["company"] == "Deepsolv"
+
+
+@pytest.mark.anyio
+async def test_stalled_stream_consumer_does_not_hold_a_concurrency_slot(stub_client, monkeypatch):
+    monkeypatch.setattr(settings, "OPENAI_CONCURRENCY", 1)
+    await ai_service.close_ai_client()
+    service = AIService()
+
+    stream = service.stream_page_insights(PAGE)
+    kind, _ = await stream.__anext__()  # the SSE client reads one event, then stalls
+    assert kind == "token"
+
+    insights = await asyncio.wait_for(service.generate_page_insights(PAGE), timeout=5)
+    assert insights["company"] == "Deepsolv"
+    await stream.aclose()
+
+
+@pytest.fixture
+def stores(monkeypatch):
+    cache, persisted = {}, {}
+
+    async def fake_load_stored(self, page_id):
+        return dict(PAGE)
+
+    async def fake_get_cache(key):
+        return cache.get(key)
+
+    async def fake_set_cache(key, value, ttl=None, family=None):
+        cache[key] = value
+
+    async def fake_get_by_hash(self, content_hash):
+        return persisted.get(content_hash)
+
+    async def fake_save(self, page_id, content_hash, model, insights):
+        persisted[content_hash] = insights
+
+    monkeypatch.setattr(PageService, "_load_stored", fake_load_stored)
+    monkeypatch.setattr(page_service_module, "get_cache", fake_get_cache)
+    monkeypatch.setattr(page_service_module, "set_cache", fake_set_cache)
+    monkeypatch.setattr(AIInsightRepository, "get_by_hash", fake_get_by_hash)
+    monkeypatch.setattr(AIInsightRepository, "save", fake_save)
+    return cache, persisted
+
+
+@pytest.mark.anyio
+async def test_insights_are_generated_once_per_content(stub_client, fake_locks, stores):
+    cache, persisted = stores
+    calls_before = stub_app.state.calls
+    first = await PageService().get_ai_insights("deepsolv")
+    cache.clear()  # e.g. Redis TTL expired: Mongo still has it
+    second = await PageService().get_ai_insights("deepsolv")
+
+    assert first == second
+    assert stub_app.state.calls == calls_before + 1
+    assert list(persisted) == [insights_content_hash(PAGE)]
+
+
+@pytest.mark.anyio
+async def test_stream_emits_sections_then_persists(stub_client, fake_locks, stores):
+    cache, persisted = stores
+    calls_before = stub_app.state.calls
+
+    events = [event async for event in PageService().stream_ai_insights("deepsolv")]
+    kinds = [kind for kind, _ in events]
+    sections = [data for kind, data in events if kind == "section"]
+    done = events[-1]
+
+    assert "token" in kinds and done[0] == "done"
+    assert [next(iter(s)) for s in sections] == ["company", "positioning", "hiring_signals", "recommendations"]
+    assert {k: v for s in sections for k, v in s.items()} == done[1]
+    assert persisted[insights_content_hash(PAGE)] == done[1]
+
+    # Second stream is served from the cache without calling the model.
+    again = [event async for event in PageService().stream_ai_insights("deepsolv")]
+    assert again == [("done", done[1])]
+    assert stub_app.state.calls == calls_before + 1
+
+    from prometheus_client import REGISTRY
+    tokens = REGISTRY.get_sample_value("openai_tokens_total", {"model": settings.OPENAI_MODEL, "kind": "completion"})
+    assert tokens and tokens > 0
+
+
+@pytest.mark.anyio
+async def test_concurrent_streams_share_one_generation(stub_client, fake_locks, stores):
+    calls_before = stub_app.state.calls
+
+    async def collect():
+        return [event async for event in PageService().stream_ai_insights("deepsolv")]
+
+    leader, *followers = await asyncio.gather(*(collect() for _ in range(3)))
+
+    assert "token" in [kind for kind, _ in leader] and leader[-1][0] == "done"
+    assert followers == [[leader[-1]], [leader[-1]]]
+    assert stub_app.state.calls == calls_before + 1
@@ -1,3 +1,5 @@
+from datetime import datetime
+
 import pytest
 import httpx
 
@@ -11,22 +13,38 @@ from app.db.repositories.comment_repo import CommentRepository
 from app.db.repositories.follower_repo import FollowerRepository
 
 
+@pytest.fixture(params=["asyncio", "trio"])
+def anyio_backend(request):
+    """The API tests keep running on both anyio backends (conftest defaults to asyncio)."""
+    return request.param
+
+
 @pytest.mark.anyio
 async def test_get_page(monkeypatch):
-    async def fake_get_or_scrape(self, page_id: str):
-        return {"page_id": page_id, "name": "TestCo"}
+    from app.core.codec import dumps_json
+
+    async def fake_get_page_json(self, page_id: str, fields=None):
+        return dumps_json({"page_id": page_id, "name": "TestCo"})
 
-    monkeypatch.setattr(PageService, "get_or_scrape_page", fake_get_or_scrape)
+    async def fake_ensure_fresh(self, page_id: str):
+        return 42.7, True, datetime(2024, 5, 1, 12, 0, 0)
+
+    monkeypatch.setattr(PageService, "get_page_json", fake_get_page_json)
+    monkeypatch.setattr(PageService, "ensure_fresh", fake_ensure_fresh)
 
     async with httpx.AsyncClient(transport=httpx.ASGITransport(app=app), base_url="http://test") as client:
         resp = await client.get("/api/pages/deepsolv")
         assert resp.status_code == 200
         assert resp.json()["page_id"] == "deepsolv"
+        assert resp.headers["X-Data-Age"] == "42"
+        assert resp.headers["X-Data-Stale"] == "1"
+        assert resp.headers["Last-Modified"] == "Wed, 01 May 2024 12:00:00 GMT"
+        assert resp.headers["Cache-Control"] == "no-cache"  # stale: always revalidate
 
 
 @pytest.mark.anyio
 async def test_search_pages(monkeypatch):
-    async def fake_search(self, query: dict, skip: int, limit: int):
+    async def fake_search(self, query: dict, skip: int, limit: int, projection=None):
         # Ensure filters are applied
         assert query["followers"]["$gte"] == 1000
         assert query["followers"]["$lte"] == 5000
@@ -49,7 +67,7 @@ async def test_search_pages(monkeypatch):
 
 @pytest.mark.anyio
 async def test_posts_pagination(monkeypatch):
-    async def fake_get_recent(self, page_id: str, skip: int, limit: int):
+    async def fake_get_recent(self, page_id: str, skip: int, limit: int, projection=None):
         assert skip == 5
         assert limit == 5
         return [{"post_id": f"post_{i}", "page_id": page_id} for i in range(limit)]
@@ -64,7 +82,7 @@ async def test_posts_pagination(monkeypatch):
 
 @pytest.mark.anyio
 async def test_employees_pagination(monkeypatch):
-    async def fake_get_by_page(self, page_id: str, skip: int, limit: int):
+    async def fake_get_by_page(self, page_id: str, skip: int, limit: int, projection=None):
         assert skip == 10
         assert limit == 10
         return [{"name": f"Emp{i}", "page_id": page_id} for i in range(limit)]
@@ -79,7 +97,7 @@ async def test_employees_pagination(monkeypatch):
 
 @pytest.mark.anyio
 async def test_comments_filter(monkeypatch):
-    async def fake_get_by_page(self, page_id: str, skip: int, limit: int, post_id=None):
+    async def fake_get_by_page(self, page_id: str, skip: int, limit: int, post_id=None, projection=None):
         assert post_id == "post_1"
         return [{"comment_id": "c1", "post_id": post_id, "page_id": page_id}]
 
@@ -97,7 +115,7 @@ async def test_comments_filter(monkeypatch):
 
 @pytest.mark.anyio
 async def test_followers_and_following(monkeypatch):
-    async def fake_get_by_page(self, page_id: str, relation: str, skip: int, limit: int):
+    async def fake_get_by_page(self, page_id: str, relation: str, skip: int, limit: int, projection=None):
         assert relation in {"follower", "following"}
         return [{"profile_id": f"{relation}_1", "relation": relation, "page_id": page_id}]
 
@@ -116,3 +134,249 @@ async def test_followers_and_following(monkeypatch):
         assert resp2.status_code == 200
         assert resp1.json()[0]["relation"] == "follower"
         assert resp2.json()[0]["relation"] == "following"
+
+
+@pytest.mark.anyio
+async def test_posts_cursor_pagination(monkeypatch):
+    from datetime import datetime
+    from app.utils.pagination import decode_cursor, encode_cursor
+
+    posted_at = datetime(2024, 1, 1, 12, 0)
+    seen_after = []
+
+    async def fake_get_recent_after(self, page_id: str, after, limit: int, projection=None):
+        seen_after.append(after)
+        assert limit == 3  # one extra row to detect the next page
+        return [{"post_id": f"post_{i}", "page_id": page_id, "posted_at": posted_at} for i in (9, 8, 7)]
+
+    monkeypatch.setattr(PostRepository, "get_recent_after", fake_get_recent_after)
+
+    async with httpx.AsyncClient(transport=httpx.ASGITransport(app=app), base_url="http://test") as client:
+        resp = await client.get("/api/pages/deepsolv/posts", params={"cursor": "", "limit": 2})
+        assert resp.status_code == 200
+        data = resp.json()
+        assert [p["post_id"] for p in data["items"]] == ["post_9", "post_8"]
+        assert decode_cursor(data["next_cursor"], datetime, str) == [posted_at, "post_8"]
+
+        resp = await client.get("/api/pages/deepsolv/posts", params={"cursor": data["next_cursor"], "limit": 2})
+        assert seen_after == [None, [posted_at, "post_8"]]
+
+        resp = await client.get("/api/pages/deepsolv/posts", params={"cursor": "not-a-cursor"})
+        assert resp.status_code == 400
+
+        # Decoded values go into the query: operators and wrong shapes are rejected, not run
+        for crafted in (encode_cursor({"$ne": None}, "post_8"), encode_cursor(posted_at), encode_cursor(posted_at, 8)):
+            resp = await client.get("/api/pages/deepsolv/posts", params={"cursor": crafted})
+            assert resp.status_code == 400
+        assert len(seen_after) == 2
+
+
+@pytest.mark.anyio
+async def test_refresh_pages_enqueues_jobs(monkeypatch):
+    from app.services.job_service import JobService
+
+    async def fake_enqueue(self, page_ids):
+        return {"batch_id": "b1", "jobs": [{"job_id": f"j_{pid}", "page_id": pid} for pid in page_ids]}
+
+    monkeypatch.setattr(JobService, "enqueue_refresh", fake_enqueue)
+
+    async with httpx.AsyncClient(transport=httpx.ASGITransport(app=app), base_url="http://test") as client:
+        resp = await client.post("/api/pages/refresh", json={"page_id": "deepsolv", "page_ids": ["openai", "deepsolv"]})
+        assert resp.status_code == 202
+        assert [job["page_id"] for job in resp.json()["jobs"]] == ["deepsolv", "openai"]
+
+        resp = await client.post("/api/pages/refresh", json={"page_ids": []})
+        assert resp.status_code == 422
+
+
+@pytest.mark.anyio
+async def test_search_pages_prefix_and_text_modes(monkeypatch):
+    queries = []
+
+    async def fake_search(self, query: dict, skip: int, limit: int, projection=None):
+        queries.append(("plain", query))
+        return []
+
+    async def fake_search_ranked(self, query: dict, skip: int, limit: int, projection=None):
+        queries.append(("ranked", query))
+        return [{"page_id": "p1", "score": 1.5}]
+
+    monkeypatch.setattr(PageRepository, "search", fake_search)
+    monkeypatch.setattr(PageRepository, "search_ranked", fake_search_ranked)
+
+    async with httpx.AsyncClient(transport=httpx.ASGITransport(app=app), base_url="http://test") as client:
+        resp = await client.get("/api/pages/search", params={"mode": "prefix", "industry": "Soft.", "name": "Deep"})
+        assert resp.status_code == 200
+        resp = await client.get("/api/pages/search", params={"mode": "text", "q": "software ai"})
+        assert resp.json()[0]["score"] == 1.5
+
+    kind, query = queries[0]
+    assert kind == "plain"
+    assert query["industry_norm"] == {"$regex": "^soft\\."}
+    assert query["name_norm"] == {"$regex": "^deep"}
+    assert queries[1] == ("ranked", {"followers": {"$gte": 0, "$lte": 1_000_000}, "$text": {"$search": "software ai"}})
+
+
+@pytest.mark.anyio
+async def test_pages_batch(monkeypatch):
+    from app.services import page_service as page_service_module
+    from app.services.job_service import JobService
+
+    mget_calls, filled = [], {}
+
+    async def fake_get_cache_many(keys):
+        mget_calls.append(keys)
+        return {"page:cached": {"page_id": "cached"}}
+
+    async def fake_set_cache_many(values, ttl=None, families=None):
+        filled.update(values)
+
+    async def fake_get_many(self, page_ids, projection=None):
+        assert page_ids == ["stored", "unknown"]
+        return [{"page_id": "stored", "name": "Stored"}]
+
+    async def fake_enqueue(self, page_ids):
+        return {"batch_id": "b1", "jobs": [{"job_id": "j1", "page_id": pid} for pid in page_ids]}
+
+    monkeypatch.setattr(page_service_module, "get_cache_many", fake_get_cache_many)
+    monkeypatch.setattr(page_service_module, "set_cache_many", fake_set_cache_many)
+    monkeypatch.setattr(PageRepository, "get_many", fake_get_many)
+    monkeypatch.setattr(JobService, "enqueue_refresh", fake_enqueue)
+
+    async with httpx.AsyncClient(transport=httpx.ASGITransport(app=app), base_url="http://test") as client:
+        resp = await client.post(
+            "/api/pages/batch",
+            json={"page_ids": ["cached", "stored", "unknown", "cached"], "scrape_missing": True},
+        )
+        assert resp.status_code == 200
+        data = resp.json()
+
+    assert len(mget_calls) == 1
+    assert set(data["pages"]) == {"cached", "stored"}
+    assert data["missing"] == ["unknown"]
+    assert data["jobs"]["jobs"][0]["page_id"] == "unknown"
+    assert list(filled) == ["page:stored"]
+
+
+@pytest.mark.anyio
+async def test_fields_become_mongo_projection(monkeypatch):
+    projections = []
+
+    async def fake_get_recent(self, page_id: str, skip: int, limit: int, projection=None):
+        projections.append(projection)
+        return [{"post_id": "post_1", "likes": 3}]
+
+    monkeypatch.setattr(PostRepository, "get_recent", fake_get_recent)
+
+    async with httpx.AsyncClient(transport=httpx.ASGITransport(app=app), base_url="http://test") as client:
+        resp = await client.get("/api/pages/deepsolv/posts", params={"fields": "likes,post_id,likes"})
+        assert resp.status_code == 200
+        assert resp.json() == [{"post_id": "post_1", "likes": 3}]
+
+        resp = await client.get("/api/pages/deepsolv/posts")
+        assert resp.status_code == 200
+
+        resp = await client.get("/api/pages/deepsolv/posts", params={"fields": "$where"})
+        assert resp.status_code == 400
+
+    assert projections == [{"_id": 0, "likes": 1, "post_id": 1}, {"_id": 0}]
+
+
+@pytest.mark.anyio
+async def test_page_analytics_reads_materialized_summary(monkeypatch):
+    from app.db.repositories.analytics_repo import AnalyticsRepository
+
+    async def fake_get(self, page_id: str):
+        if page_id != "deepsolv":
+            return None
+        return {
+            "page_id": page_id,
+            "post_count": 4,
+            "post_likes": 100,
+            "post_comments": 10,
+            "comment_count": 8,
+            "comment_likes": 6,
+            "top_posts": [{"post_id": "p1", "likes": 60}],
+        }
+
+    async def fake_get_by_page_id(self, page_id: str, projection=None):
+        return None
+
+    monkeypatch.setattr(AnalyticsRepository, "get", fake_get)
+    monkeypatch.setattr(PageRepository, "get_by_page_id", fake_get_by_page_id)
+
+    async with httpx.AsyncClient(transport=httpx.ASGITransport(app=app), base_url="http://test") as client:
+        resp = await client.get("/api/pages/deepsolv/analytics")
+        assert resp.status_code == 200
+        data = resp.json()
+        assert data["avg_likes_per_post"] == 25.0
+        assert data["avg_comments_per_post"] == 2.5
+        assert data["avg_likes_per_comment"] == 0.75
+        assert data["top_posts"][0]["post_id"] == "p1"
+
+        resp = await client.get("/api/pages/unknown/analytics")
+        assert resp.status_code == 404
+
+
+@pytest.mark.anyio
+async def test_page_history_range_and_resolution(monkeypatch):
+    from datetime import datetime
+    from app.db.repositories.metrics_repo import MetricsRepository
+
+    calls = []
+
+    async def fake_history(self, page_id, start, end, resolution):
+        calls.append((page_id, start, end, resolution))
+        return [{"t": datetime(2024, 1, 1), "followers": 100, "head_count": 10, "samples": 3}]
+
+    monkeypatch.setattr(MetricsRepository, "history", fake_history)
+
+    async with httpx.AsyncClient(transport=httpx.ASGITransport(app=app), base_url="http://test") as client:
+        resp = await client.get(
+            "/api/pages/deepsolv/history",
+            params={"from": "2024-01-01T00:00:00Z", "to": "2024-06-30T00:00:00", "resolution": "week"},
+        )
+        assert resp.status_code == 200
+        assert resp.json()["points"][0]["followers"] == 100
+        assert calls[-1] == ("deepsolv", datetime(2024, 1, 1), datetime(2024, 6, 30), "week")
+
+        resp = await client.get("/api/pages/deepsolv/history", params={"from": "2024-06-30", "to": "2024-01-01"})
+        assert resp.status_code == 400
+        resp = await client.get("/api/pages/deepsolv/history", params={"resolution": "hour"})
+        assert resp.status_code == 422
+
+
+@pytest.mark.anyio
+async def test_feed_embeds_top_comments_with_two_queries(monkeypatch):
+    from app.services import page_service as page_service_module
+
+    queries, cached = [], {}
+
+    async def fake_get_recent(self, page_id, skip, limit, projection=None):
+        queries.append(("posts", skip, limit))
+        return [{"post_id": f"p{i}", "likes": i} for i in range(3)]
+
+    async def fake_get_top_for_posts(self, page_id, post_ids, per_post):
+        queries.append(("comments", post_ids, per_post))
+        return {"p0": [{"comment_id": "c1"}, {"comment_id": "c2"}], "p2": [{"comment_id": "c3"}]}
+
+    async def fake_get_cache_raw(key):
+        return None
+
+    async def fake_set_cache(key, value, ttl=None, family=None):
+        cached[key] = (value, family)
+
+    monkeypatch.setattr(PostRepository, "get_recent", fake_get_recent)
+    monkeypatch.setattr(CommentRepository, "get_top_for_posts", fake_get_top_for_posts)
+    monkeypatch.setattr(page_service_module, "get_cache_raw", fake_get_cache_raw)
+    monkeypatch.setattr(page_service_module, "set_cache", fake_set_cache)
+
+    async with httpx.AsyncClient(transport=httpx.ASGITransport(app=app), base_url="http://test") as client:
+        resp = await client.get("/api/pages/deepsolv/feed", params={"page": 2, "limit": 3, "comments": 2})
+
+    assert resp.status_code == 200
+    feed = resp.json()
+    assert [len(post["top_comments"]) for post in feed] == [2, 0, 1]
+    assert queries == [("posts", 3, 3), ("comments", ["p0", "p1", "p2"], 2)]
+    ((key, (value, family)),) = cached.items()
+    assert family == "page:deepsolv" and value == feed
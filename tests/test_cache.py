@@ -0,0 +1,126 @@
+import json
+
+import pytest
+from prometheus_client import REGISTRY
+
+from app.core import cache
+from app.core.cache import LocalCache
+
+
+class FakePipeline:
+    def __init__(self, redis):
+        self.redis = redis
+        self.ops = []
+
+    def __getattr__(self, name):
+        def queue(*args, **kwargs):
+            self.ops.append((name, args, kwargs))
+        return queue
+
+    async def execute(self):
+        return [await getattr(self.redis, name)(*args, **kwargs) for name, args, kwargs in self.ops]
+
+
+class FakeRedis:
+    def __init__(self):
+        self.store = {}
+        self.gets = 0
+        self.published = []
+
+    async def get(self, key):
+        self.gets += 1
+        return self.store.get(key)
+
+    async def mget(self, keys):
+        self.gets += 1
+        return [self.store.get(key) for key in keys]
+
+    async def set(self, key, value, ex=None):
+        self.store[key] = value
+
+    async def publish(self, channel, message):
+        self.published.append((channel, message))
+
+    def pipeline(self, transaction=True):
+        return FakePipeline(self)
+
+
+def evictions(reason):
+    return REGISTRY.get_sample_value("cache_l1_evictions_total", {"reason": reason}) or 0.0
+
+
+def test_local_cache_evicts_least_recently_used():
+    before = evictions("capacity")
+    local = LocalCache(max_entries=2, ttl_seconds=30)
+    local.set("a", 1, 30)
+    local.set("b", 2, 30)
+    local.get("a")
+    local.set("c", 3, 30)
+
+    assert local.get("b") == (False, None)
+    assert local.get("a") == (True, 1)
+    assert local.get("c") == (True, 3)
+    assert evictions("capacity") == before + 1
+
+
+def test_local_cache_expires_entries(monkeypatch):
+    now = [1000.0]
+    monkeypatch.setattr(cache.time, "monotonic", lambda: now[0])
+    before = evictions("expired")
+    local = LocalCache(max_entries=10, ttl_seconds=30)
+    local.set("a", 1, 300)  # capped to the L1 TTL
+
+    now[0] += 29
+    assert local.get("a") == (True, 1)
+    now[0] += 2
+    assert local.get("a") == (False, None)
+    assert evictions("expired") == before + 1
+
+
+@pytest.mark.anyio
+async def test_get_cache_serves_repeat_reads_from_l1(monkeypatch):
+    fake = FakeRedis()
+    fake.store["page:deepsolv"] = json.dumps({"page_id": "deepsolv"}).encode()  # pre-codec value
+    monkeypatch.setattr(cache, "redis_client", fake)
+    monkeypatch.setattr(cache, "redis_bytes_client", fake)
+    monkeypatch.setattr(cache, "local_cache", LocalCache(max_entries=10, ttl_seconds=30))
+
+    assert await cache.get_cache("page:deepsolv") == {"page_id": "deepsolv"}
+    assert await cache.get_cache("page:deepsolv") == {"page_id": "deepsolv"}
+    assert fake.gets == 1
+
+    await cache.set_cache("page:deepsolv", {"page_id": "deepsolv", "name": "New"})
+    assert fake.published and fake.published[0][1].endswith(":page:deepsolv")
+    assert (await cache.get_cache("page:deepsolv"))["name"] == "New"
+
+
+@pytest.mark.anyio
+async def test_cached_json_is_served_without_reencoding(monkeypatch):
+    from datetime import datetime
+
+    from app.core.codec import decode_value
+
+    fake = FakeRedis()
+    monkeypatch.setattr(cache, "redis_client", fake)
+    monkeypatch.setattr(cache, "redis_bytes_client", fake)
+    monkeypatch.setattr(cache, "local_cache", LocalCache(max_entries=0, ttl_seconds=30))
+
+    value = {"page_id": "deepsolv", "last_scraped_at": datetime(2024, 1, 2, 3, 4, 5)}
+    await cache.set_cache("page:deepsolv", value)
+
+    blob = fake.store["page:deepsolv"]
+    assert blob[:2] == b"j\x01"
+    assert decode_value(blob) == {"page_id": "deepsolv", "last_scraped_at": "2024-01-02T03:04:05"}
+    assert await cache.get_cache_raw("page:deepsolv") == blob[2:]
+
+
+def test_capped_redis_pool_queues_instead_of_failing(monkeypatch):
+    monkeypatch.setattr(cache.settings, "REDIS_MAX_CONNECTIONS", 7)
+    monkeypatch.setattr(cache.settings, "REDIS_POOL_TIMEOUT_SECONDS", 2.5)
+    pool = cache._redis_from_settings(decode_responses=True).connection_pool
+    assert isinstance(pool, cache.redis.BlockingConnectionPool)
+    assert pool.max_connections == 7 and pool.timeout == 2.5
+
+    monkeypatch.setattr(cache.settings, "REDIS_MAX_CONNECTIONS", None)
+    pool = cache._redis_from_settings(decode_responses=True).connection_pool
+    assert not isinstance(pool, cache.redis.BlockingConnectionPool)
@@ -0,0 +1,91 @@
+import csv
+import gzip
+import io
+import json
+from datetime import datetime, timedelta
+
+import httpx
+import pytest
+
+from app.config import settings
+from app.db.mongo import mongo
+from app.main import app
+from app.services.export_service import ExportService
+
+mongomock_motor = pytest.importorskip("mongomock_motor")
+
+
+@pytest.fixture
+async def db(monkeypatch):
+    """In-memory Mongo holding one page with 3 posts, 2 comments, 1 employee and 1 follower."""
+    database = mongomock_motor.AsyncMongoMockClient()["export_test"]
+    monkeypatch.setattr(mongo, "db", database)
+    now = datetime(2024, 5, 1)
+    await database.pages.insert_one({"page_id": "deepsolv", "name": "DeepSolv"})
+    await database.posts.insert_many([
+        {"page_id": "deepsolv", "post_id": f"p{i}", "content": f"post {i}", "likes": i,
+         "comments_count": 0, "posted_at": now - timedelta(days=i), "content_hash": "x"}
+        for i in range(3)
+    ])
+    await database.comments.insert_many([
+        {"page_id": "deepsolv", "post_id": "p0", "comment_id": f"c{i}", "author": None,
+         "content": "nice, \"quoted\"", "likes": 1, "posted_at": now}
+        for i in range(2)
+    ])
+    await database.employees.insert_one({"page_id": "deepsolv", "name": "Ada", "role": "CTO", "profile_url": "u"})
+    await database.followers.insert_one(
+        {"page_id": "deepsolv", "profile_id": "f1", "relation": "follower", "followed_at": now}
+    )
+    return database
+
+
+def client():
+    return httpx.AsyncClient(transport=httpx.ASGITransport(app=app), base_url="http://test")
+
+
+@pytest.mark.anyio
+async def test_ndjson_export_streams_every_entity_in_order(db):
+    async with client() as c:
+        resp = await c.get("/api/pages/deepsolv/export")
+
+    assert resp.status_code == 200
+    assert resp.headers["content-type"] == "application/x-ndjson"
+    rows = [json.loads(line) for line in resp.text.splitlines()]
+    assert [row["entity"] for row in rows] == ["posts"] * 3 + ["comments"] * 2 + ["employees", "followers"]
+    assert [row["post_id"] for row in rows[:3]] == ["p0", "p1", "p2"]
+    assert rows[0]["posted_at"] == "2024-05-01T00:00:00"
+    assert all("_id" not in row and "content_hash" not in row for row in rows)
+
+
+@pytest.mark.anyio
+async def test_csv_export_is_one_table_and_can_be_gzipped(db):
+    async with client() as c:
+        resp = await c.get(
+            "/api/pages/deepsolv/export", params={"format": "csv", "entities": "comments,posts", "gzip": "true"}
+        )
+
+    assert resp.headers["content-encoding"] == "gzip"
+    rows = list(csv.DictReader(io.StringIO(resp.text)))  # httpx decodes Content-Encoding
+    assert [row["entity"] for row in rows] == ["posts"] * 3 + ["comments"] * 2
+    assert rows[3]["content"] == 'nice, "quoted"'
+    assert rows[3]["author"] == "" and rows[0]["comment_id"] == ""
+
+
+@pytest.mark.anyio
+async def test_export_is_sent_in_bounded_chunks(db, monkeypatch):
+    monkeypatch.setattr(settings, "EXPORT_CHUNK_BYTES", 100)
+    monkeypatch.setattr(settings, "EXPORT_BATCH_SIZE", 2)
+
+    chunks = [chunk async for chunk in ExportService().stream("deepsolv", ["posts", "comments"])]
+    compressed = [chunk async for chunk in ExportService().stream("deepsolv", ["posts", "comments"], gzip=True)]
+
+    assert len(chunks) > 1
+    assert all(len(chunk) < 100 + 200 for chunk in chunks)
+    assert gzip.decompress(b"".join(compressed)) == b"".join(chunks)
+
+
+@pytest.mark.anyio
+async def test_export_rejects_unknown_entities_and_missing_pages(db):
+    async with client() as c:
+        assert (await c.get("/api/pages/deepsolv/export", params={"entities": "posts,likes"})).status_code == 422
+        assert (await c.get("/api/pages/unknown/export")).status_code == 404
@@ -0,0 +1,88 @@
+from datetime import datetime, timedelta
+
+import pytest
+
+from app.db.indexes import INDEXES
+from app.db.mongo import mongo
+from app.db.repositories.comment_repo import CommentRepository
+
+
+def _sort(docs, keys):
+    for field, direction in reversed(list(keys.items())):
+        docs = sorted(docs, key=lambda doc: doc[field], reverse=direction < 0)
+    return docs
+
+
+class FakeComments:
+    """Runs the stages the feed pipeline uses (mongomock has no $firstN), and keeps the pipeline."""
+
+    def __init__(self, docs):
+        self.docs = docs
+        self.pipeline = None
+
+    def aggregate(self, pipeline):
+        self.pipeline = pipeline
+        docs = [dict(doc) for doc in self.docs]
+        for stage in pipeline:
+            (name, spec), = stage.items()
+            if name == "$match":
+                docs = [
+                    doc for doc in docs
+                    if doc["page_id"] == spec["page_id"] and doc["post_id"] in spec["post_id"]["$in"]
+                ]
+            elif name == "$sort":
+                docs = _sort(docs, spec)
+            elif name == "$project":
+                assert all(value == 0 for value in spec.values())
+                docs = [{k: v for k, v in doc.items() if k not in spec} for doc in docs]
+            elif name == "$group":
+                top = spec["comments"]["$firstN"]
+                assert spec["_id"] == "$post_id" and top["input"] == "$$ROOT"
+                groups = {}
+                for doc in docs:
+                    kept = groups.setdefault(doc["post_id"], [])
+                    if len(kept) < top["n"]:
+                        kept.append(doc)
+                docs = [{"_id": post_id, "comments": kept} for post_id, kept in groups.items()]
+            else:
+                raise AssertionError(f"unexpected stage {name}")
+
+        async def results():
+            for doc in docs:
+                yield doc
+
+        return results()
+
+
+class FakeDB:
+    def __init__(self, comments):
+        self.comments = comments
+
+
+@pytest.mark.anyio
+async def test_top_comments_are_the_newest_per_post_in_index_order(monkeypatch):
+    now = datetime(2024, 5, 1)
+    docs = [
+        {
+            "_id": f"{post_id}-{i}", "page_id": "deepsolv", "post_id": post_id, "comment_id": f"{post_id}-c{i}",
+            "posted_at": now - timedelta(minutes=i), "content_hash": "h",
+        }
+        for post_id in ("p1", "p2", "p3") for i in range(5)
+    ]
+    docs.append({**docs[0], "page_id": "other", "comment_id": "elsewhere"})
+    comments = FakeComments(docs)
+    monkeypatch.setattr(mongo, "db", FakeDB(comments))
+
+    top = await CommentRepository().get_top_for_posts("deepsolv", ["p1", "p2"], 2)
+
+    assert {post_id: [c["comment_id"] for c in kept] for post_id, kept in top.items()} == {
+        "p1": ["p1-c0", "p1-c1"],
+        "p2": ["p2-c0", "p2-c1"],
+    }
+    assert all("_id" not in c and "content_hash" not in c for kept in top.values() for c in kept)
+
+    # $match equality + $sort keys are a prefix of a declared index: no in-memory sort
+    match, sort = comments.pipeline[0]["$match"], comments.pipeline[1]["$sort"]
+    wanted = [("page_id", 1)] + list(sort.items())
+    declared = [list(model.document["key"].items()) for model in INDEXES["comments"]]
+    assert "page_id" in match and any(index[:len(wanted)] == wanted for index in declared)
@@ -0,0 +1,94 @@
+from datetime import datetime, timedelta
+
+import pytest
+
+from app.config import settings
+from app.services import page_service as page_service_module
+from app.services.job_service import JobService
+from app.services.page_service import PageService
+
+
+@pytest.fixture
+def stored_page(monkeypatch):
+    """Patch the stored page to one scraped `age` ago; records refreshes and queued jobs."""
+    calls = {"refresh": 0, "queued": 0}
+    guards = set()
+    page = {}
+
+    def scraped(age: timedelta):
+        page.clear()
+        page.update({"page_id": "deepsolv", "last_scraped_at": (datetime.utcnow() - age).isoformat()})
+
+    async def fake_load_stored(self, page_id):
+        return dict(page) if page else None
+
+    async def fake_refresh(self, page_id):
+        calls["refresh"] += 1
+
+    async def fake_enqueue(self, page_ids):
+        calls["queued"] += 1
+
+    async def fake_acquire_lock(key, ttl_ms):
+        if key in guards:
+            return None
+        guards.add(key)
+        return "token"
+
+    monkeypatch.setattr(PageService, "_load_stored", fake_load_stored)
+    monkeypatch.setattr(PageService, "refresh_page", fake_refresh)
+    monkeypatch.setattr(JobService, "enqueue_refresh", fake_enqueue)
+    monkeypatch.setattr(page_service_module, "acquire_lock", fake_acquire_lock)
+    return scraped, calls
+
+
+@pytest.mark.anyio
+async def test_fresh_page_is_served_as_is(stored_page):
+    scraped, calls = stored_page
+    scraped(timedelta(minutes=5))
+
+    age, stale, scraped_at = await PageService().ensure_fresh("deepsolv")
+
+    assert 299 <= age <= 301 and stale is False
+    assert 299 <= (datetime.utcnow() - scraped_at).total_seconds() <= 301
+    assert calls == {"refresh": 0, "queued": 0}
+
+
+@pytest.mark.anyio
+async def test_stale_page_is_served_and_revalidated_once(stored_page):
+    scraped, calls = stored_page
+    scraped(timedelta(seconds=settings.PAGE_SOFT_TTL_SECONDS + 60))
+
+    results = [await PageService().ensure_fresh("deepsolv") for _ in range(3)]
+
+    assert all(stale for _, stale, _ in results)
+    assert calls == {"refresh": 0, "queued": 1}
+
+
+@pytest.mark.anyio
+async def test_expired_page_blocks_on_refresh(stored_page):
+    scraped, calls = stored_page
+    scraped(timedelta(seconds=settings.PAGE_HARD_TTL_SECONDS + 60))
+
+    age, stale, _ = await PageService().ensure_fresh("deepsolv")
+    assert (age, stale) == (0.0, False)
+    assert calls["refresh"] == 1
+
+
+@pytest.mark.anyio
+async def test_page_stored_without_a_timestamp_blocks_on_refresh(stored_page, monkeypatch):
+    _, calls = stored_page
+    legacy = {"page_id": "deepsolv", "name": "Deepsolv"}  # saved before last_scraped_at existed
+    rescraped_at = datetime.utcnow()
+
+    async def fake_load_stored(self, page_id):
+        return {**legacy, "last_scraped_at": rescraped_at} if calls["refresh"] else dict(legacy)
+
+    monkeypatch.setattr(PageService, "_load_stored", fake_load_stored)
+
+    assert await PageService().ensure_fresh("deepsolv") == (0.0, False, rescraped_at)
+    assert calls == {"refresh": 1, "queued": 0}
+
+
+@pytest.mark.anyio
+async def test_unknown_page_has_no_age(stored_page):
+    assert await PageService().ensure_fresh("unknown") == (None, False, None)
@@ -0,0 +1,142 @@
+from datetime import datetime, timedelta
+
+import httpx
+import pytest
+
+from app.core.codec import dumps_json
+from app.core.http_cache import etag_matches
+from app.db.repositories.post_repo import PostRepository
+from app.main import app
+from app.services.page_service import PageService
+
+SCRAPED_AT = datetime(2024, 5, 1, 12, 0, 0, 123456)
+
+
+@pytest.fixture
+def stored_page(monkeypatch):
+    """A fresh page scraped at SCRAPED_AT; counts body loads."""
+    state = {"scraped_at": SCRAPED_AT, "loads": 0, "size": 10}
+
+    async def fake_ensure_fresh(self, page_id):
+        return 120.0, False, state["scraped_at"]
+
+    async def fake_get_page_json(self, page_id, fields=None):
+        state["loads"] += 1
+        return dumps_json({"page_id": page_id, "about": "x" * state["size"]})
+
+    monkeypatch.setattr(PageService, "ensure_fresh", fake_ensure_fresh)
+    monkeypatch.setattr(PageService, "get_page_json", fake_get_page_json)
+    return state
+
+
+def client():
+    return httpx.AsyncClient(transport=httpx.ASGITransport(app=app), base_url="http://test")
+
+
+@pytest.mark.anyio
+async def test_matching_page_validators_get_304_without_loading_the_body(stored_page):
+    async with client() as c:
+        first = await c.get("/api/pages/deepsolv", headers={"Accept-Encoding": "identity"})
+        etag = first.headers["ETag"]
+        assert first.headers["Cache-Control"] == "max-age=60"
+        assert first.headers["Last-Modified"] == "Wed, 01 May 2024 12:00:00 GMT"
+
+        again = await c.get("/api/pages/deepsolv", headers={"If-None-Match": etag})
+        assert again.status_code == 304 and again.content == b""
+        assert again.headers["ETag"] == etag and again.headers["X-Data-Age"] == "120"
+        since = await c.get("/api/pages/deepsolv", headers={"If-Modified-Since": first.headers["Last-Modified"]})
+        assert since.status_code == 304
+        assert stored_page["loads"] == 1
+
+        fields = await c.get("/api/pages/deepsolv", params={"fields": "name"})
+        assert fields.headers["ETag"] != etag
+
+        stored_page["scraped_at"] = SCRAPED_AT + timedelta(hours=1)  # re-scraped
+        rescraped = await c.get("/api/pages/deepsolv", headers={"If-None-Match": etag})
+        assert rescraped.status_code == 200 and rescraped.headers["ETag"] != etag
+
+
+@pytest.mark.anyio
+async def test_list_responses_get_a_body_etag(monkeypatch):
+    posts = [{"post_id": "p1", "likes": 1}]
+
+    async def fake_get_recent(self, page_id, skip, limit, projection=None):
+        return [dict(post) for post in posts]
+
+    monkeypatch.setattr(PostRepository, "get_recent", fake_get_recent)
+
+    async with client() as c:
+        first = await c.get("/api/pages/deepsolv/posts")
+        etag = first.headers["ETag"]
+        again = await c.get("/api/pages/deepsolv/posts", headers={"If-None-Match": f"W/{etag}"})
+        assert again.status_code == 304 and again.content == b""
+        assert "content-type" not in again.headers
+
+        posts[0]["likes"] = 2
+        changed = await c.get("/api/pages/deepsolv/posts", headers={"If-None-Match": etag})
+        assert changed.status_code == 200 and changed.json()[0]["likes"] == 2
+
+
+@pytest.mark.anyio
+async def test_large_bodies_are_compressed_and_keep_a_matching_etag(stored_page):
+    async with client() as c:
+        small = await c.get("/api/pages/deepsolv", headers={"Accept-Encoding": "gzip"})
+        assert "content-encoding" not in small.headers
+        assert small.headers["Vary"] == "Accept-Encoding"
+
+        stored_page["size"] = 50_000
+        big = await c.get("/api/pages/deepsolv", headers={"Accept-Encoding": "gzip"})
+        assert big.headers["Content-Encoding"] == "gzip"
+        assert int(big.headers["Content-Length"]) < 5_000
+        assert big.json()["about"] == "x" * 50_000  # decoded by httpx
+        assert big.headers["ETag"].endswith('-gzip"') and etag_matches(big.headers["ETag"], small.headers["ETag"])
+
+        plain = await c.get("/api/pages/deepsolv", headers={"Accept-Encoding": "gzip;q=0, identity"})
+        assert "content-encoding" not in plain.headers
+
+        revalidated = await c.get("/api/pages/deepsolv", headers={"If-None-Match": big.headers["ETag"]})
+        assert revalidated.status_code == 304
+
+
+@pytest.mark.anyio
+async def test_streamed_responses_pass_through_without_being_held():
+    from starlette.responses import StreamingResponse
+
+    from app.core.http_cache import CompressionMiddleware, ConditionalGetMiddleware
+
+    sent = []
+
+    async def events():
+        assert [message["type"] for message in sent] == ["http.response.start"]  # headers already out
+        yield b"event: token\ndata: {}\n\n" * 200
+
+    async def send(message):
+        sent.append(message)
+
+    async def receive():
+        return {"type": "http.disconnect"}
+
+    scope = {
+        "type": "http", "method": "GET", "path": "/", "query_string": b"",
+        "headers": [(b"accept-encoding", b"gzip")],
+    }
+    for media_type in ("text/event-stream", "text/csv"):
+        sent.clear()
+        response = StreamingResponse(events(), media_type=media_type)
+        await CompressionMiddleware(ConditionalGetMiddleware(response))(scope, receive, send)
+        headers = dict(sent[0]["headers"])
+        assert b"content-encoding" not in headers and b"vary" not in headers
+
+
+@pytest.mark.anyio
+async def test_post_responses_are_compressed_too(monkeypatch):
+    async def fake_get_pages(self, page_ids, fields=None):
+        return {"pages": {page_id: {"page_id": page_id, "about": "x" * 5_000} for page_id in page_ids}, "missing": []}
+
+    monkeypatch.setattr(PageService, "get_pages", fake_get_pages)
+
+    async with client() as c:
+        resp = await c.post("/api/pages/batch", json={"page_ids": ["a", "b"]}, headers={"Accept-Encoding": "gzip"})
+
+    assert resp.status_code == 200 and resp.headers["Content-Encoding"] == "gzip"
+    assert int(resp.headers["Content-Length"]) < 2_000 and set(resp.json()["pages"]) == {"a", "b"}
@@ -0,0 +1,191 @@
+import asyncio
+import json
+from datetime import datetime
+from types import SimpleNamespace
+
+import pytest
+from pymongo.errors import BulkWriteError, DuplicateKeyError
+
+from app.db.mongo import mongo
+from app.services.analytics_service import AnalyticsService
+from app.services import import_service as import_service_module
+from app.services.import_service import ImportService, parse_record
+from app.services.scraper_service import LinkedInScraperService
+
+
+class FakeCollection:
+    def __init__(self, name, db):
+        self.name = name
+        self.db = db
+
+    async def bulk_write(self, ops, ordered=True):
+        assert ordered is False
+        self.db.in_flight += 1
+        self.db.max_in_flight = max(self.db.max_in_flight, self.db.in_flight)
+        await asyncio.sleep(0)
+        self.db.in_flight -= 1
+        self.db.writes.append((self.name, ops))
+        if self.name == "page_metrics" and self.db.metrics_exist:
+            raise BulkWriteError({
+                "writeErrors": [{"code": 11000, "index": i} for i in range(len(ops))],
+                "nUpserted": 0, "nModified": 0, "nMatched": 0,
+            })
+        return SimpleNamespace(bulk_api_result={"nUpserted": len(ops), "nModified": 0, "nMatched": 0})
+
+
+class FakeDB:
+    def __init__(self):
+        self.writes = []
+        self.in_flight = 0
+        self.max_in_flight = 0
+        self.metrics_exist = False
+
+    def __getitem__(self, name):
+        return FakeCollection(name, self)
+
+
+@pytest.fixture
+def db(monkeypatch):
+    fake = FakeDB()
+    rebuilt = []
+
+    async def fake_rebuild(self, page_ids=None):
+        rebuilt.extend(page_ids)
+        return len(page_ids)
+
+    invalidated = []
+
+    async def fake_invalidate(page_id):
+        invalidated.append(page_id)
+
+    monkeypatch.setattr(mongo, "db", fake)
+    monkeypatch.setattr(AnalyticsService, "rebuild", fake_rebuild)
+    monkeypatch.setattr(import_service_module, "invalidate_page_cache", fake_invalidate)
+    fake.rebuilt = rebuilt
+    fake.invalidated = invalidated
+    return fake
+
+
+def payload(page_id):
+    record = LinkedInScraperService()._demo_payload(page_id)
+    return json.loads(json.dumps(record, default=str))  # datetimes as strings, as in an archive
+
+
+def write_archive(path, records):
+    path.write_text("".join(line + "\n" for line in records))
+
+
+def test_records_are_validated_against_the_models():
+    stamp = datetime(2024, 5, 1)
+    page, children = parse_record(payload("deepsolv"), stamp)
+
+    assert set(children) == {"posts", "comments", "employees", "followers"}
+    assert page["posts"][0]["posted_at"].tzinfo is None  # ISO string -> naive UTC datetime
+    assert {doc["relation"] for doc in children["followers"]} == {"follower", "following"}
+
+    broken = payload("deepsolv")
+    broken["posts"][3]["likes"] = "many"
+    with pytest.raises(ValueError, match=r"posts\[3\]: likes"):
+        parse_record(broken, stamp)
+    # No timestamp of its own and none to fall back on: a replay could not be deduplicated
+    with pytest.raises(ValueError, match="last_scraped_at"):
+        parse_record(payload("deepsolv"))
+
+
+@pytest.mark.anyio
+async def test_import_writes_unordered_batches_per_collection_concurrently(db, tmp_path):
+    archive = tmp_path / "pages.jsonl"
+    write_archive(archive, [json.dumps(payload(f"page{i}")) for i in range(6)] + ["{not json", ""])
+
+    stats = await ImportService(batch_size=50, writers=3, checkpoint_every=4).run(str(archive))
+
+    assert stats["records"] == 6 and stats["rejected"] == 1
+    assert all(len(ops) <= 50 for _, ops in db.writes)
+    assert {name for name, _ in db.writes} == {"pages", "page_metrics", "posts", "comments", "employees", "followers"}
+    posts = [op for name, ops in db.writes if name == "posts" for op in ops]
+    assert len(posts) == 6 * 20 and all(op._upsert and "content_hash" in op._doc["$set"] for op in posts)
+    assert stats["collections"]["posts"]["inserted"] == 120
+    assert db.max_in_flight > 1
+    assert sorted(db.rebuilt) == [f"page{i}" for i in range(6)]
+    assert sorted(db.invalidated) == [f"page{i}" for i in range(6)]
+
+
+@pytest.mark.anyio
+async def test_older_snapshots_never_overwrite_newer_pages(db, tmp_path):
+    archive = tmp_path / "pages.jsonl"
+    newer, older = payload("deepsolv"), payload("deepsolv")
+    newer["last_scraped_at"], older["last_scraped_at"] = "2024-05-02T00:00:00", "2024-05-01T00:00:00"
+    write_archive(archive, [json.dumps(newer), json.dumps(older), json.dumps(payload("other"))])
+
+    await ImportService(batch_size=1, writers=3).run(str(archive))
+
+    pages = {op._doc["$set"]["last_scraped_at"]: op._filter for name, ops in db.writes if name == "pages" for op in ops}
+    # Each upsert only matches a stored page scraped before it (else: duplicate key, skipped)
+    assert pages[datetime(2024, 5, 1)]["$or"][0] == {"last_scraped_at": {"$lt": datetime(2024, 5, 1)}}
+    # Without a timestamp, later lines are newer, the same on every run
+    stamped = [t for t in pages if t.year > 2024]
+    assert len(stamped) == 1 and stamped[0].microsecond == 3
+
+
+@pytest.mark.anyio
+async def test_older_snapshots_never_overwrite_newer_child_documents(db, tmp_path):
+    mongomock_motor = pytest.importorskip("mongomock_motor")
+    archive = tmp_path / "pages.jsonl"
+    newer, older = payload("deepsolv"), payload("deepsolv")
+    newer["last_scraped_at"], older["last_scraped_at"] = "2024-05-02T00:00:00", "2024-05-01T00:00:00"
+    newer["posts"][0]["likes"], older["posts"][0]["likes"] = 500, 100
+    write_archive(archive, [json.dumps(newer), json.dumps(older)])
+
+    await ImportService(batch_size=1, writers=3).run(str(archive))
+
+    children = {"posts", "comments", "employees", "followers"}
+    ops = [(name, op) for name, batch in db.writes if name in children for op in batch]
+    assert {name for name, _ in ops} == children
+    for _, op in ops:
+        scraped_at = op._doc["$set"]["last_scraped_at"]
+        assert op._upsert and op._filter["$or"][0] == {"last_scraped_at": {"$lt": scraped_at}}
+
+    # Applied newest first, as concurrent writers may: the older snapshot is skipped
+    post_id = newer["posts"][0]["post_id"]
+    first_post = sorted(
+        (op for name, op in ops if name == "posts" and op._filter["post_id"] == post_id),
+        key=lambda op: op._doc["$set"]["last_scraped_at"],
+        reverse=True,
+    )
+    assert len(first_post) == 2
+    posts = mongomock_motor.AsyncMongoMockClient()["import_test"]["posts"]
+    await posts.create_index("post_id", unique=True)
+    for op in first_post:
+        try:
+            await posts.update_one(op._filter, op._doc, upsert=True)
+        except DuplicateKeyError:
+            pass
+    stored = await posts.find_one({"post_id": post_id})
+    assert stored["likes"] == 500 and stored["last_scraped_at"] == datetime(2024, 5, 2)
+
+
+@pytest.mark.anyio
+async def test_resume_continues_after_the_last_checkpoint(db, tmp_path):
+    archive = tmp_path / "pages.jsonl"
+    write_archive(archive, [json.dumps(payload(f"page{i}")) for i in range(5)])
+    checkpoint = tmp_path / "pages.checkpoint"
+
+    first = ImportService(batch_size=1000, writers=2, checkpoint_every=3)
+    await first.run(str(archive), checkpoint_path=str(checkpoint))
+    offset_after_three = len("".join(line for line in archive.read_text().splitlines(True)[:3]))
+    state = json.loads(checkpoint.read_text())
+    assert state["offset"] == archive.stat().st_size and state["stats"]["records"] == 5
+
+    # Crash after the first segment: rewind the checkpoint to it and resume
+    state["offset"], state["stats"]["records"], state["stats"]["lines"] = offset_after_three, 3, 3
+    checkpoint.write_text(json.dumps(state))
+    db.writes.clear()
+    db.metrics_exist = True  # replayed history samples collide with the unique bucket index
+
+    stats = await ImportService(batch_size=1000, writers=2).run(
+        str(archive), checkpoint_path=str(checkpoint), resume=True
+    )
+
+    pages = [op._filter["page_id"] for name, ops in db.writes if name == "pages" for op in ops]
+    assert pages == ["page3", "page4"]
+    assert stats["records"] == 5 and stats["lines"] == 5
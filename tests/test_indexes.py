@@ -0,0 +1,106 @@
+from datetime import datetime, timedelta
+
+import httpx
+import pytest
+
+from app.core import readiness as readiness_module
+from app.db import indexes
+from app.db.indexes import INDEX_VERSION, ensure_indexes, index_drift
+from app.main import app
+
+mongomock_motor = pytest.importorskip("mongomock_motor")
+
+
+@pytest.fixture
+def db():
+    return mongomock_motor.AsyncMongoMockClient()["indexes_test"]
+
+
+@pytest.fixture
+def migrations(monkeypatch):
+    runs = []
+    real_migrate = indexes._migrate
+
+    async def counting_migrate(db):
+        runs.append(db)
+        await real_migrate(db)
+
+    monkeypatch.setattr(indexes, "_migrate", counting_migrate)
+    return runs
+
+
+@pytest.mark.anyio
+async def test_migration_runs_once_per_version(db, migrations):
+    assert await ensure_indexes(db) == "current"
+    assert await ensure_indexes(db) == "current"
+    assert await ensure_indexes(db, force=True) == "current"
+
+    assert len(migrations) == 2
+    state = await db.schema_migrations.find_one({"_id": "indexes"})
+    assert state["version"] == INDEX_VERSION
+    assert "page_id_1" in await db.pages.index_information()
+    assert await db.schema_migrations.find_one({"_id": "indexes:lease"}) is None
+    assert indexes.migration.drift == {}
+
+
+@pytest.mark.anyio
+async def test_migration_drops_duplicate_natural_keys_before_making_them_unique(db):
+    employee = {"page_id": "deepsolv", "name": "Ada", "role": "CTO"}
+    await db.employees.insert_many([{**employee, "profile_url": "old"}, {**employee, "profile_url": "new"}])
+    await db.employees.insert_one({**employee, "role": "CEO"})
+
+    await ensure_indexes(db)
+
+    assert sorted(doc["profile_url"] for doc in await db.employees.find({"role": "CTO"}).to_list(None)) == ["new"]
+    assert await db.employees.count_documents({}) == 2
+    assert (await db.employees.index_information())["page_id_1_name_1_role_1"]["unique"]
+
+
+@pytest.mark.anyio
+async def test_migration_waits_for_a_live_lease_and_takes_over_an_expired_one(db, migrations):
+    lease = {"_id": "indexes:lease", "owner": "other", "until": datetime.utcnow() + timedelta(minutes=5)}
+    await db.schema_migrations.insert_one(lease)
+    assert await ensure_indexes(db) == "skipped"
+    assert migrations == []
+
+    await db.schema_migrations.update_one({"_id": "indexes:lease"}, {"$set": {"until": datetime(2000, 1, 1)}})
+    assert await ensure_indexes(db) == "current"
+    assert len(migrations) == 1
+
+
+@pytest.mark.anyio
+async def test_drift_reports_missing_changed_and_unexpected_indexes(db):
+    await ensure_indexes(db)
+    await db.posts.drop_index("post_id_1")
+    await db.posts.create_index("post_id")  # no longer unique
+    await db.comments.drop_index("comment_id_1")
+    await db.comments.create_index("likes")
+
+    assert await index_drift(db) == {
+        "posts": {"changed": ["post_id_1"]},
+        "comments": {"missing": ["comment_id_1"], "unexpected": ["likes_1"]},
+    }
+
+
+@pytest.mark.anyio
+async def test_readyz_waits_for_warm_up_then_reflects_dependencies(monkeypatch):
+    status = {"mongo": "ok", "redis": "ok"}
+
+    async def fake_check_dependencies():
+        return dict(status)
+
+    monkeypatch.setattr(readiness_module, "check_dependencies", fake_check_dependencies)
+    monkeypatch.setattr(readiness_module._warm_up, "done", False)
+
+    async with httpx.AsyncClient(transport=httpx.ASGITransport(app=app), base_url="http://test") as client:
+        cold = await client.get("/readyz")
+        monkeypatch.setattr(readiness_module._warm_up, "done", True)
+        warm = await client.get("/readyz")
+        status["redis"] = "error: ConnectionError"
+        down = await client.get("/readyz")
+        live = await client.get("/healthz")
+
+    assert cold.status_code == 503 and cold.json()["warmed_up"] is False
+    assert warm.status_code == 200 and warm.json()["indexes"]["target_version"] == INDEX_VERSION
+    assert down.status_code == 503 and down.json()["dependencies"]["redis"].startswith("error")
+    assert live.status_code == 200
@@ -0,0 +1,172 @@
+from types import SimpleNamespace
+
+import pytest
+
+from app.db.bulk import bulk_upsert, content_hash
+from app.services.analytics_service import engagement_delta
+from app.services.ingest_service import IngestService
+from app.services.scraper_service import LinkedInScraperService
+
+
+class FakeCursor:
+    def __init__(self, docs):
+        self.docs = docs
+
+    def __aiter__(self):
+        return self._iter()
+
+    async def _iter(self):
+        for doc in self.docs:
+            yield doc
+
+
+class FakeCollection:
+    def __init__(self, stored=()):
+        self.calls = []
+        self.stored = list(stored)
+
+    def find(self, query, projection=None):
+        return FakeCursor(self.stored)
+
+    async def bulk_write(self, ops, ordered=True):
+        self.calls.append((ops, ordered))
+        return SimpleNamespace(upserted_count=2, matched_count=3, modified_count=1)
+
+
+@pytest.mark.anyio
+async def test_bulk_upsert_is_unordered_and_keyed_on_natural_ids():
+    collection = FakeCollection()
+    docs = [{"post_id": f"p{i}", "page_id": "deepsolv", "likes": i} for i in range(5)]
+
+    counts = await bulk_upsert(collection, docs, ["post_id"])
+
+    ops, ordered = collection.calls[0]
+    assert ordered is False
+    assert [op._filter for op in ops] == [{"post_id": f"p{i}"} for i in range(5)]
+    assert all(op._upsert for op in ops)
+    assert counts == {"inserted": 2, "updated": 1, "unchanged": 2}
+
+
+@pytest.mark.anyio
+async def test_bulk_upsert_only_writes_changed_documents():
+    docs = [{"post_id": f"p{i}", "page_id": "deepsolv", "likes": i} for i in range(3)]
+    stored = [
+        {"post_id": "p0", "content_hash": content_hash(docs[0])},             # unchanged
+        {"post_id": "p1", "content_hash": content_hash({**docs[1], "likes": 0})},  # edited
+    ]
+    collection = FakeCollection(stored)
+
+    counts = await bulk_upsert(collection, docs, ["post_id"])
+
+    ops, _ = collection.calls[0]
+    assert [op._filter for op in ops] == [{"post_id": "p1"}, {"post_id": "p2"}]
+    assert ops[0]._doc["$set"]["content_hash"] == content_hash(docs[1])
+    assert "content_hash" not in docs[1]  # caller's documents are not modified
+    assert counts["unchanged"] == 1 + (3 - 1)  # skipped p0, plus the fake result's matched-but-unmodified
+
+    collection = FakeCollection([{"post_id": d["post_id"], "content_hash": content_hash(d)} for d in docs])
+    assert await bulk_upsert(collection, docs, ["post_id"]) == {"inserted": 0, "updated": 0, "unchanged": 3}
+    assert collection.calls == []
+
+
+def test_content_hash_ignores_scrape_bookkeeping():
+    doc = {"page_id": "deepsolv", "name": "Deepsolv", "followers": 10}
+    same = {"followers": 10, "name": "Deepsolv", "page_id": "deepsolv", "last_scraped_at": "now", "_id": 1}
+    assert content_hash(doc) == content_hash(same)
+    assert content_hash(doc) != content_hash({**doc, "followers": 11})
+
+
+@pytest.mark.anyio
+async def test_ingest_writes_every_collection_once(monkeypatch):
+    service = IngestService()
+    writes = {}
+
+    def recorder(name):
+        async def record(docs):
+            writes[name] = docs
+            return {"inserted": len(docs) if isinstance(docs, list) else 1, "updated": 0, "unchanged": 0}
+        return record
+
+    monkeypatch.setattr(service.page_repo, "upsert", recorder("pages"))
+    monkeypatch.setattr(service.post_repo, "bulk_upsert", recorder("posts"))
+    monkeypatch.setattr(service.comment_repo, "bulk_upsert", recorder("comments"))
+    monkeypatch.setattr(service.employee_repo, "bulk_upsert", recorder("employees"))
+    monkeypatch.setattr(service.follower_repo, "bulk_upsert", recorder("followers"))
+
+    async def nothing_stored(ids):
+        return {}
+
+    async def record_delta(page_id, inc, posts):
+        writes["analytics"] = (page_id, inc)
+
+    monkeypatch.setattr(service.post_repo, "get_engagement", nothing_stored)
+    monkeypatch.setattr(service.comment_repo, "get_likes", nothing_stored)
+    monkeypatch.setattr(service.analytics_repo, "apply_delta", record_delta)
+    monkeypatch.setattr(service.metrics_repo, "record", recorder("metrics"))
+
+    scraped = LinkedInScraperService()._demo_payload("deepsolv")
+    counts = await service.ingest(scraped)
+
+    assert len(writes["followers"]) == len(scraped["followers_list"]) + len(scraped["following_list"])
+    assert "last_scraped_at" in writes["pages"]
+    assert writes["analytics"][0] == "deepsolv"
+    assert writes["metrics"] is scraped
+    assert writes["analytics"][1]["post_count"] == len(scraped["posts"])
+    assert counts["total"]["inserted"] == sum(
+        c["inserted"] for name, c in counts.items() if name != "total"
+    )
+
+
+def test_engagement_delta_counts_new_docs_and_diffs_existing_ones():
+    posts = [
+        {"post_id": "p1", "likes": 15, "comments_count": 3},  # stored with 10 likes, 2 comments
+        {"post_id": "p2", "likes": 7, "comments_count": 1},   # new
+        {"post_id": "p2", "likes": 8, "comments_count": 1},   # duplicate in batch: last wins
+    ]
+    comments = [
+        {"comment_id": "c1", "likes": 4},  # stored with 1 like
+        {"comment_id": "c2", "likes": 2},  # new
+    ]
+
+    inc = engagement_delta(
+        posts,
+        comments,
+        stored_posts={"p1": {"post_id": "p1", "likes": 10, "comments_count": 2}},
+        stored_comment_likes={"c1": 1},
+    )
+
+    assert inc == {
+        "post_count": 1,
+        "post_likes": 5 + 8,
+        "post_comments": 1 + 1,
+        "comment_count": 1,
+        "comment_likes": 3 + 2,
+    }
+
+
+@pytest.mark.anyio
+async def test_metrics_are_bucketed_per_page_per_month(monkeypatch):
+    from datetime import datetime, timezone
+
+    from app.db.repositories import metrics_repo
+    from app.db.repositories.metrics_repo import MetricsRepository
+
+    updates = []
+
+    class FakeMetrics:
+        async def update_one(self, query, update, upsert=False):
+            updates.append((query, update, upsert))
+
+    monkeypatch.setattr(metrics_repo, "mongo", SimpleNamespace(db=SimpleNamespace(page_metrics=FakeMetrics())))
+
+    taken_at = datetime(2024, 3, 17, 9, 30, tzinfo=timezone.utc)
+    await MetricsRepository().record(
+        {"page_id": "deepsolv", "followers": 1200, "head_count": 80, "last_scraped_at": taken_at}
+    )
+    await MetricsRepository().record({"page_id": "empty", "last_scraped_at": taken_at})
+
+    (query, update, upsert), = updates
+    assert query == {"page_id": "deepsolv", "bucket": datetime(2024, 3, 1)}
+    assert update["$push"]["samples"] == {"followers": 1200, "head_count": 80, "t": datetime(2024, 3, 17, 9, 30)}
+    assert update["$inc"] == {"count": 1}
+    assert upsert is True
@@ -0,0 +1,66 @@
+import json
+import subprocess
+import sys
+from pathlib import Path
+
+import pytest
+
+from benchmarks.load_bench import compare, percentile, schedule
+
+
+def test_percentile_interpolates_between_ranks():
+    samples = [float(i) for i in range(1, 101)]
+    assert percentile(samples, 50) == pytest.approx(50.5)
+    assert percentile(samples, 99) == pytest.approx(99.01)
+    assert percentile([], 95) == 0.0
+
+
+def test_compare_flags_latency_growth_and_throughput_drops():
+    baseline = {"endpoints": {"GET /pages/{id}": {"p50_ms": 1.0, "p95_ms": 2.0, "p99_ms": 4.0, "throughput_rps": 1000}}}
+    current = {"endpoints": {
+        "GET /pages/{id}": {"p50_ms": 1.1, "p95_ms": 3.0, "p99_ms": 4.0, "throughput_rps": 700},
+        "GET /pages/new": {"p50_ms": 9.0},
+    }}
+
+    report = {row["metric"]: row for row in compare(current, baseline, max_regression=0.25)}
+
+    assert set(report) == {"p50_ms", "p95_ms", "p99_ms", "throughput_rps"}
+    assert not report["p50_ms"]["regression"]
+    assert report["p95_ms"]["regression"] and report["p95_ms"]["change"] == 0.5
+    assert report["throughput_rps"]["regression"]
+
+
+def test_cold_schedule_has_one_round_per_pass_over_the_pages():
+    import random
+
+    rounds = schedule("cold", ["a", "b", "c"], 7, random.Random(1))
+    assert rounds == [["a", "b", "c"], ["a", "b", "c"], ["a"]]
+    mixed = schedule("mixed", [f"p{i}" for i in range(10)], 100, random.Random(1))
+    assert len(mixed) == 1 and mixed[0].count("p0") + mixed[0].count("p1") > 50
+
+
+def test_fake_backend_run_reports_every_endpoint(tmp_path):
+    pytest.importorskip("fakeredis")
+    pytest.importorskip("mongomock_motor")
+    pytest.importorskip("lupa")  # fakeredis[lua]: lock release runs a script
+
+    output = tmp_path / "run.json"
+    # A separate process: the backend must be configured before the app is imported
+    subprocess.run(
+        [sys.executable, "-m", "benchmarks.load_bench", "--pages", "3", "--requests", "6",
+         "--concurrency", "2", "--output", str(output)],
+        check=True, capture_output=True, timeout=120, cwd=Path(__file__).resolve().parents[1],
+    )
+
+    results = json.loads(output.read_text())
+    assert results["meta"]["backend"] == "fake"
+    assert {"GET /pages/{id}", "GET /pages/{id}/ai-insights", "GET /pages/{id}/ai-insights/stream"} <= set(
+        results["endpoints"]
+    )
+    assert all(stats["errors"] == 0 for stats in results["endpoints"].values())
+
+
+def test_stored_baseline_was_run_with_the_defaults():
+    baseline = json.loads((Path(__file__).resolve().parents[1] / "benchmarks" / "baseline.json").read_text())
+    assert baseline["meta"]["backend"] == "fake" and baseline["meta"]["pattern"] == "warm"
+    assert all(stats["errors"] == 0 for stats in baseline["endpoints"].values())
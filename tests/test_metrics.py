@@ -0,0 +1,70 @@
+from types import SimpleNamespace
+
+import httpx
+import pytest
+from prometheus_client import REGISTRY
+
+from app.core.metrics import cache_family
+from app.core.profiling import MongoCommandListener
+from app.main import app
+
+
+def sample(name, **labels):
+    return REGISTRY.get_sample_value(name, labels) or 0.0
+
+
+@pytest.mark.anyio
+async def test_requests_are_timed_per_route_template(monkeypatch):
+    from app.db.repositories.analytics_repo import AnalyticsRepository
+
+    async def fake_get(self, page_id):
+        return {"page_id": page_id, "post_count": 0}
+
+    monkeypatch.setattr(AnalyticsRepository, "get", fake_get)
+    labels = {"method": "GET", "route": "/api/pages/{page_id}/analytics", "status": "200"}
+    before = sample("http_request_duration_seconds_count", **labels)
+
+    async with httpx.AsyncClient(transport=httpx.ASGITransport(app=app), base_url="http://test") as client:
+        for page_id in ("a", "b"):
+            assert (await client.get(f"/api/pages/{page_id}/analytics")).status_code == 200
+        resp = await client.get("/metrics")
+
+    assert resp.status_code == 200
+    assert resp.headers["content-type"].startswith("text/plain")
+    assert sample("http_request_duration_seconds_count", **labels) == before + 2
+    assert 'route="/api/pages/{page_id}/analytics"' in resp.text
+
+
+def test_mongo_commands_are_labelled_by_operation_and_collection():
+    listener = MongoCommandListener()
+    labels = {"command": "find", "collection": "posts", "outcome": "ok"}
+    before = sample("mongo_command_duration_seconds_count", **labels)
+
+    listener.started(SimpleNamespace(
+        command_name="find", command={"find": "posts", "filter": {}}, connection_id=("h", 1), request_id=7
+    ))
+    listener.succeeded(SimpleNamespace(connection_id=("h", 1), request_id=7, duration_micros=1500))
+
+    assert sample("mongo_command_duration_seconds_count", **labels) == before + 1
+    assert listener._pending == {}
+
+
+def test_cache_keys_map_to_bounded_families():
+    assert cache_family("page:deepsolv") == "page"
+    assert cache_family("page:deepsolv:fields=name") == "page_fields"
+    assert cache_family("ai_insights:abc123") == "ai_insights"
+
+
+@pytest.mark.anyio
+async def test_scraper_pool_utilization_is_published(monkeypatch):
+    from app.services import scraper_service
+
+    monkeypatch.setattr(scraper_service._http, "in_flight", 3)
+    monkeypatch.setattr(scraper_service._http, "waiting", 2)
+
+    async with httpx.AsyncClient(transport=httpx.ASGITransport(app=app), base_url="http://test") as client:
+        resp = await client.get("/metrics")
+
+    assert "scraper_requests_in_flight 3.0" in resp.text
+    assert "scraper_requests_waiting 2.0" in resp.text
+    assert "scraper_pool_connections 0.0" in resp.text and "scraper_pool_idle_connections 0.0" in resp.text
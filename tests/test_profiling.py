@@ -0,0 +1,102 @@
+import json
+import logging
+import time
+from types import SimpleNamespace
+
+import httpx
+import pytest
+
+from app.config import settings
+from app.core.profiling import MongoCommandListener, RequestTrace, _current_trace, command_shape
+from app.main import app
+
+
+@pytest.fixture
+def slow_analytics(monkeypatch):
+    """Analytics route whose repository blocks the loop for 30ms."""
+    from app.db.repositories.analytics_repo import AnalyticsRepository
+
+    async def fake_get(self, page_id):
+        time.sleep(0.03)
+        return {"page_id": page_id, "post_count": 0}
+
+    monkeypatch.setattr(AnalyticsRepository, "get", fake_get)
+
+
+def logged(caplog, prefix):
+    return [json.loads(r.getMessage()[len(prefix):]) for r in caplog.records if r.getMessage().startswith(prefix)]
+
+
+def test_command_shape_keeps_operators_and_drops_values():
+    find = {"find": "posts", "filter": {"page_id": "deepsolv", "likes": {"$gte": 10}}, "sort": {"posted_at": -1}}
+    assert command_shape("find", find) == {
+        "filter": {"page_id": "?", "likes": {"$gte": "?"}},
+        "sort": {"posted_at": "?"},
+    }
+    update = {"update": "posts", "updates": [{"q": {"post_id": "a"}, "u": {}}, {"q": {"post_id": "b"}, "u": {}}]}
+    assert command_shape("update", update) == {"q": [{"post_id": "?"}]}
+    assert command_shape("find", {"find": "posts", "filter": {"post_id": {"$in": [1, 2, 3]}}}) == {
+        "filter": {"post_id": {"$in": ["?"]}}
+    }
+
+
+def test_slow_queries_are_logged_with_their_shape(monkeypatch, caplog):
+    monkeypatch.setattr(settings, "SLOW_QUERY_MS", 50)
+    listener = MongoCommandListener()
+    trace = RequestTrace({"type": "http", "path": "/"})
+    token = _current_trace.set(trace)
+    try:
+        for request_id, micros in ((1, 10_000), (2, 80_000)):
+            listener.started(SimpleNamespace(
+                command_name="find",
+                command={"find": "comments", "filter": {"post_id": f"p{request_id}"}},
+                connection_id=("h", 1),
+                request_id=request_id,
+            ))
+            with caplog.at_level(logging.WARNING, logger="app.core.profiling"):
+                listener.succeeded(SimpleNamespace(connection_id=("h", 1), request_id=request_id, duration_micros=micros))
+    finally:
+        _current_trace.reset(token)
+
+    (entry,) = logged(caplog, "slow query ")
+    assert entry["collection"] == "comments"
+    assert entry["ms"] == 80.0
+    assert entry["shape"] == {"filter": {"post_id": "?"}}
+    assert listener._pending == {}
+    # The request keeps shapes only, never the command documents
+    assert [query[3] for query in trace.queries] == [{"filter": {"post_id": "?"}}] * 2
+
+
+@pytest.mark.anyio
+async def test_slow_requests_are_logged_with_route_and_phases(monkeypatch, caplog, slow_analytics):
+    monkeypatch.setattr(settings, "SLOW_REQUEST_MS", 20)
+
+    async with httpx.AsyncClient(transport=httpx.ASGITransport(app=app), base_url="http://test") as client:
+        with caplog.at_level(logging.WARNING, logger="app.core.profiling"):
+            assert (await client.get("/api/pages/deepsolv/analytics")).status_code == 200
+            monkeypatch.setattr(settings, "SLOW_REQUEST_MS", 10_000)
+            assert (await client.get("/api/pages/deepsolv/analytics")).status_code == 200
+
+    (entry,) = logged(caplog, "slow request ")
+    assert entry["route"] == "/api/pages/{page_id}/analytics"
+    assert entry["status"] == 200
+    assert entry["ms"] >= 20
+    assert "serialize" in entry["phases"]
+
+
+@pytest.mark.anyio
+async def test_requests_with_the_profile_token_write_a_folded_profile(monkeypatch, tmp_path, slow_analytics):
+    monkeypatch.setattr(settings, "PROFILE_TOKEN", "s3cret")
+    monkeypatch.setattr(settings, "PROFILE_DIR", str(tmp_path))
+    monkeypatch.setattr(settings, "PROFILE_INTERVAL_MS", 1.0)
+
+    async with httpx.AsyncClient(transport=httpx.ASGITransport(app=app), base_url="http://test") as client:
+        plain = await client.get("/api/pages/deepsolv/analytics", params={"profile": "wrong"})
+        profiled = await client.get("/api/pages/deepsolv/analytics", headers={"X-Profile": "s3cret"})
+
+    assert "x-profile-file" not in plain.headers
+    profile = tmp_path / profiled.headers["x-profile-file"]
+    lines = profile.read_text().splitlines()
+    assert lines and all(line.rsplit(" ", 1)[1].isdigit() for line in lines)
+    assert any("fake_get" in line for line in lines)
+    assert [path.name for path in tmp_path.iterdir()] == [profile.name]
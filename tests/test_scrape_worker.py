@@ -0,0 +1,108 @@
+import asyncio
+
+import pytest
+
+from app.config import settings
+from app.services.page_service import PageService
+from app.workers import scrape_worker
+from app.workers.scrape_worker import ScrapeWorkerPool
+
+
+class FakeJobs:
+    def __init__(self, attempts: int):
+        self.job = {"job_id": "j1", "batch_id": "b1", "page_id": "deepsolv", "attempts": attempts}
+        self.events = []
+
+    async def mark_running(self, job_id):
+        return self.job
+
+    async def mark_succeeded(self, job, result):
+        self.events.append(("succeeded", result))
+
+    async def mark_failed(self, job, error):
+        self.events.append(("failed", error))
+
+    async def schedule_retry(self, job, error, due_at):
+        self.events.append(("retry", error))
+
+
+@pytest.fixture(autouse=True)
+def no_rate_limit(monkeypatch):
+    async def fake_acquire(bucket, per_second):
+        return None
+
+    monkeypatch.setattr(scrape_worker, "acquire_rate_slot", fake_acquire)
+
+
+@pytest.mark.anyio
+async def test_failed_job_is_retried_until_attempts_run_out(monkeypatch):
+    async def failing_refresh(self, page_id):
+        raise RuntimeError("linkedin down")
+
+    monkeypatch.setattr(PageService, "refresh_page", failing_refresh)
+
+    pool = ScrapeWorkerPool(concurrency=1)
+    pool.jobs = FakeJobs(attempts=1)
+    await pool._run("j1")
+    assert pool.jobs.events == [("retry", "RuntimeError: linkedin down")]
+
+    pool.jobs = FakeJobs(attempts=settings.SCRAPE_MAX_ATTEMPTS)
+    await pool._run("j1")
+    assert pool.jobs.events[0][0] == "failed"
+
+
+@pytest.mark.anyio
+async def test_successful_job_records_result(monkeypatch):
+    async def fake_refresh(self, page_id):
+        return {"page_id": page_id, "coalesced": False, "ingest": {}}
+
+    monkeypatch.setattr(PageService, "refresh_page", fake_refresh)
+
+    pool = ScrapeWorkerPool(concurrency=1)
+    pool.jobs = FakeJobs(attempts=1)
+    await pool._run("j1")
+    assert pool.jobs.events == [("succeeded", {"page_id": "deepsolv", "coalesced": False, "ingest": {}})]
+
+
+def test_retry_delay_grows_exponentially():
+    base = settings.SCRAPE_RETRY_BASE_SECONDS
+    assert base * 0.8 <= scrape_worker.retry_delay(1) <= base * 1.2
+    assert base * 4 * 0.8 <= scrape_worker.retry_delay(3) <= base * 4 * 1.2
+
+
+class FakeQueue(FakeJobs):
+    """Hands out one job, then nothing; records releases."""
+
+    def __init__(self):
+        super().__init__(attempts=1)
+        self.pending = ["j1"]
+
+    async def claim(self, processing, timeout=1):
+        if self.pending:
+            return self.pending.pop()
+        await asyncio.sleep(0.01)
+        return None
+
+    async def release(self, processing, job_id, requeue=False):
+        self.events.append(("released", processing, job_id, requeue))
+
+
+@pytest.mark.anyio
+async def test_claimed_job_stays_in_processing_until_done_or_requeued(monkeypatch):
+    started = asyncio.Event()
+
+    async def slow_refresh(self, page_id):
+        started.set()
+        await asyncio.sleep(10)
+
+    monkeypatch.setattr(PageService, "refresh_page", slow_refresh)
+
+    pool = ScrapeWorkerPool(concurrency=1)
+    pool.jobs = FakeQueue()
+    worker = asyncio.create_task(pool._worker(0))
+    await started.wait()
+    assert pool.jobs.events == []  # still claimed: a crash now leaves it in the processing list
+
+    worker.cancel()  # graceful shutdown mid-job
+    await asyncio.gather(worker, return_exceptions=True)
+    assert pool.jobs.events == [("released", pool._processing[0], "j1", True)]
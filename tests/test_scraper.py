@@ -0,0 +1,90 @@
+import httpx
+import pytest
+
+from app.services import scraper_service
+from app.services.scraper_service import LinkedInScraperService, scraper_pool_stats
+
+
+@pytest.mark.anyio
+async def test_fetch_reuses_shared_client(monkeypatch):
+    seen = []
+
+    def handler(request: httpx.Request):
+        seen.append(str(request.url))
+        return httpx.Response(200, text="<h1>Deepsolv</h1><p>About</p>")
+
+    await scraper_service.start_scraper_client()
+    shared = scraper_service._http.client
+    monkeypatch.setattr(shared, "_transport", httpx.MockTransport(handler))
+    try:
+        scraper = LinkedInScraperService()
+        for _ in range(3):
+            await scraper._fetch("https://www.linkedin.com/company/deepsolv/about", {})
+
+        assert scraper_service._http.client is shared
+        assert len(seen) == 3
+        stats = scraper_pool_stats()
+        assert stats["requests_total"] >= 3
+        assert stats["in_flight"] == 0
+    finally:
+        await scraper_service.close_scraper_client()
+
+
+def test_single_pass_parser_matches_legacy_extraction():
+    from app.services.html_parser import parse_company_html
+    from tests.fixtures import html_fixtures, legacy_parse
+
+    fixtures = html_fixtures()
+    assert fixtures
+    for path in fixtures:
+        html = path.read_text()
+        assert parse_company_html(html, "deepsolv") == legacy_parse(html, "deepsolv")
+
+
+@pytest.mark.anyio
+async def test_live_scrape_parses_off_the_event_loop(monkeypatch):
+    async def fake_fetch(self, url, headers):
+        return "<html><h1>Deepsolv</h1><p>AI automation</p><div>followers 1200</div></html>"
+
+    monkeypatch.setattr(LinkedInScraperService, "_fetch", fake_fetch)
+
+    payload = await LinkedInScraperService()._scrape_live("deepsolv")
+    assert payload["name"] == "Deepsolv"
+    assert payload["description"] == "AI automation"
+    assert payload["followers"] == 1200
+
+
+@pytest.mark.anyio
+async def test_unchanged_html_short_circuits_before_parsing(monkeypatch):
+    html = "<html><h1>Deepsolv</h1><p>AI automation</p></html>"
+
+    async def fake_fetch(self, url, headers):
+        return html
+
+    async def fail_parse(self, html, page_id):
+        raise AssertionError("unchanged HTML must not be parsed")
+
+    monkeypatch.setattr(LinkedInScraperService, "_fetch", fake_fetch)
+    scraper = LinkedInScraperService()
+
+    payload = await scraper._scrape_live("deepsolv")
+    assert payload["html_fingerprint"] == scraper_service.html_fingerprint(html)
+
+    monkeypatch.setattr(LinkedInScraperService, "_parse", fail_parse)
+    with pytest.raises(scraper_service.PageUnchanged):
+        await scraper._scrape_live("deepsolv", fingerprint=payload["html_fingerprint"])
+
+
+@pytest.mark.anyio
+async def test_parse_workers_are_not_forked_from_the_app(monkeypatch):
+    monkeypatch.setattr(scraper_service.settings, "SCRAPER_PARSE_WORKERS", 1)
+    await scraper_service.start_scraper_client()
+    try:
+        pool = scraper_service._http.parse_pool
+        assert pool._mp_context.get_start_method() != "fork"
+        parsed = await LinkedInScraperService()._parse(
+            "<html><h1>Deepsolv</h1><p>AI automation</p></html>", "deepsolv"
+        )
+        assert parsed["name"] == "Deepsolv"
+    finally:
+        await scraper_service.close_scraper_client()
@@ -0,0 +1,81 @@
+import asyncio
+
+import pytest
+
+from app.core.singleflight import SingleFlight
+
+
+@pytest.mark.anyio
+async def test_concurrent_calls_share_one_execution(fake_locks):
+    flight = SingleFlight("test", lease_seconds=5, wait_timeout_seconds=5)
+    calls = []
+
+    async def scrape():
+        calls.append(1)
+        await asyncio.sleep(0.05)
+        return {"page_id": "deepsolv"}
+
+    results = await asyncio.gather(*(flight.do("deepsolv", scrape) for _ in range(10)))
+
+    assert len(calls) == 1
+    assert all(r == {"page_id": "deepsolv"} for r in results)
+    assert fake_locks == {}
+
+
+@pytest.mark.anyio
+async def test_waits_for_lease_held_by_another_worker(fake_locks):
+    flight = SingleFlight("test", lease_seconds=5, wait_timeout_seconds=5)
+    fake_locks["lock:test:deepsolv"] = "other-worker"
+    stored = {}
+
+    async def other_worker_finishes():
+        await asyncio.sleep(0.15)
+        stored["deepsolv"] = {"page_id": "deepsolv", "from": "other"}
+        del fake_locks["lock:test:deepsolv"]
+
+    async def scrape():
+        raise AssertionError("should reuse the other worker's result")
+
+    async def recheck():
+        return stored.get("deepsolv")
+
+    _, result = await asyncio.gather(
+        other_worker_finishes(),
+        flight.do("deepsolv", scrape, recheck=recheck),
+    )
+    assert result["from"] == "other"
+
+
+@pytest.mark.anyio
+async def test_errors_propagate_to_all_waiters(fake_locks):
+    flight = SingleFlight("test", lease_seconds=5, wait_timeout_seconds=5)
+
+    async def scrape():
+        await asyncio.sleep(0.01)
+        raise RuntimeError("scrape failed")
+
+    results = await asyncio.gather(
+        *(flight.do("deepsolv", scrape) for _ in range(3)), return_exceptions=True
+    )
+    assert all(isinstance(r, RuntimeError) for r in results)
+
+
+@pytest.mark.anyio
+async def test_cancelled_leader_does_not_fail_followers(fake_locks):
+    flight = SingleFlight("test", lease_seconds=5, wait_timeout_seconds=5)
+    calls = []
+
+    async def scrape():
+        calls.append(1)
+        await asyncio.sleep(0.05)
+        return {"page_id": "deepsolv"}
+
+    leader = asyncio.create_task(flight.do("deepsolv", scrape))
+    await asyncio.sleep(0)
+    follower = asyncio.create_task(flight.do("deepsolv", scrape))
+    await asyncio.sleep(0.01)
+    leader.cancel()  # the leader's client disconnected
+
+    assert await follower == {"page_id": "deepsolv"}
+    assert leader.cancelled() and len(calls) == 1
+    assert fake_locks == {}